@@ -11,7 +11,9 @@ repo_root = os.path.abspath(os.path.join(repo_root, ".."))  # up one level
 if repo_root not in sys.path:
     sys.path.insert(0, repo_root)
     
-from src import compute, queries
+from src import compute, queries, instrumentation
+
+instrumentation.start_render("Home")
 
 st.set_page_config(page_title="Basel III Risk Dashboard", layout="wide")
 
@@ -0,0 +1,145 @@
+import sys
+import os
+import streamlit as st
+from src import instrumentation, explain
+import plotly.express as px
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+st.set_page_config(page_title="Performance", layout="wide")
+
+st.title("Performance")
+st.caption("Timings for every queries.* and compute.* call made by recent page renders in this server process.")
+
+# ==========================================================
+# Filters
+# ==========================================================
+records = instrumentation.get_records()
+
+with st.sidebar:
+    capture = st.toggle(
+        "Capture EXPLAIN ANALYZE plans",
+        value=explain.is_enabled(),
+        help="Re-runs every issued query under EXPLAIN (ANALYZE, BUFFERS). Roughly doubles query time.",
+        key="perf_explain"
+    )
+    if capture != explain.is_enabled():
+        explain.enable() if capture else explain.disable()
+
+if records.empty:
+    st.info("No calls recorded yet. Open one of the dashboard pages, then come back here.")
+    st.stop()
+
+with st.sidebar:
+    scopes = sorted(records['scope'].dropna().unique().tolist())
+    scope = st.selectbox("Page", ["All pages"] + scopes, key="perf_scope")
+    scope = None if scope == "All pages" else scope
+
+    renders = records if scope is None else records[records['scope'] == scope]
+    render_ids = renders.drop_duplicates('render_id', keep='last')['render_id'].dropna().tolist()[::-1]
+    render_choice = st.selectbox("Render", ["All renders"] + render_ids, key="perf_render")
+    render_id = None if render_choice == "All renders" else render_choice
+
+    top_n = st.slider("Rows in slowest-call tables", 5, 100, 20, step=5, key="perf_top_n")
+
+    if st.button("Clear recorded calls"):
+        instrumentation.reset()
+        st.rerun()
+
+filters = {'scope': scope, 'render_id': render_id}
+records = instrumentation.get_records(**filters)
+
+# ==========================================================
+# KPI Tiles
+# ==========================================================
+top_level = records[records['depth'] == 0]
+queries_df = records[records['kind'] == 'query']
+
+k1, k2, k3, k4 = st.columns(4)
+k1.metric("Recorded Calls", f"{len(records):,}")
+k2.metric("Top-level Time", f"{top_level['duration_ms'].sum():,.0f} ms")
+k3.metric("Rows Fetched", f"{queries_df['rows'].sum():,.0f}")
+k4.metric("Data Fetched", f"{queries_df['bytes'].sum() / 1e6:,.2f} MB")
+
+# ==========================================================
+# Time by Function
+# ==========================================================
+st.subheader("Time by Function")
+
+summary = instrumentation.summarize(**filters)
+
+fig = px.bar(
+    summary.head(top_n),
+    x='total_ms',
+    y='name',
+    color='kind',
+    orientation='h',
+    labels={'total_ms': 'Total time (ms)', 'name': 'Function'},
+    title="Total Time per Function"
+)
+fig.update_layout(yaxis={'categoryorder': 'total ascending'}, height=450)
+st.plotly_chart(fig, use_container_width=True)
+
+st.dataframe(summary, use_container_width=True)
+
+# ==========================================================
+# Slowest Calls
+# ==========================================================
+col1, col2 = st.columns(2)
+
+with col1:
+    st.subheader("Slowest Queries")
+    st.dataframe(
+        instrumentation.slowest_calls(top_n, kind='query', **filters)[
+            ['timestamp', 'scope', 'name', 'duration_ms', 'rows', 'bytes', 'cache', 'error']
+        ],
+        use_container_width=True
+    )
+
+with col2:
+    st.subheader("Slowest Compute Calls")
+    st.dataframe(
+        instrumentation.slowest_calls(top_n, kind='compute', **filters)[
+            ['timestamp', 'scope', 'name', 'duration_ms', 'depth', 'error']
+        ],
+        use_container_width=True
+    )
+
+# ==========================================================
+# Query Plans
+# ==========================================================
+st.subheader("Query Plan Diagnostics")
+
+plans = explain.get_plans()
+if plans.empty:
+    st.caption("No plans captured. Turn on plan capture in the sidebar and reload a page.")
+else:
+    findings = explain.get_findings()
+    st.dataframe(
+        findings[['timestamp', 'type', 'relation', 'detail', 'statement', 'params']],
+        use_container_width=True
+    )
+    st.dataframe(
+        plans.sort_values('execution_ms', ascending=False)[
+            ['timestamp', 'statement', 'params', 'planning_ms', 'execution_ms', 'n_findings']
+        ].head(top_n),
+        use_container_width=True
+    )
+    st.download_button("Download plans (JSON lines)", explain.to_json(), file_name="basel_plans.jsonl")
+
+# ==========================================================
+# Export
+# ==========================================================
+with st.expander("📤 Prometheus Export"):
+    prometheus_text = instrumentation.to_prometheus(**filters)
+    st.code(prometheus_text, language="text")
+    st.download_button("Download metrics", prometheus_text, file_name="basel_metrics.prom")
+
+with st.expander("📤 Structured Log Export"):
+    st.download_button(
+        "Download call records (JSON lines)",
+        records.to_json(orient='records', lines=True, date_format='iso'),
+        file_name="basel_calls.jsonl"
+    )
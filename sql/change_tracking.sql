@@ -0,0 +1,139 @@
+-- ===============================
+-- Basel III Change Tracking & Incremental Aggregates
+-- ===============================
+-- Run after schema.sql. Every statement touching a source table records the
+-- (scenario_id, date) keys it changed in change_log; src/incremental.py then
+-- rebuilds only those keys in the daily aggregate and KPI tables.
+
+-- ===============================
+-- CHANGE LOG TABLE
+-- ===============================
+CREATE TABLE IF NOT EXISTS change_log (
+    id BIGSERIAL PRIMARY KEY,
+    table_name VARCHAR(50) NOT NULL,     -- cashflows, rwa, irrbb, balance_sheet
+    scenario_id INTEGER,
+    date DATE NOT NULL,
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- ===============================
+-- REFRESH STATE TABLE (Watermarks)
+-- ===============================
+CREATE TABLE IF NOT EXISTS refresh_state (
+    name VARCHAR(50) PRIMARY KEY,
+    watermark BIGINT NOT NULL DEFAULT 0,  -- Last change_log.id folded into the aggregates
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- ===============================
+-- DAILY AGGREGATE TABLES
+-- ===============================
+CREATE TABLE IF NOT EXISTS agg_cashflows_daily (
+    id BIGSERIAL PRIMARY KEY,
+    scenario_id INTEGER,
+    date DATE NOT NULL,
+    direction VARCHAR(10) NOT NULL,
+    hqlatype VARCHAR(20) NOT NULL,
+    product VARCHAR(50) NOT NULL,
+    counterparty VARCHAR(50) NOT NULL,
+    amount NUMERIC(20,2) NOT NULL,
+    asf NUMERIC(20,2) NOT NULL,           -- SUM(amount * asf_factor)
+    rsf NUMERIC(20,2) NOT NULL,           -- SUM(amount * rsf_factor)
+    row_count INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS agg_rwa_daily (
+    id BIGSERIAL PRIMARY KEY,
+    scenario_id INTEGER,
+    date DATE NOT NULL,
+    approach VARCHAR(20) NOT NULL,
+    asset_class VARCHAR(50) NOT NULL,
+    amount NUMERIC(20,2) NOT NULL,
+    rwa_amount NUMERIC(20,2) NOT NULL,
+    capital_requirement NUMERIC(20,2) NOT NULL,
+    row_count INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS agg_irrbb_daily (
+    id BIGSERIAL PRIMARY KEY,
+    scenario_id INTEGER,
+    date DATE NOT NULL,
+    tenor_bucket VARCHAR(20),
+    cashflow NUMERIC(20,2) NOT NULL,
+    pv01 NUMERIC(18,6) NOT NULL,
+    row_count INTEGER NOT NULL
+);
+
+-- ===============================
+-- KPI RESULTS TABLE
+-- ===============================
+CREATE TABLE IF NOT EXISTS kpi_results (
+    id BIGSERIAL PRIMARY KEY,
+    scenario_id INTEGER,
+    date DATE NOT NULL,
+    metric VARCHAR(50) NOT NULL,          -- LCR, NSFR, CET1 Ratio, Total PV01, ...
+    value DOUBLE PRECISION
+);
+
+-- ===============================
+-- INDEXES
+-- ===============================
+CREATE INDEX IF NOT EXISTS idx_change_log_id_table ON change_log (id, table_name);
+CREATE INDEX IF NOT EXISTS idx_cashflows_date_scenario ON cashflows (date, scenario_id);
+CREATE INDEX IF NOT EXISTS idx_rwa_date_scenario ON rwa (date, scenario_id);
+CREATE INDEX IF NOT EXISTS idx_irrbb_date_scenario ON irrbb (date, scenario_id);
+CREATE INDEX IF NOT EXISTS idx_balance_sheet_date_scenario ON balance_sheet (date, scenario_id);
+CREATE INDEX IF NOT EXISTS idx_agg_cashflows_date_scenario ON agg_cashflows_daily (date, scenario_id);
+CREATE INDEX IF NOT EXISTS idx_agg_rwa_date_scenario ON agg_rwa_daily (date, scenario_id);
+CREATE INDEX IF NOT EXISTS idx_agg_irrbb_date_scenario ON agg_irrbb_daily (date, scenario_id);
+CREATE INDEX IF NOT EXISTS idx_kpi_results_date_scenario ON kpi_results (date, scenario_id);
+
+-- ===============================
+-- CHANGE CAPTURE TRIGGERS
+-- ===============================
+-- Statement-level triggers with transition tables: a bulk load of N rows logs
+-- one entry per distinct (scenario_id, date) key, not N entries.
+CREATE OR REPLACE FUNCTION log_changed_keys() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO change_log (table_name, scenario_id, date)
+        SELECT DISTINCT TG_TABLE_NAME, scenario_id, date FROM old_rows;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO change_log (table_name, scenario_id, date)
+        SELECT DISTINCT TG_TABLE_NAME, scenario_id, date FROM new_rows;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    source_table TEXT;
+BEGIN
+    FOREACH source_table IN ARRAY ARRAY['cashflows', 'rwa', 'irrbb', 'balance_sheet'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I_log_insert ON %I', source_table, source_table);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I_log_update ON %I', source_table, source_table);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I_log_delete ON %I', source_table, source_table);
+
+        EXECUTE format(
+            'CREATE TRIGGER %I_log_insert AFTER INSERT ON %I '
+            'REFERENCING NEW TABLE AS new_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION log_changed_keys()',
+            source_table, source_table
+        );
+        EXECUTE format(
+            'CREATE TRIGGER %I_log_update AFTER UPDATE ON %I '
+            'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION log_changed_keys()',
+            source_table, source_table
+        );
+        EXECUTE format(
+            'CREATE TRIGGER %I_log_delete AFTER DELETE ON %I '
+            'REFERENCING OLD TABLE AS old_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION log_changed_keys()',
+            source_table, source_table
+        );
+    END LOOP;
+END;
+$$;
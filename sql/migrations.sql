@@ -0,0 +1,69 @@
+-- ===============================
+-- Basel III Schema Migrations
+-- ===============================
+-- Run after schema.sql. Brings tables created by an earlier schema up to
+-- date; every statement is idempotent, so it is safe to run on new and
+-- existing databases alike (src/init_db.py runs it on every start-up).
+
+-- ===============================
+-- RWA ENGINE INPUTS (src/credit_risk.py)
+-- ===============================
+ALTER TABLE rwa ADD COLUMN IF NOT EXISTS credit_quality_step SMALLINT
+    CHECK (credit_quality_step BETWEEN 1 AND 6);                -- STD: NULL = unrated
+ALTER TABLE rwa ADD COLUMN IF NOT EXISTS pd NUMERIC(9,6);      -- IRB: probability of default
+ALTER TABLE rwa ADD COLUMN IF NOT EXISTS lgd NUMERIC(5,4);     -- IRB: loss given default
+ALTER TABLE rwa ADD COLUMN IF NOT EXISTS maturity NUMERIC(6,3); -- IRB: effective maturity in years
+
+-- Derived weights carry 4 decimals (IRB weights exceed 100%); widen the old
+-- NUMERIC(5,2) column, rewriting the table only when it is not yet widened
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema()
+        AND table_name = 'rwa' AND column_name = 'risk_weight'
+        AND (numeric_precision, numeric_scale) IS DISTINCT FROM (7, 4)
+    ) THEN
+        ALTER TABLE rwa ALTER COLUMN risk_weight TYPE NUMERIC(7,4);
+    END IF;
+END
+$$;
+
+-- ===============================
+-- IRRBB PV01 (src/irrbb.py)
+-- ===============================
+-- PV01 is the EUR value change per +1bp from the key-rate engine, which
+-- overflows the old NUMERIC(10,6) column for large instruments
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema()
+        AND table_name = 'irrbb' AND column_name = 'pv01'
+        AND (numeric_precision, numeric_scale) IS DISTINCT FROM (18, 6)
+    ) THEN
+        ALTER TABLE irrbb ALTER COLUMN pv01 TYPE NUMERIC(18,6);
+    END IF;
+END
+$$;
+
+-- ===============================
+-- SCENARIO PARAM OVERRIDES (src/parameters.py)
+-- ===============================
+-- Overrides belong to their scenario: recreate a non-cascading foreign key
+-- so deleting a scenario deletes its overrides instead of failing
+DO $$
+DECLARE
+    fk RECORD;
+BEGIN
+    FOR fk IN
+        SELECT conname FROM pg_constraint
+        WHERE conrelid = to_regclass('scenario_params') AND contype = 'f'
+        AND confrelid = to_regclass('scenarios') AND confdeltype <> 'c'
+    LOOP
+        EXECUTE format('ALTER TABLE scenario_params DROP CONSTRAINT %I', fk.conname);
+        ALTER TABLE scenario_params ADD CONSTRAINT scenario_params_scenario_id_fkey
+            FOREIGN KEY (scenario_id) REFERENCES scenarios(id) ON DELETE CASCADE;
+    END LOOP;
+END
+$$;
@@ -54,9 +54,13 @@ CREATE TABLE rwa (
     asset_class VARCHAR(50) NOT NULL,       
     approach VARCHAR(20) CHECK (approach IN ('STD', 'IRB')) NOT NULL,
     amount NUMERIC(18,2) NOT NULL,           
-    risk_weight NUMERIC(5,2) NOT NULL,       
-    rwa_amount NUMERIC(18,2) NOT NULL,       -- Inserted by app: amount * risk_weight
-    capital_requirement NUMERIC(18,2) NOT NULL, -- Inserted by app: rwa_amount * 0.08
+    credit_quality_step SMALLINT CHECK (credit_quality_step BETWEEN 1 AND 6), -- STD: NULL = unrated
+    pd NUMERIC(9,6),                         -- IRB: probability of default
+    lgd NUMERIC(5,4),                        -- IRB: loss given default
+    maturity NUMERIC(6,3),                   -- IRB: effective maturity in years
+    risk_weight NUMERIC(7,4) NOT NULL,       -- Derived by src.credit_risk (python -m src.credit_risk)
+    rwa_amount NUMERIC(18,2) NOT NULL,       -- amount * risk_weight
+    capital_requirement NUMERIC(18,2) NOT NULL, -- rwa_amount * capital_requirement_ratio
     scenario_id INTEGER REFERENCES scenarios(id) ON DELETE SET NULL
 );
 
@@ -70,11 +74,21 @@ CREATE TABLE irrbb (
     cashflow NUMERIC(18,2) NOT NULL,     -- Amount of cashflow
     maturity_date DATE NOT NULL,         -- Maturity of cashflow
     tenor_bucket VARCHAR(20),            -- e.g., 0-1y, 1-3y, etc.
-    pv01 NUMERIC(10,6) NOT NULL,         -- PV01 for this instrument
+    pv01 NUMERIC(18,6) NOT NULL,         -- EUR value change per +1bp (derived by python -m src.irrbb)
     rate_sensitivity NUMERIC(10,6),      -- Delta cashflow per 1bp shift
     scenario_id INTEGER REFERENCES scenarios(id) ON DELETE SET NULL
 );
 
+-- ===============================
+-- IRRBB KEY-RATE PV01 TABLE (written by python -m src.irrbb)
+-- ===============================
+CREATE TABLE irrbb_key_rate_pv01 (
+    irrbb_id INTEGER REFERENCES irrbb(id) ON DELETE CASCADE,
+    tenor_bucket VARCHAR(20) NOT NULL,   -- Key rate bumped by 1bp
+    pv01 NUMERIC(18,6) NOT NULL,         -- EUR value change of the instrument per +1bp
+    PRIMARY KEY (irrbb_id, tenor_bucket)
+);
+
 -- ===============================
 -- PARAMS TABLE (Optional Config)
 -- ===============================
@@ -82,3 +96,13 @@ CREATE TABLE params (
     key VARCHAR(50) PRIMARY KEY,
     value VARCHAR(100) NOT NULL
 );
+
+-- ===============================
+-- SCENARIO PARAMS TABLE (Per-scenario overrides of params)
+-- ===============================
+CREATE TABLE scenario_params (
+    scenario_id INTEGER REFERENCES scenarios(id) ON DELETE CASCADE,
+    key VARCHAR(50) NOT NULL,            -- Any params key, e.g. lcr_inflow_cap
+    value VARCHAR(100) NOT NULL,
+    PRIMARY KEY (scenario_id, key)
+);
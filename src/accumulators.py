@@ -0,0 +1,236 @@
+import pandas as pd
+import numpy as np
+
+# Maturity buckets of the cashflow gap heatmap: (low, high, label), days inclusive
+GAP_BUCKETS = [
+    (0, 7, '0-7d'),
+    (8, 30, '8-30d'),
+    (31, 90, '31-90d'),
+    (91, 180, '91-180d'),
+    (181, 365, '181-365d'),
+    (366, 9999, '>1y')
+]
+
+HQLA_TYPES = ['Level1', 'Level2A', 'Level2B']
+
+# Grouping key of the accumulated state; its size depends on the number of
+# dates and categories, never on the number of cashflow rows
+STATE_KEY = ['scenario_id', 'date', 'direction', 'hqlatype', 'product', 'counterparty', 'bucket']
+STATE_VALUES = ['amount', 'asf', 'rsf']
+
+# Partial frames held before they are folded into one
+COMPACT_EVERY = 16
+
+
+def assign_gap_bucket(maturity_days):
+    """
+    Vectorized gap bucket labels for an array of days-to-maturity. Anything
+    outside the bucket ranges (negative, missing, > 9999d) lands in '>1y'.
+    """
+    days = np.asarray(maturity_days, dtype=float)
+    conditions = [(days >= low) & (days <= high) for low, high, _ in GAP_BUCKETS]
+    labels = [label for _, _, label in GAP_BUCKETS]
+    return np.select(conditions, labels, default='>1y')
+
+
+# ==========================================================
+# ✅ Mergeable Liquidity Accumulator
+# ==========================================================
+class LiquidityAccumulator:
+    """
+    Folds cashflow chunks into per (scenario, date, direction, hqlatype,
+    product, counterparty, maturity bucket) sums of amount, ASF and RSF.
+    Accumulators built over disjoint chunks can be merged, and LCR, NSFR,
+    the gap heatmap and funding concentration are derived from the sums alone, so memory is bounded by the number of
+    dates rather than the number of rows.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self.rows = 0
+
+    def update(self, chunk):
+        """
+        Adds one chunk of raw cashflow rows.
+        """
+        if chunk.empty:
+            return self
+
+        dates = pd.to_datetime(chunk['date'])
+        maturity_days = (pd.to_datetime(chunk['maturity_date']) - dates).dt.days
+
+        amount = chunk['amount'].astype(float)
+        frame = pd.DataFrame({
+            'scenario_id': chunk['scenario_id'].values if 'scenario_id' in chunk else None,
+            'date': dates,
+            'direction': chunk['direction'].values,
+            'hqlatype': chunk['hqlatype'].values,
+            'product': chunk['product'].values,
+            'counterparty': chunk['counterparty'].values,
+            'bucket': assign_gap_bucket(maturity_days),
+            'amount': amount.values,
+            'asf': (amount * chunk['asf_factor'].astype(float).fillna(0)).values,
+            'rsf': (amount * chunk['rsf_factor'].astype(float).fillna(0)).values,
+        })
+        self._parts.append(frame.groupby(STATE_KEY, sort=False, dropna=False)[STATE_VALUES].sum())
+        self.rows += len(chunk)
+
+        if len(self._parts) >= COMPACT_EVERY:
+            self._compact()
+        return self
+
+    def merge(self, *others):
+        """
+        Folds other accumulators (built over disjoint rows) into this one,
+        with a single regroup however many are passed.
+        """
+        for other in others:
+            self._parts.extend(other._parts)
+            self.rows += other.rows
+        self._compact()
+        return self
+
+    def _compact(self):
+        if len(self._parts) > 1:
+            self._parts = [pd.concat(self._parts).groupby(level=STATE_KEY, sort=False, dropna=False).sum()]
+
+    @property
+    def state(self):
+        """
+        The accumulated sums as a flat DataFrame.
+        """
+        self._compact()
+        if not self._parts:
+            return pd.DataFrame(columns=STATE_KEY + STATE_VALUES)
+        return self._parts[0].reset_index()
+
+    # ------------------------------------------------------
+    # Results (same shapes as the compute.py functions)
+    # ------------------------------------------------------
+    def lcr(self, haircut_map, inflow_cap):
+        """
+        Same result dict as compute.calculate_lcr.
+        """
+        state = self.state
+        hqla = state[state['hqlatype'].isin(HQLA_TYPES)]
+        total_hqla = (hqla['amount'] * (1 - hqla['hqlatype'].map(haircut_map).fillna(1))).sum()
+
+        outflows = state.loc[state['direction'] == 'outflow', 'amount'].sum()
+        inflows = state.loc[state['direction'] == 'inflow', 'amount'].sum()
+        capped_inflows = min(inflows, outflows * inflow_cap)
+        net_outflows = outflows - capped_inflows
+
+        return {
+            'HQLA': total_hqla,
+            'Outflows': outflows,
+            'Inflows': inflows,
+            'NetOutflows': net_outflows,
+            'LCR': total_hqla / net_outflows if net_outflows > 0 else np.inf
+        }
+
+    def nsfr(self):
+        """
+        Same result dict as compute.calculate_nsfr.
+        """
+        state = self.state
+        asf_df = state[state['direction'] == 'inflow']
+        rsf_df = state[state['direction'] == 'outflow']
+
+        asf = asf_df['asf'].sum()
+        rsf = rsf_df['rsf'].sum()
+
+        return {
+            'ASF': asf,
+            'RSF': rsf,
+            'NSFR': asf / rsf if rsf > 0 else np.inf,
+            'ASF_components': asf_df.groupby('product')['asf'].sum().to_dict(),
+            'RSF_components': rsf_df.groupby('product')['rsf'].sum().to_dict()
+        }
+
+    def gap_heatmap(self, inflow_cap):
+        """
+        Same bucket x date pivot as compute.calculate_cashflow_gap_heatmap:
+        each day's inflows are scaled down pro rata so they do not exceed
+        inflow_cap times that day's outflows.
+        """
+        state = self.state
+        by_day = state.pivot_table(
+            index='date', columns='direction', values='amount', aggfunc='sum'
+        ).reindex(columns=['inflow', 'outflow']).fillna(0)
+
+        capped = by_day['inflow'].clip(upper=by_day['outflow'] * inflow_cap)
+        ratio = (capped / by_day['inflow'].where(by_day['inflow'] > 0)).fillna(0)
+
+        is_inflow = state['direction'] == 'inflow'
+        signed = np.where(
+            is_inflow,
+            state['amount'] * state['date'].map(ratio).fillna(0),
+            -state['amount']
+        )
+        grouped = state.assign(signed_amount=signed).groupby(['date', 'bucket'])['signed_amount'].sum().reset_index()
+        pivot = grouped.pivot(index='bucket', columns='date', values='signed_amount').fillna(0)
+        return pivot.sort_index()
+
+    def funding_concentration(self, top_n=5):
+        """
+        Concentration of funding (outflows) across counterparties: the
+        top_n counterparties and their share, the Herfindahl index and top_n
+        share per (scenario_id, date), and the maturity-bucket profile of
+        the top_n counterparties. Counterparties are categorical codes in a
+        dense (scenario-date x counterparty) array; top_n uses partial sorts.
+        """
+        state = self.state
+        funding = state[state['direction'] == 'outflow']
+        amount = funding['amount'].astype(float).to_numpy()
+
+        grouped = funding.groupby(['scenario_id', 'date'], dropna=False, sort=True)
+        group_codes = grouped.ngroup().to_numpy()
+        groups = grouped.size().index.to_frame(index=False)
+        counterparty = pd.Categorical(funding['counterparty'].fillna('None'))
+        n_groups, n_cpty = len(groups), len(counterparty.categories)
+        n = min(top_n, n_cpty)
+
+        matrix = np.bincount(
+            group_codes * n_cpty + counterparty.codes, weights=amount, minlength=n_groups * n_cpty
+        ).reshape(n_groups, n_cpty)
+        totals = matrix.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shares = matrix / totals[:, None]
+            top_share = np.partition(matrix, n_cpty - n, axis=1)[:, n_cpty - n:].sum(axis=1) / totals if n else np.zeros(n_groups)
+        by_date = groups.assign(Funding=totals, HHI=(shares ** 2).sum(axis=1), **{'Top-N Share': top_share})
+
+        # Largest counterparties overall
+        by_cpty = matrix.sum(axis=0)
+        top = np.argpartition(-by_cpty, n - 1)[:n] if n else np.array([], dtype=int)
+        top = top[np.argsort(-by_cpty[top], kind='stable')]
+        total_funding = by_cpty.sum()
+        top_frame = pd.DataFrame({
+            'Rank': np.arange(1, n + 1),
+            'counterparty': counterparty.categories[top],
+            'Funding': by_cpty[top],
+            'Share': by_cpty[top] / total_funding if total_funding > 0 else 0.0,
+        })
+
+        # Maturity profile of the largest counterparties
+        is_top = np.isin(counterparty.codes, top)
+        profile = funding[is_top].pivot_table(
+            index='counterparty', columns='bucket', values='amount', aggfunc='sum'
+        ).reindex(index=top_frame['counterparty'], columns=[label for _, _, label in GAP_BUCKETS]).fillna(0)
+        profile = profile.div(profile.sum(axis=1).replace(0, np.nan), axis=0).fillna(0)
+
+        return {
+            'Top Counterparties': top_frame,
+            'Top-N Share': top_frame['Funding'].sum() / total_funding if total_funding > 0 else 0.0,
+            'HHI': by_date,
+            'Maturity Concentration': profile,
+        }
+
+
+def accumulate(chunks):
+    """
+    Folds an iterable of cashflow chunks into a single accumulator.
+    """
+    acc = LiquidityAccumulator()
+    for chunk in chunks:
+        acc.update(chunk)
+    return acc
@@ -1,27 +1,32 @@
 import pandas as pd
 import numpy as np
-from src import queries
+from src import queries, accumulators, parallel, overlays, stress, cube, parameters, sensitivity, downsample, credit_risk, ladder, survival, scenario_diff, irrbb, curves
 import streamlit as st
+from src.instrumentation import instrument_compute
 
 
 # ==========================================================
 # ✅ Liquidity Coverage Ratio (LCR)
 # ==========================================================
-def calculate_lcr(scenario_id=None):
+@instrument_compute
+def calculate_lcr(scenario_id=None, chunksize=None):
     """
     Calculates LCR = HQLA / Net 30-day Outflows
+    With chunksize set, cashflows are streamed and aggregated chunk by chunk
+    in constant memory instead of being loaded in one DataFrame.
     """
+    params = parameters.load_params(scenario_id)
+    haircut_map = params.haircut_map
+    inflow_cap = params.lcr_inflow_cap
+
+    if chunksize:
+        acc = accumulators.accumulate(queries.iter_cashflows(scenario_id=scenario_id, chunksize=chunksize))
+        return acc.lcr(haircut_map, inflow_cap)
+
     cashflows = queries.get_cashflows(scenario_id=scenario_id)
-    params = queries.get_params()
 
     # HQLA calculation
     hqla = cashflows[cashflows['hqlatype'].isin(['Level1', 'Level2A', 'Level2B'])]
-    haircut_map = {
-        'Level1': 0.0,
-        'Level2A': float(params.get('haircut_level2a', 0.15)),
-        'Level2B': float(params.get('haircut_level2b', 0.5)),
-        'None': 1.0
-    }
     hqla['adjusted_hqla'] = hqla.apply(
         lambda x: x['amount'] * (1 - haircut_map.get(x['hqlatype'], 1)), axis=1
     )
@@ -31,7 +36,6 @@ def calculate_lcr(scenario_id=None):
     outflows = cashflows[cashflows['direction'] == 'outflow']['amount'].sum()
     inflows = cashflows[cashflows['direction'] == 'inflow']['amount'].sum()
 
-    inflow_cap = float(params.get('lcr_inflow_cap', 0.75))
     capped_inflows = min(inflows, outflows * inflow_cap)
 
     net_outflows = outflows - capped_inflows
@@ -50,12 +54,17 @@ def calculate_lcr(scenario_id=None):
 # ==========================================================
 # ✅ Net Stable Funding Ratio (NSFR)
 # ==========================================================
-def calculate_nsfr(scenario_id=None):
+@instrument_compute
+def calculate_nsfr(scenario_id=None, chunksize=None):
     """
     Calculates NSFR = ASF / RSF + breakdowns for stacked bar chart
+    With chunksize set, cashflows are streamed in constant memory.
     """
+    if chunksize:
+        acc = accumulators.accumulate(queries.iter_cashflows(scenario_id=scenario_id, chunksize=chunksize))
+        return acc.nsfr()
+
     cashflows = queries.get_cashflows(scenario_id=scenario_id)
-    params = queries.get_params()
 
     # Compute ASF and RSF contributions
     cashflows['asf'] = cashflows['amount'] * cashflows['asf_factor']
@@ -86,7 +95,18 @@ def calculate_nsfr(scenario_id=None):
 # ✅ Cashflow Gap Heatmap
 # ==========================================================
 
-def calculate_cashflow_gap_heatmap(scenario_id=None):
+@instrument_compute
+def calculate_cashflow_gap_heatmap(scenario_id=None, chunksize=None):
+    """
+    Net (inflow-capped) cashflows per maturity bucket and date.
+    With chunksize set, cashflows are streamed in constant memory.
+    """
+    inflow_cap = parameters.load_params(scenario_id).lcr_inflow_cap
+
+    if chunksize:
+        acc = accumulators.accumulate(queries.iter_cashflows(scenario_id=scenario_id, chunksize=chunksize))
+        return acc.gap_heatmap(inflow_cap=inflow_cap)
+
     cashflows = queries.get_cashflows(scenario_id=scenario_id)
 
     # Ensure date columns are datetime
@@ -122,8 +142,7 @@ def calculate_cashflow_gap_heatmap(scenario_id=None):
     daily_inflows = inflows.groupby('date')['amount'].sum()
     daily_outflows = outflows.groupby('date')['amount'].sum()
 
-    # EBA 75% cap on inflows
-    inflow_cap = 0.75
+    # EBA cap on inflows (75% of outflows by default)
     inflow_limits = pd.concat([
         daily_inflows.rename("inflows"),
         daily_outflows.rename("outflows")
@@ -149,27 +168,81 @@ def calculate_cashflow_gap_heatmap(scenario_id=None):
     return pivot
 
 
+# ==========================================================
+# ✅ Partition-Parallel Liquidity Aggregation
+# ==========================================================
+@instrument_compute
+def calculate_liquidity_partitioned(scenario_id=None, max_workers=None, parquet_root=None):
+    """
+    LCR, NSFR, the gap heatmap and funding concentration in one pass,
+    aggregated per (scenario_id, month) partition in worker processes and
+    merged in this process. Returns the same structures as calculate_lcr,
+    calculate_nsfr, calculate_cashflow_gap_heatmap and
+    calculate_funding_concentration.
+    """
+    params = parameters.load_params(scenario_id)
+    haircut_map = params.haircut_map
+    inflow_cap = params.lcr_inflow_cap
+
+    acc = parallel.aggregate_cashflows(
+        scenario_id=scenario_id, parquet_root=parquet_root, max_workers=max_workers
+    )
+    return {
+        'LCR': acc.lcr(haircut_map, inflow_cap),
+        'NSFR': acc.nsfr(),
+        'Gap Heatmap': acc.gap_heatmap(inflow_cap=inflow_cap),
+        'Funding Concentration': acc.funding_concentration()
+    }
+
+
+@instrument_compute
+def calculate_funding_concentration(scenario_id=None, top_n=5, chunksize=None):
+    """
+    Top-N counterparties' share of funding, Herfindahl index per date and
+    scenario, and the maturity profile of the largest counterparties.
+    With chunksize set, cashflows are streamed in constant memory.
+    """
+    if chunksize:
+        acc = accumulators.accumulate(queries.iter_cashflows(scenario_id=scenario_id, chunksize=chunksize))
+    else:
+        acc = accumulators.accumulate([queries.get_cashflows(scenario_id=scenario_id)])
+    return acc.funding_concentration(top_n=top_n)
+
+
 # ==========================================================
 # ✅ LCR and NSFR Time Series
 # ==========================================================
 
+def _daily_flows(scenario_id=None):
+    """
+    Inflows, outflows, ASF (on inflows) and RSF (on outflows) per date with
+    any flow, reduced from the scenario's cached liquidity cube, so every
+    time series shares one cashflow read per data version.
+    """
+    liquidity_cube = cube.get_cube(scenario_id)
+    inflow = liquidity_cube.slice(direction='inflow')
+    outflow = liquidity_cube.slice(direction='outflow')
+    daily = pd.DataFrame({
+        'inflows': inflow.total('amount', by='date'),
+        'outflows': outflow.total('amount', by='date'),
+        'ASF': inflow.total('asf', by='date'),
+        'RSF': outflow.total('rsf', by='date'),
+    })
+    has_flows = (inflow.total('count', by='date') + outflow.total('count', by='date')) > 0
+    return daily[has_flows.to_numpy()]
+
+
+@instrument_compute
 def calculate_lcr_timeseries(scenario_id=None):
-    cashflows = queries.get_cashflows(scenario_id=scenario_id)
-    params = queries.get_params()
-    print("Params for scenario", scenario_id, params)
-
-    # Prepare inflows/outflows by date
-    inflows = cashflows[cashflows['direction'] == 'inflow'].groupby('date')['amount'].sum()
-    outflows = cashflows[cashflows['direction'] == 'outflow'].groupby('date')['amount'].sum()
+    params = parameters.load_params(scenario_id)
 
-    # Combine inflows and outflows into a single DataFrame
-    capped_inflows = pd.concat(
-        [inflows.rename("inflows"), outflows.rename("outflows")],
-        axis=1
-    ).fillna(0)
+    # Inflows/outflows by date
+    capped_inflows = _daily_flows(scenario_id)[['inflows', 'outflows']].copy()
 
-    # EBA inflow cap: inflows cannot exceed 75% of outflows
-    capped_inflows['capped_inflows'] = capped_inflows['inflows'].clip(upper=capped_inflows['outflows'] * 0.75)
+    # EBA inflow cap: inflows cannot exceed lcr_inflow_cap (75%) of outflows
+    capped_inflows['capped_inflows'] = capped_inflows['inflows'].clip(
+        upper=capped_inflows['outflows'] * params.lcr_inflow_cap
+    )
     capped_inflows['net_outflows'] = capped_inflows['outflows'] - capped_inflows['capped_inflows']
 
     # HQLA: assume constant or derive from params
@@ -184,40 +257,85 @@ def calculate_lcr_timeseries(scenario_id=None):
 
     # Calculate daily LCR
     capped_inflows['lcr'] = hqla / capped_inflows['net_outflows']
-    capped_inflows['net_cashflow'] = inflows.sub(outflows, fill_value=0)
+    capped_inflows['net_cashflow'] = capped_inflows['inflows'] - capped_inflows['outflows']
 
-    capped_inflows.index = pd.to_datetime(capped_inflows.index)
     return capped_inflows.reset_index()
     
+@instrument_compute
 def calculate_nsfr_timeseries(scenario_id=None):
-    cashflows = queries.get_cashflows(scenario_id=scenario_id)
-    params = queries.get_params()
+    # ASF on inflows, RSF on outflows, by date
+    df = _daily_flows(scenario_id)[['ASF', 'RSF']].copy()
+    df['NSFR'] = df['ASF'] / df['RSF'].replace(0, np.nan)
+    return df.reset_index()
 
-    cashflows['date'] = pd.to_datetime(cashflows['date'])
+@instrument_compute
+def calculate_forward_lcr_timeseries(scenario_id=None, horizon_days=30):
+    """
+    Forward-window LCR for every reporting date: HQLA outstanding on the
+    date over net outflows maturing in the next horizon_days, both over
+    rows booked by the date and read off the maturity ladder.
+    """
+    params = parameters.load_params(scenario_id)
+    maturity_ladder = ladder.get_ladder(scenario_id)
+    dates = np.unique(maturity_ladder.booked_days).astype('datetime64[D]')
+    return maturity_ladder.forward_lcr(dates, horizon_days=horizon_days, inflow_cap=params.lcr_inflow_cap)
 
-    # ASF
-    cashflows['asf'] = cashflows['amount'] * cashflows['asf_factor']
-    daily_asf = cashflows[cashflows['direction'] == 'inflow'].groupby('date')['asf'].sum()
+@instrument_compute
+def calculate_maturity_windows(date, edges_days=(0, 7, 30, 90, 180, 365), scenario_id=None):
+    """
+    Inflows and outflows maturing per custom bucket after a date, e.g. the
+    NSFR split at one year with edges_days=(0, 365, 36500).
+    """
+    maturity_ladder = ladder.get_ladder(scenario_id)
+    edges_days = list(edges_days)
+    labels = [f"{lo}-{hi}d" for lo, hi in zip(edges_days[:-1], edges_days[1:])]
+    return pd.DataFrame({
+        'bucket': labels,
+        'inflows': maturity_ladder.bucket_totals(date, edges_days, series='inflow'),
+        'outflows': maturity_ladder.bucket_totals(date, edges_days, series='outflow'),
+    })
+
+@instrument_compute
+def calculate_liquidity_timeseries_view(scenario_id=None, start_date=None, end_date=None, max_points=500):
+    """
+    Chart-ready LCR/NSFR history for the visible range with a bounded
+    payload: net cashflow bars are summed per day, week, month or quarter
+    (the finest with at most max_points periods) and the LCR and NSFR
+    lines are LTTB-downsampled to at most max_points points. Both series
+    reduce the same cached liquidity cube, so the cashflows are read once
+    per data version however many figures ask for the view.
+    """
+    lcr = downsample.clip_dates(calculate_lcr_timeseries(scenario_id=scenario_id), start_date, end_date)
+    nsfr = downsample.clip_dates(calculate_nsfr_timeseries(scenario_id=scenario_id), start_date, end_date)
 
-    # RSF
-    cashflows['rsf'] = cashflows['amount'] * cashflows['rsf_factor']
-    daily_rsf = cashflows[cashflows['direction'] == 'outflow'].groupby('date')['rsf'].sum()
+    if lcr.empty:
+        freq = 'D'
+    else:
+        freq = downsample.choose_frequency(lcr['date'].min(), lcr['date'].max(), max_points)
+
+    return {
+        'Frequency': freq,
+        'Net Cashflow': downsample.resample(lcr[['date', 'net_cashflow']], freq, how='sum'),
+        'LCR': downsample.lttb_frame(lcr[['date', 'lcr']], 'date', 'lcr', max_points),
+        'NSFR': downsample.lttb_frame(nsfr[['date', 'NSFR']], 'date', 'NSFR', max_points),
+    }
 
-    df = pd.concat([daily_asf.rename("ASF"), daily_rsf.rename("RSF")], axis=1).fillna(0)
-    df['NSFR'] = df['ASF'] / df['RSF'].replace(0, np.nan)
-    return df.reset_index()
 
 # ==========================================================
 # ✅ Capital Adequacy (CET1, Tier1, Total Capital)
 # ==========================================================
+@instrument_compute
 def calculate_capital_ratios(scenario_id=None):
     """
-    Calculates CET1, Tier1, Total Capital ratios against RWA
+    Calculates CET1, Tier1, Total Capital ratios against RWA (output floor
+    applied per date). RWA is the stored rwa_amount kept in line with the
+    engine by credit_risk.reprice_table, from the same grouped query as
+    calculate_output_floor_timeseries.
     """
-    rwa = queries.get_rwa(scenario_id=scenario_id)
     balance = queries.get_balance_sheet(scenario_id=scenario_id)
 
-    total_rwa = rwa['rwa_amount'].sum()
+    floor = credit_risk.output_floor_table(queries.get_rwa_by_approach_daily(scenario_id=scenario_id))
+    total_rwa = floor['Floored RWA'].sum()
 
     def get_capital(item):
         return balance[balance['item'] == item]['amount'].sum()
@@ -230,257 +348,267 @@ def calculate_capital_ratios(scenario_id=None):
         'CET1 Ratio': cet1 / total_rwa if total_rwa > 0 else np.inf,
         'Tier1 Ratio': tier1 / total_rwa if total_rwa > 0 else np.inf,
         'Total Capital Ratio': total_capital / total_rwa if total_rwa > 0 else np.inf,
-        'RWA': total_rwa
+        'RWA': total_rwa,
+        'Floor Add-on': floor['Floor Add-on'].sum()
     }
 
     return ratios
-    
-    
-def calculate_rwa_by_approach_and_asset_class(scenario_id=None):
-    rwa = queries.get_rwa(scenario_id=scenario_id)
-    grouped = rwa.groupby(['approach', 'asset_class'])['rwa_amount'].sum().reset_index()
-    return grouped.sort_values('rwa_amount', ascending=False)
-    
-def calculate_rwa_by_approach(scenario_id=None):
-    rwa = queries.get_rwa(scenario_id=scenario_id)
-    grouped = rwa.groupby('approach')['rwa_amount'].sum().reset_index()
-    return grouped.sort_values('rwa_amount', ascending=False)
-
-    
-    
-def calculate_capital_timeseries(scenario_id=None):
-    rwa = queries.get_rwa(scenario_id=scenario_id)
-    balance = queries.get_balance_sheet(scenario_id=scenario_id)
 
-    rwa_by_date = rwa.groupby('date')['rwa_amount'].sum()
-    capital_by_date = balance.pivot_table(index='date', columns='item', values='amount', aggfunc='sum')
 
-    df = pd.concat([rwa_by_date, capital_by_date], axis=1).fillna(0)
+# ==========================================================
+# ✅ Hierarchical Breakdowns (RWA, Cashflows)
+# ==========================================================
+@instrument_compute
+def calculate_rollup(table, depth=None, scenario_id=None):
+    """
+    Every level of the RWA (approach > asset_class > exposure_id) or
+    cashflow (direction > product > counterparty) hierarchy from one ROLLUP
+    query, as a tidy frame for treemaps and sunbursts: id, parent, label
+    and level per node (root 'Total' at level 0), the level columns and
+    the summed measures. Parent values equal the sum of their children.
+    """
+    levels = queries.ROLLUPS[table][0][:depth]
+    df = queries.get_rollup(table, depth=depth, scenario_id=scenario_id)
+
+    grouping_id = df['grouping_id'].to_numpy(dtype=np.int64)
+    rolled_up = sum((grouping_id >> i) & 1 for i in range(len(levels)))
+    df['level'] = len(levels) - rolled_up
+
+    ids = pd.Series('Total', index=df.index)
+    parents = pd.Series('', index=df.index)
+    labels = pd.Series('Total', index=df.index)
+    for i, col in enumerate(levels):
+        inside = df['level'] > i
+        name = df[col].fillna('None').astype(str)
+        parents = parents.where(~inside, ids)
+        ids = ids.where(~inside, ids + '/' + name)
+        labels = labels.where(~inside, name)
+        df[col] = df[col].where(inside)
+
+    df['id'], df['parent'], df['label'] = ids, parents, labels
+    measures = list(queries.ROLLUPS[table][1])
+    df[measures] = df[measures].astype(float)
+
+    df = df.sort_values(['level', 'id'])
+    return df[['id', 'parent', 'label', 'level'] + levels + measures + ['row_count']].reset_index(drop=True)
+
+
+@instrument_compute
+def calculate_nsfr_breakdown(scenario_id=None, product=None, counterparty=None):
+    """
+    ASF of inflows and RSF of outflows per product, with the mean factor
+    weights, reduced from the leaves of the cashflow rollup (filters take
+    one label or a list).
+    """
+    rollup = calculate_rollup('cashflows', scenario_id=scenario_id)
+    leaves = rollup[rollup['level'] == 3]
+    for col, values in (('product', product), ('counterparty', counterparty)):
+        if values is not None:
+            values = values if isinstance(values, (list, tuple, set)) else [values]
+            leaves = leaves[leaves[col].isin(values)]
+
+    def by_product(direction, measure, factor):
+        flows = leaves[leaves['direction'] == direction].groupby('product')
+        totals = flows[[measure, factor, 'row_count']].sum()
+        totals = totals[totals['row_count'] > 0]
+        return totals[measure], totals[factor] / totals['row_count']
+
+    asf_components, asf_weights = by_product('inflow', 'asf', 'asf_factor')
+    rsf_components, rsf_weights = by_product('outflow', 'rsf', 'rsf_factor')
+    return {
+        'ASF_components': asf_components.to_dict(),
+        'RSF_components': rsf_components.to_dict(),
+        'ASF Weights': asf_weights,
+        'RSF Weights': rsf_weights
+    }
 
-    df['CET1 Ratio'] = df['CET1'] / df['rwa_amount']
-    df['Tier1 Ratio'] = df['Tier1'] / df['rwa_amount']
-    df['Total Capital Ratio'] = df['Total Capital'] / df['rwa_amount']
 
-    df = df.reset_index()
+@instrument_compute
+def calculate_output_floor_timeseries(scenario_id=None):
+    """
+    IRB output floor per (scenario_id, date): STD and IRB RWA from one
+    grouped SQL query, the floor (output_floor * STD RWA), floored RWA and
+    whether the floor binds. No exposure rows are fetched.
+    """
+    daily = queries.get_rwa_by_approach_daily(scenario_id=scenario_id)
+    df = credit_risk.output_floor_table(daily)
     df['date'] = pd.to_datetime(df['date'])
-
     return df
 
 
-def calculate_capital_ratios_under_rwa_shock(rwa_shock_pct=0.0, scenario_id=None):
+@instrument_compute
+def calculate_capital_timeseries(scenario_id=None):
     """
-    Simulates capital ratios under an RWA increase (e.g. downgrade).
-    rwa_shock_pct: e.g. 0.25 for +25% RWA
+    CET1, Tier1 and Total Capital ratios per date against floored RWA. The
+    pivot and join run in PostgreSQL, so only one row per date comes back.
+    Dates without RWA get NaN ratios rather than inf.
     """
-    rwa = queries.get_rwa(scenario_id=scenario_id)
-    balance = queries.get_balance_sheet(scenario_id=scenario_id)
+    df = queries.get_capital_by_date(
+        scenario_id=scenario_id, output_floor=parameters.load_params(scenario_id).output_floor
+    )
+    df = df.rename(columns={
+        'floored_rwa': 'Floored RWA', 'cet1': 'CET1', 'tier1': 'Tier1', 'total_capital': 'Total Capital'
+    })
+    for col in ['rwa_amount', 'Floored RWA', 'CET1', 'Tier1', 'Total Capital']:
+        df[col] = df[col].astype(float)
 
-    total_rwa = rwa['rwa_amount'].sum() * (1 + rwa_shock_pct)
+    total_rwa = df['Floored RWA'].where(df['Floored RWA'] > 0)
+    df['CET1 Ratio'] = df['CET1'].fillna(0) / total_rwa
+    df['Tier1 Ratio'] = df['Tier1'].fillna(0) / total_rwa
+    df['Total Capital Ratio'] = df['Total Capital'].fillna(0) / total_rwa
 
-    def get_capital(item):
-        return balance[balance['item'] == item]['amount'].sum()
+    df['date'] = pd.to_datetime(df['date'])
 
-    cet1 = get_capital('CET1')
-    tier1 = get_capital('Tier1')
-    total_capital = get_capital('Total Capital')
+    return df
 
-    return {
-        'RWA (shocked)': total_rwa,
-        'CET1 Ratio': cet1 / total_rwa if total_rwa > 0 else np.inf,
-        'Tier1 Ratio': tier1 / total_rwa if total_rwa > 0 else np.inf,
-        'Total Capital Ratio': total_capital / total_rwa if total_rwa > 0 else np.inf
-    }
 
+@instrument_compute
+def calculate_capital_ratios_under_rwa_shock(rwa_shock_pct=0.0, scenario_id=None, kernel=None):
+    """
+    Simulates capital ratios under an RWA increase (e.g. downgrade).
+    rwa_shock_pct: e.g. 0.25 for +25% RWA
+    Evaluated on the scenario's sensitivity kernel; pass the page's kernel
+    to skip the data-version check on slider reruns.
+    """
+    kernel = kernel or sensitivity.get_kernel(scenario_id)
+    return kernel.capital_ratios(rwa_shock_pct)
 
 
 # ==========================================================
 # ✅ IRRBB - PV01 Profile
 # ==========================================================
+@instrument_compute
 def calculate_pv01_profile(scenario_id=None):
     """
-    Calculates PV01 by tenor bucket
+    Calculates PV01 by tenor bucket from the key-rate PV01 engine
+    (python -m src.irrbb); falls back to the stored instrument PV01 by
+    bucket until it has run.
     """
-    irrbb = queries.get_irrbb(scenario_id=scenario_id)
-
-    pv01_by_bucket = irrbb.groupby('tenor_bucket')['pv01'].sum().reset_index()
-
-    return pv01_by_bucket
+    pv01_by_bucket = irrbb.get_pv01_by_bucket(scenario_id=scenario_id)
+    return pv01_by_bucket.rename_axis('tenor_bucket').reset_index(name='pv01')
 
 
 # ==========================================================
 # ✅ IRRBB - ∆EVE Approximation (Simple Shock)
 # ==========================================================
-def calculate_eve_sensitivity(shock_bps=200, scenario_id=None):
+@instrument_compute
+def calculate_eve_sensitivity(shock_bps=200, scenario_id=None, kernel=None):
     """
     Simple EVE sensitivity → sum(PV01) * shock in bps
+    Evaluated on the scenario's sensitivity kernel; pass the page's kernel
+    to skip the data-version check on slider reruns.
     """
-    irrbb = queries.get_irrbb(scenario_id=scenario_id)
+    kernel = kernel or sensitivity.get_kernel(scenario_id)
+    return kernel.eve(shock_bps)
 
-    total_pv01 = irrbb['pv01'].sum()
 
-    delta_eve = total_pv01 * (shock_bps / 10000)
-
-    return {
-        'Total PV01': total_pv01,
-        'Shock (bps)': shock_bps,
-        'Delta EVE': delta_eve
-    }
-    
-def calculate_nii_sensitivity(shock_bps=200, scenario_id=None):
+@instrument_compute
+def calculate_nii_sensitivity(shock_bps=200, scenario_id=None, kernel=None):
     """
-    Calculates ∆NII under a parallel shock using repricing gap from cashflows
+    Calculates ∆NII under a parallel shock from the time-weighted repricing
+    gaps over the 12-month horizon. Evaluated on the scenario's sensitivity
+    kernel; pass the page's kernel to skip the data-version check on slider
+    reruns.
     """
-    cashflows = queries.get_cashflows(scenario_id=scenario_id)
-
-    # If not already present, assign buckets by maturity gap
-    if 'bucket' not in cashflows.columns:
-        cashflows['date'] = pd.to_datetime(cashflows['date'])
-        cashflows['maturity_date'] = pd.to_datetime(cashflows['maturity_date'])
-        cashflows['maturity_days'] = (cashflows['maturity_date'] - cashflows['date']).dt.days
-
-        def assign_bucket(days):
-            if days <= 7:
-                return '0-7d'
-            elif days <= 30:
-                return '8-30d'
-            elif days <= 90:
-                return '31-90d'
-            elif days <= 180:
-                return '91-180d'
-            elif days <= 365:
-                return '181-365d'
-            else:
-                return '>1y'
-
-        cashflows['bucket'] = cashflows['maturity_days'].apply(assign_bucket)
-
-    # Sum signed cashflows (inflow - outflow) per bucket
-    cashflows['signed_amount'] = cashflows.apply(
-        lambda row: row['amount'] if row['direction'] == 'inflow' else -row['amount'], axis=1
-    )
+    kernel = kernel or sensitivity.get_kernel(scenario_id)
+    return kernel.nii(shock_bps)
 
-    gap_by_bucket = cashflows.groupby('bucket')['signed_amount'].sum()
 
-    # Apply interest rate shock
-    delta_nii = (gap_by_bucket * (shock_bps / 10_000)).sum()
-
-    return {
-        'Total Repricing Gap': gap_by_bucket.sum(),
-        'Shock (bps)': shock_bps,
-        'Delta NII': delta_nii
-    }
-    
 # ==========================================================
 # Calculate EBA-Defined IRRBB Shocks
 # ==========================================================
+@instrument_compute
 def calculate_eve_eba_scenarios(scenario_id=None):
-    irrbb = queries.get_irrbb(scenario_id=scenario_id)
-
-    # PV01 by tenor bucket
-    pv01_by_bucket = irrbb.groupby('tenor_bucket')['pv01'].sum()
-
-    # Sort buckets in expected order
-    buckets = ['0-1y', '1-3y', '3-5y', '5-10y', '10y+']
-    pv01_by_bucket = pv01_by_bucket.reindex(buckets).fillna(0)
-
-    # EBA shocks per bucket (bps)
-    eba_shocks = {
-        'Parallel Up':      [200, 200, 200, 200, 200],
-        'Parallel Down':    [-200, -200, -200, -200, -200],
-        'Steepener':        [-50, 0, 100, 150, 200],
-        'Flattener':        [250, 200, 150, 100, 50],
-        'Short Rate Up':    [300, 200, 100, 0, 0],
-        'Short Rate Down':  [-300, -200, -100, 0, 0]
-    }
+    """
+    ∆EVE under each EBA shock by full revaluation of the instruments'
+    cashflows on the shifted curves (discount factors memoized per curve).
+    """
+    irrbb_df = queries.get_irrbb(scenario_id=scenario_id)
+    delta_eve = irrbb.eve_contributions(irrbb_df).sum(axis=0)
 
-    results = []
-    for scenario, shifts in eba_shocks.items():
-        delta_eve = sum([
-            pv01 * (shock / 10_000)
-            for pv01, shock in zip(pv01_by_bucket.values, shifts)
-        ])
-        results.append({'Scenario': scenario, 'Delta EVE': delta_eve})
+    return pd.DataFrame({'Scenario': irrbb.EBA_SHOCKS.index, 'Delta EVE': delta_eve})
 
-    df = pd.DataFrame(results)
-    df.columns = ['Scenario', 'Delta EVE']
-    return df
+
+@instrument_compute
+def calculate_eve_attribution(top_n=10, shocks=None, scenario_id=None):
+    """
+    Top ∆EVE contributing instruments under each shock (EBA shocks by
+    default), from the instruments x shocks contribution matrix.
+    """
+    shocks = irrbb.EBA_SHOCKS if shocks is None else shocks
+    irrbb_df = queries.get_irrbb(scenario_id=scenario_id)
+    contributions = irrbb.eve_contributions(irrbb_df, shocks)
+    return irrbb.top_contributors(irrbb_df, contributions, shocks.index, top_n=top_n)
     
     
+@instrument_compute
 def calculate_nii_eba_scenarios(scenario_id=None):
-    irrbb = queries.get_irrbb(scenario_id=scenario_id)
-
-    # Only use short-term buckets for NII — typically '0-1y'
-    short_buckets = ['0-1y']  # Optionally add '1-3y' if justified
-    irrbb_short = irrbb[irrbb['tenor_bucket'].isin(short_buckets)]
-
-    # Group PV01 by bucket
-    pv01_by_bucket = irrbb_short.groupby('tenor_bucket')['pv01'].sum()
-
-    # Ensure we align with the EBA shocks
-    eba_shocks = {
-        'Parallel Up':      [200],
-        'Parallel Down':    [-200],
-        'Steepener':        [-50],
-        'Flattener':        [250],
-        'Short Rate Up':    [300],
-        'Short Rate Down':  [-300]
-    }
+    """
+    ∆NII under each EBA shock from the time-weighted repricing gaps over
+    the 12-month horizon.
+    """
+    delta_nii = irrbb.delta_nii(irrbb.get_repricing_gaps([scenario_id]), irrbb.EBA_SHOCKS)
 
-    results = []
-    for scenario, shocks in eba_shocks.items():
-        delta_nii = sum([
-            pv01_by_bucket.get(bucket, 0) * (shock / 10_000)
-            for bucket, shock in zip(short_buckets, shocks)
-        ])
-        results.append({'Scenario': scenario, 'Delta NII': delta_nii})
+    return pd.DataFrame({'Scenario': irrbb.EBA_SHOCKS.index, 'Delta NII': delta_nii.iloc[0].to_numpy()})
 
-    return pd.DataFrame(results)
-    
+
+@instrument_compute
+def calculate_nii_matrix(shocks=None, scenario_ids=None):
+    """
+    ∆NII for every scenario x shock in one matrix product (EBA shocks and
+    all scenarios by default). shocks is a frame like irrbb.EBA_SHOCKS.
+    """
+    shocks = irrbb.EBA_SHOCKS if shocks is None else shocks
+    return irrbb.delta_nii(irrbb.get_repricing_gaps(scenario_ids), shocks)
+
+
+@instrument_compute
 def calculate_custom_shock_effects(shock_dict, scenario_id=None):
     """
     Applies user-defined yield curve shifts and computes ∆EVE and ∆NII.
     """
-    irrbb = queries.get_irrbb(scenario_id=scenario_id)
-    pv01_by_bucket = irrbb.groupby('tenor_bucket')['pv01'].sum()
-    buckets = ['0-1y', '1-3y', '3-5y', '5-10y', '10y+']
-    pv01_by_bucket = pv01_by_bucket.reindex(buckets).fillna(0)
+    irrbb_df = queries.get_irrbb(scenario_id=scenario_id)
+    shifted_bps = [shock_dict[bucket] for bucket in curves.BASELINE_CURVE.labels]
+    shifted = curves.BASELINE_CURVE.shifted(shifted_bps)
 
-    delta_eve = sum([
-        pv01_by_bucket[bucket] * (shock_dict[bucket] / 10_000)
-        for bucket in buckets
-    ])
-    delta_nii = delta_eve  # Same logic unless you have a different cashflow engine
+    delta_eve = float(irrbb.revaluation_matrix(irrbb_df, [shifted]).sum())
+    shocks = pd.DataFrame([shifted_bps], index=['Custom'], columns=curves.BASELINE_CURVE.labels)
+    delta_nii = float(irrbb.delta_nii(irrbb.get_repricing_gaps([scenario_id]), shocks).iloc[0, 0])
 
     return delta_eve, delta_nii
     
+@instrument_compute
 def calculate_irrbb_risk_summary(shock_bps_list=None, scenario_id=None):
     """
     Computes key IRRBB KPIs: Total PV01, Max ∆EVE (as % Tier 1), Max ∆NII, Breach flags
     """
-    irrbb = queries.get_irrbb(scenario_id=scenario_id)
+    irrbb_df = queries.get_irrbb(scenario_id=scenario_id)
     tier1 = queries.get_balance_sheet(scenario_id=scenario_id)
     tier1_cap = tier1[tier1['item'] == 'Tier1']['amount'].sum()
 
-    # Total PV01
-    total_pv01 = irrbb['pv01'].sum()
+    # Total PV01 (key-rate engine, as in calculate_pv01_profile)
+    total_pv01 = irrbb.get_pv01_by_bucket(scenario_id=scenario_id).sum()
 
     # Max ∆EVE
-    max_eve = max([total_pv01 * (bps / 10_000) for bps in shock_bps_list])
+    max_eve = max([total_pv01 * bps for bps in shock_bps_list])
     
     #tier1_cap_eur = tier1_cap * 1_000_000  # Convert from millions to EUR
     eve_ratio = max_eve / tier1_cap
 
     # Max ∆EVE as % Tier 1 Capital
     eve_pct_tier1 = max_eve / tier1_cap if tier1_cap > 0 else 0
-    eve_breach = eve_pct_tier1 > 0.15
+    eve_breach = eve_pct_tier1 > parameters.load_params(scenario_id).eve_tier1_breach_ratio
 
-    # Max ∆NII
-    cashflows = queries.get_cashflows(scenario_id=scenario_id)
-    cashflows['signed_amount'] = cashflows.apply(
-        lambda row: row['amount'] if row['direction'] == 'inflow' else -row['amount'], axis=1
-    )
-    gap_by_bucket = cashflows.groupby('bucket')['signed_amount'].sum()
-    max_nii = max([ (gap_by_bucket * (bps / 10_000)).sum() for bps in shock_bps_list ])
+    # On a breach, the instruments driving the worst shock
+    contributors = None
+    if eve_breach:
+        worst = irrbb.parallel_shocks([max(shock_bps_list, key=lambda bps: total_pv01 * bps)])
+        irrbb_df = irrbb_df.assign(pv01=irrbb.key_rate_pv01(irrbb_df).sum(axis=1))
+        contributors = irrbb.top_contributors(irrbb_df, irrbb.eve_contributions(irrbb_df, worst), worst.index)
+
+    # Max ∆NII (time-weighted repricing gaps, all parallel shocks at once)
+    nii = irrbb.delta_nii(irrbb.get_repricing_gaps([scenario_id]), irrbb.parallel_shocks(shock_bps_list))
+    max_nii = nii.to_numpy().max()
 
     return {
         'Total PV01': total_pv01,
@@ -488,10 +616,151 @@ def calculate_irrbb_risk_summary(shock_bps_list=None, scenario_id=None):
         'Max ∆EVE (%)': eve_pct_tier1,
         '∆EVE Breach': eve_breach,
         'Max ∆NII': max_nii,
-        '∆EVE Ratio': eve_ratio
+        '∆EVE Ratio': eve_ratio,
+        'Top ∆EVE Contributors': contributors
+    }
+
+
+# ==========================================================
+# ✅ Cashflow-Level Liquidity Stress
+# ==========================================================
+@instrument_compute
+def calculate_liquidity_stress(stresses, scenario_id=None):
+    """
+    Exact LCR and NSFR under each stress definition (see
+    stress.rate_matrices), one row per stress. Cashflows are aggregated
+    into cells once and every stress is a matrix product over those cells.
+    """
+    params = parameters.load_params(scenario_id)
+    haircut_map = params.haircut_map
+    cells = cube.get_cube(scenario_id).stress_cells(haircut_map)
+    return stress.evaluate_stresses(cells, stresses, inflow_cap=params.lcr_inflow_cap)
+
+
+@instrument_compute
+def calculate_survival_horizon(stresses=None, scenario_id=None, as_of=None, horizon_days=365):
+    """
+    Days until cumulative net outflows exhaust HQLA per scenario and stress
+    (all scenarios when scenario_id is None), plus the cumulative gap
+    curves. See survival.survival_horizon.
+    """
+    cashflows = queries.get_cashflows(scenario_id=scenario_id)
+    cells = survival.build_dated_cells(cashflows, as_of=as_of, horizon_days=horizon_days)
+    horizon, curve = survival.survival_horizon(cells, stresses)
+    return {
+        'As Of': cells['as_of'],
+        'Horizon': horizon,
+        'Cumulative Gap': curve,
+    }
+
+
+# ==========================================================
+# ✅ Liquidity Drill-down (in-memory cube)
+# ==========================================================
+@instrument_compute
+def calculate_liquidity_drilldown(scenario_id=None, product=None, counterparty=None, hqlatype=None):
+    """
+    LCR, NSFR, HQLA composition, ASF/RSF factor weights and the gap heatmap
+    for any slice of the cashflows (filters take one label or a list).
+    Everything is reduced from the scenario's in-memory cube, which is
+    built once per data version, so changing filters never re-reads rows.
+    """
+    params = parameters.load_params(scenario_id)
+    haircut_map = params.haircut_map
+    inflow_cap = params.lcr_inflow_cap
+
+    sliced = cube.get_cube(scenario_id).slice(product=product, counterparty=counterparty, hqlatype=hqlatype)
+    asf_weights, rsf_weights = sliced.factor_weights()
+    return {
+        'LCR': sliced.lcr(haircut_map, inflow_cap),
+        'NSFR': sliced.nsfr(),
+        'HQLA': sliced.hqla_composition(haircut_map),
+        'ASF Weights': asf_weights,
+        'RSF Weights': rsf_weights,
+        'Gap Heatmap': sliced.gap_heatmap(inflow_cap)
     }
 
 
+@instrument_compute
+def calculate_gap_heatmap_view(
+    scenario_id=None, product=None, counterparty=None, start_date=None, end_date=None, max_columns=180
+):
+    """
+    Chart-ready gap heatmap for the visible date range with at most
+    max_columns columns: daily (inflow-capped) net flows are averaged per
+    week, month or quarter when the range holds more days than that.
+    """
+    params = parameters.load_params(scenario_id)
+    sliced = cube.get_cube(scenario_id).slice(product=product, counterparty=counterparty)
+
+    # The cap applies per day, so clipping days after the fact is exact
+    heatmap = sliced.gap_heatmap(params.lcr_inflow_cap)
+    dates = pd.to_datetime(heatmap.columns)
+    visible = np.ones(len(dates), dtype=bool)
+    if start_date is not None:
+        visible &= dates >= pd.Timestamp(start_date)
+    if end_date is not None:
+        visible &= dates <= pd.Timestamp(end_date)
+    heatmap = heatmap.loc[:, visible]
+
+    if heatmap.columns.empty:
+        return {'Frequency': 'D', 'Gap Heatmap': heatmap}
+    freq = downsample.choose_frequency(heatmap.columns.min(), heatmap.columns.max(), max_columns)
+    return {'Frequency': freq, 'Gap Heatmap': downsample.aggregate_columns(heatmap, freq, how='mean')}
+
+
+# ==========================================================
+# ✅ Scenario Overlays
+# ==========================================================
+@instrument_compute
+def calculate_scenario_overlays(scenario_ids=None):
+    """
+    Headline metrics for every scenario derived on the fly from the
+    baseline rows and the shocks in the scenarios table, so a scenario
+    needs no materialized cashflow/RWA/IRRBB copies.
+    """
+    return overlays.overlay_summary(scenario_ids=scenario_ids)
+
+
+@instrument_compute
+def calculate_scenario_diff(base_id, other_id, top_n=10):
+    """
+    Metric and component deltas (HQLA by level, outflows by counterparty,
+    RWA by asset class, PV01 by bucket) of one scenario against another,
+    with the biggest drivers ranked. Served from aggregates shared by all
+    scenarios, so further comparisons cost no queries.
+    """
+    return scenario_diff.scenario_diff(base_id, other_id, top_n=top_n)
+
+
+@instrument_compute
+def calculate_scenario_deltas(base_id, scenario_ids=None):
+    """
+    Headline metric deltas of every scenario against base_id.
+    """
+    return scenario_diff.scenario_deltas(base_id, scenario_ids=scenario_ids)
+
+
+# ==========================================================
+# ✅ Incrementally Maintained KPI History
+# ==========================================================
+@instrument_compute
+def calculate_kpi_timeseries(scenario_id=None):
+    """
+    Daily KPI history from kpi_results (kept current by src.incremental),
+    one row per (scenario_id, date) and one column per metric. Reads
+    pre-computed rows only, no source rescan.
+    """
+    kpis = queries.get_kpi_results(scenario_id=scenario_id)
+    df = kpis.pivot_table(
+        index=['scenario_id', 'date'], columns='metric', values='value', aggfunc='first', dropna=False
+    )
+    df.columns.name = None
+    df = df.reset_index()
+    df['date'] = pd.to_datetime(df['date'])
+    return df
+
+
 # ==========================================================
 # ✅ Example Run
 # ==========================================================
@@ -499,56 +768,34 @@ if __name__ == "__main__":
     print("LCR:", calculate_lcr())
     print("NSFR:", calculate_nsfr())
     print("Capital Ratios:", calculate_capital_ratios())
+    output_floor = calculate_output_floor_timeseries()
+    print(f"Output Floor: binding on {output_floor['Floor Binding'].sum()} of {len(output_floor)} scenario-dates")
     print("PV01 Profile:")
     print(calculate_pv01_profile())
     print("∆EVE Sensitivity:", calculate_eve_sensitivity(200))
 
 
+@instrument_compute
 def run_stress_test(
     shock_bps=200,
     retail_withdrawal_pct=0.2,
     wholesale_withdrawal_pct=0.4,
     rwa_stress_pct=0.1,
-    scenario_id=None
+    scenario_id=None,
+    kernel=None
 ):
-    # --- IRRBB Effects ---
-    eve_result = calculate_eve_sensitivity(shock_bps=shock_bps, scenario_id=scenario_id)
-    nii_result = calculate_nii_sensitivity(shock_bps=shock_bps, scenario_id=scenario_id)
-
-    delta_eve = eve_result['Delta EVE']
-    delta_nii = nii_result['Delta NII']
-
-    # --- Liquidity Ratios ---
-    lcr_df = calculate_lcr_timeseries(scenario_id)
-    latest_lcr = lcr_df.iloc[-1]  # assume latest date
-    base_lcr = latest_lcr['lcr']
-
-    nsfr_result = calculate_nsfr(scenario_id)
-    base_nsfr = nsfr_result['NSFR']
-
-    # Stressed liquidity assumptions (simple proportional deterioration)
-    stressed_lcr = base_lcr * (1 - retail_withdrawal_pct - wholesale_withdrawal_pct / 2)
-    stressed_nsfr = base_nsfr * (1 - wholesale_withdrawal_pct)
-
-    # --- Capital Ratios ---
-    capital_result = calculate_capital_ratios(scenario_id)
-    base_cet1 = capital_result['CET1 Ratio']
-    base_tier1 = capital_result['Tier1 Ratio']
-
-    stressed_cet1 = base_cet1 / (1 + rwa_stress_pct)
-    stressed_tier1 = base_tier1 / (1 + rwa_stress_pct)
-
-    return {
-        "LCR (Base)": base_lcr,
-        "LCR (Stressed)": stressed_lcr,
-        "NSFR (Base)": base_nsfr,
-        "NSFR (Stressed)": stressed_nsfr,
-        "CET1 Ratio (Base)": base_cet1,
-        "CET1 Ratio (Stressed)": stressed_cet1,
-        "Tier1 Ratio (Base)": base_tier1,
-        "Tier1 Ratio (Stressed)": stressed_tier1,
-        "∆EVE (Base)": delta_eve,
-        "∆EVE (Stressed)": delta_eve,  # assumed same
-        "∆NII (Base)": delta_nii,
-        "∆NII (Stressed)": delta_nii,  # assumed same
-    }
\ No newline at end of file
+    """
+    Base vs. stressed LCR/NSFR, capital ratios, ∆EVE and ∆NII for the stress
+    testing sliders, evaluated on the scenario's sensitivity kernel (pass
+    the page's kernel to skip the data-version check).
+    LCR and NSFR are decimal ratios over the scenario's whole cashflow
+    portfolio (as in calculate_liquidity_stress), not the latest date's
+    value from calculate_lcr_timeseries.
+    """
+    kernel = kernel or sensitivity.get_kernel(scenario_id)
+    return kernel.stress_test(
+        shock_bps=shock_bps,
+        retail_withdrawal_pct=retail_withdrawal_pct,
+        wholesale_withdrawal_pct=wholesale_withdrawal_pct,
+        rwa_stress_pct=rwa_stress_pct
+    )
@@ -0,0 +1,210 @@
+import functools
+import pandas as pd
+import numpy as np
+from src import queries, parameters, stress
+from src.instrumentation import track_cache
+from src.accumulators import assign_gap_bucket, HQLA_TYPES
+
+
+# ==========================================================
+# ✅ Dense Liquidity Cube
+# ==========================================================
+class LiquidityCube:
+    """
+    Cashflows pre-aggregated into dense NumPy arrays with one axis per
+    dimension (categorical codes) and one array per measure. Every
+    liquidity view is a reduction over some axes, so slicing and
+    drill-downs never go back to the rows.
+    """
+
+    DIMENSIONS = ['product', 'counterparty', 'direction', 'hqlatype', 'date', 'bucket']
+    MEASURES = ['amount', 'asf', 'rsf', 'asf_factor', 'rsf_factor', 'count']
+
+    def __init__(self, labels, data):
+        self.labels = labels    # dim -> pd.Index of category labels
+        self.data = data        # measure -> ndarray shaped by the labels
+
+    @classmethod
+    def from_cashflows(cls, cashflows):
+        dates = pd.to_datetime(cashflows['date'])
+        maturity_days = (pd.to_datetime(cashflows['maturity_date']) - dates).dt.days
+        columns = {
+            # Missing categories get their own 'None' label rather than dropping rows
+            'product': cashflows['product'].fillna('None'),
+            'counterparty': cashflows['counterparty'].fillna('None'),
+            'direction': cashflows['direction'].fillna('None'),
+            'hqlatype': cashflows['hqlatype'].fillna('None'),
+            'date': dates,
+            'bucket': pd.Series(assign_gap_bucket(maturity_days)),
+        }
+
+        labels, codes = {}, []
+        for dim in cls.DIMENSIONS:
+            categorical = pd.Categorical(columns[dim])
+            labels[dim] = pd.Index(categorical.categories, name=dim)
+            codes.append(categorical.codes)
+        shape = tuple(len(labels[dim]) for dim in cls.DIMENSIONS)
+
+        flat = np.ravel_multi_index(codes, shape) if len(cashflows) else np.array([], dtype=np.int64)
+        size = int(np.prod(shape))
+        amount = cashflows['amount'].astype(float).to_numpy()
+        asf_factor = cashflows['asf_factor'].astype(float).fillna(0).to_numpy()
+        rsf_factor = cashflows['rsf_factor'].astype(float).fillna(0).to_numpy()
+        weights = {
+            'amount': amount,
+            'asf': amount * asf_factor,
+            'rsf': amount * rsf_factor,
+            'asf_factor': asf_factor,
+            'rsf_factor': rsf_factor,
+            'count': None,
+        }
+        data = {
+            measure: np.bincount(flat, weights=w, minlength=size).astype(float).reshape(shape)
+            for measure, w in weights.items()
+        }
+        return cls(labels, data)
+
+    # ------------------------------------------------------
+    # Slicing and reductions
+    # ------------------------------------------------------
+    def slice(self, **where):
+        """
+        Sub-cube keeping only the given labels per dimension, e.g.
+        cube.slice(product=['loan'], counterparty='retail').
+        """
+        labels, data = dict(self.labels), dict(self.data)
+        for dim, values in where.items():
+            if values is None:
+                continue
+            values = values if isinstance(values, (list, tuple, set, pd.Index, np.ndarray)) else [values]
+            positions = np.flatnonzero(self.labels[dim].isin(values))
+            axis = self.DIMENSIONS.index(dim)
+            labels[dim] = self.labels[dim][positions]
+            data = {m: np.take(a, positions, axis=axis) for m, a in data.items()}
+        return LiquidityCube(labels, data)
+
+    def total(self, measure, by=()):
+        """
+        Sum of a measure over every dimension not listed in `by`. Returns a
+        scalar, or a Series indexed by the `by` labels.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        keep = [self.DIMENSIONS.index(dim) for dim in by]
+        drop = tuple(i for i in range(len(self.DIMENSIONS)) if i not in keep)
+        reduced = self.data[measure].sum(axis=drop)
+        if not by:
+            return float(reduced)
+        # Remaining axes are in cube order; put them in the order asked for
+        reduced = np.transpose(reduced, np.argsort(np.argsort(keep)))
+        index = pd.MultiIndex.from_product([self.labels[d] for d in by]) if len(by) > 1 else self.labels[by[0]]
+        return pd.Series(reduced.ravel(), index=index, name=measure)
+
+    def _by_direction(self, measure, direction, by=()):
+        return self.slice(direction=direction).total(measure, by=by)
+
+    # ------------------------------------------------------
+    # Liquidity views (same shapes as compute.py)
+    # ------------------------------------------------------
+    def hqla_composition(self, haircut_map):
+        """
+        Pre- and post-haircut HQLA per level (the HQLA treemap data).
+        """
+        pre = self.total('amount', by='hqlatype')
+        present = self.total('count', by='hqlatype') > 0
+        pre = pre[present & pre.index.isin(HQLA_TYPES)]
+        post = pre * (1 - pre.index.map(lambda t: haircut_map.get(t, 1)).to_numpy())
+        return pd.DataFrame({
+            'HQLA Type': pre.index.astype(str),
+            'Pre-Haircut': pre.values,
+            'Post-Haircut': post.values,
+        })
+
+    def lcr(self, haircut_map, inflow_cap):
+        """
+        Same result dict as compute.calculate_lcr.
+        """
+        total_hqla = self.hqla_composition(haircut_map)['Post-Haircut'].sum()
+        outflows = self._by_direction('amount', 'outflow')
+        inflows = self._by_direction('amount', 'inflow')
+        net_outflows = outflows - min(inflows, outflows * inflow_cap)
+        return {
+            'HQLA': total_hqla,
+            'Outflows': outflows,
+            'Inflows': inflows,
+            'NetOutflows': net_outflows,
+            'LCR': total_hqla / net_outflows if net_outflows > 0 else np.inf
+        }
+
+    def nsfr(self):
+        """
+        Same result dict as compute.calculate_nsfr.
+        """
+        asf_components = self._by_direction('asf', 'inflow', by='product')
+        rsf_components = self._by_direction('rsf', 'outflow', by='product')
+        present_in = self._by_direction('count', 'inflow', by='product') > 0
+        present_out = self._by_direction('count', 'outflow', by='product') > 0
+        asf, rsf = asf_components.sum(), rsf_components.sum()
+        return {
+            'ASF': asf,
+            'RSF': rsf,
+            'NSFR': asf / rsf if rsf > 0 else np.inf,
+            'ASF_components': asf_components[present_in].to_dict(),
+            'RSF_components': rsf_components[present_out].to_dict()
+        }
+
+    def factor_weights(self):
+        """
+        Mean ASF factor of inflows and mean RSF factor of outflows per
+        product, as (asf_weights, rsf_weights) Series.
+        """
+        in_count = self._by_direction('count', 'inflow', by='product')
+        out_count = self._by_direction('count', 'outflow', by='product')
+        asf_weights = (self._by_direction('asf_factor', 'inflow', by='product') / in_count)[in_count > 0]
+        rsf_weights = (self._by_direction('rsf_factor', 'outflow', by='product') / out_count)[out_count > 0]
+        return asf_weights, rsf_weights
+
+    def gap_heatmap(self, inflow_cap):
+        """
+        Same bucket x date pivot as compute.calculate_cashflow_gap_heatmap.
+        """
+        daily = self.total('amount', by=['direction', 'date', 'bucket']).unstack('direction')
+        daily = daily.reindex(columns=['inflow', 'outflow']).fillna(0)
+        present = self.total('count', by=['date', 'bucket']) > 0
+
+        day_in = daily['inflow'].groupby(level='date').sum()
+        day_out = daily['outflow'].groupby(level='date').sum()
+        ratio = (day_in.clip(upper=day_out * inflow_cap) / day_in.where(day_in > 0)).fillna(0)
+
+        signed = daily['inflow'] * ratio.reindex(daily.index, level='date') - daily['outflow']
+        pivot = signed[present].unstack('date').fillna(0)
+        pivot.columns.name = 'date'
+        return pivot.sort_index()
+
+    def stress_cells(self, haircut_map):
+        """
+        Cells for src.stress, reduced over dates.
+        """
+        frame = self.total('amount', by=stress.CELL_DIMENSIONS).rename('amount').to_frame()
+        frame['asf'] = self.total('asf', by=stress.CELL_DIMENSIONS).values
+        frame['rsf'] = self.total('rsf', by=stress.CELL_DIMENSIONS).values
+        frame['count'] = self.total('count', by=stress.CELL_DIMENSIONS).values
+        frame = frame[frame['count'] > 0].reset_index()
+        haircut = frame['hqlatype'].map(haircut_map).fillna(1).where(frame['hqlatype'].isin(HQLA_TYPES), 1)
+        frame['hqla'] = frame['amount'] * (1 - haircut)
+        return stress.cells_from_frame(frame)
+
+
+# ==========================================================
+# ✅ Cube Snapshot Cache
+# ==========================================================
+@track_cache
+@functools.lru_cache(maxsize=8)
+def _build_cube(scenario_id, version):
+    return LiquidityCube.from_cashflows(queries.get_cashflows(scenario_id=scenario_id))
+
+
+def get_cube(scenario_id=None):
+    """
+    The liquidity cube for a scenario, built once per data version.
+    """
+    return _build_cube(scenario_id, parameters.data_version())
@@ -0,0 +1,112 @@
+import functools
+from dataclasses import dataclass, replace
+import numpy as np
+
+INTERPOLATIONS = ('linear', 'log_linear')
+
+# Day grids are sized in steps of this many days, so curves share grid lengths
+GRID_STEP_DAYS = 3653
+
+
+# ==========================================================
+# ✅ Yield Curve
+# ==========================================================
+@dataclass(frozen=True)
+class YieldCurve:
+    """
+    Zero curve on tenor pillars (years, continuously compounded rates).
+    Discount factors between pillars are interpolated linearly or
+    log-linearly on the discount factors, anchored at DF(0) = 1; beyond
+    the last pillar the last zero rate is held flat. Immutable and
+    hashable, so discount factors on a day grid are memoized per curve.
+    """
+
+    tenors: tuple
+    zero_rates: tuple
+    interpolation: str = 'log_linear'
+    labels: tuple = ()
+
+    def __post_init__(self):
+        object.__setattr__(self, 'tenors', tuple(float(t) for t in self.tenors))
+        object.__setattr__(self, 'zero_rates', tuple(float(r) for r in self.zero_rates))
+        object.__setattr__(self, 'labels', tuple(self.labels))
+        if len(self.tenors) != len(self.zero_rates) or not self.tenors:
+            raise ValueError("YieldCurve needs one zero rate per tenor pillar")
+        if any(b <= a for a, b in zip((0.0,) + self.tenors, self.tenors)):
+            raise ValueError(f"Tenor pillars must be positive and increasing: {self.tenors}")
+        if self.labels and len(self.labels) != len(self.tenors):
+            raise ValueError("YieldCurve labels must match the tenor pillars")
+        if self.interpolation not in INTERPOLATIONS:
+            raise ValueError(f"Unknown interpolation {self.interpolation!r}, expected one of {INTERPOLATIONS}")
+
+    # ------------------------------------------------------
+    # Valuation
+    # ------------------------------------------------------
+    def discount_factors(self, years):
+        """
+        Discount factors for an array of times in years (vectorized).
+        """
+        years = np.maximum(np.asarray(years, dtype=float), 0.0)
+        tenors = np.array((0.0,) + self.tenors)
+        log_df = -np.array((0.0,) + self.zero_rates) * tenors
+
+        if self.interpolation == 'log_linear':
+            inside = np.exp(np.interp(years, tenors, log_df))
+        else:
+            inside = np.interp(years, tenors, np.exp(log_df))
+        beyond = np.exp(-self.zero_rates[-1] * years)
+        return np.where(years > self.tenors[-1], beyond, inside)
+
+    def zero_rates_at(self, years):
+        """
+        Interpolated zero rates for an array of times in years.
+        """
+        years = np.asarray(years, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rates = -np.log(self.discount_factors(years)) / years
+        return np.where(years > 0, rates, self.zero_rates[0])
+
+    def day_discount_factors(self, days):
+        """
+        Discount factors for integer day offsets (day count 365.25), looked
+        up on this curve's memoized day grid instead of recomputed.
+        """
+        days = np.maximum(np.asarray(days, dtype=np.int64), 0)
+        size = (int(days.max(initial=0)) // GRID_STEP_DAYS + 1) * GRID_STEP_DAYS
+        return _day_grid(self, size)[days]
+
+    # ------------------------------------------------------
+    # Shifted curves
+    # ------------------------------------------------------
+    def shifted(self, shocks_bps):
+        """
+        Curve with each pillar's zero rate moved by shocks_bps (a scalar
+        for a parallel shift, or one value per pillar).
+        """
+        shocks = np.broadcast_to(np.asarray(shocks_bps, dtype=float), (len(self.tenors),))
+        return replace(self, zero_rates=tuple(np.asarray(self.zero_rates) + shocks / 10_000))
+
+    def scenario_curves(self, shocks):
+        """
+        Shifted curves for a shocks frame (rows: scenario, columns: pillars
+        in bps, e.g. irrbb.EBA_SHOCKS), keyed by the row labels.
+        """
+        return {name: self.shifted(row) for name, row in zip(shocks.index, shocks.to_numpy(dtype=float))}
+
+
+@functools.lru_cache(maxsize=128)
+def _day_grid(curve, size):
+    grid = curve.discount_factors(np.arange(size) / 365.25)
+    grid.setflags(write=False)
+    return grid
+
+
+# ==========================================================
+# ✅ Baseline Curve
+# ==========================================================
+# One pillar per IRRBB bucket, 1% to 2%
+BASELINE_CURVE = YieldCurve(
+    tenors=(0.5, 2.0, 4.0, 7.5, 15.0),
+    zero_rates=(0.01, 0.0125, 0.015, 0.0175, 0.02),
+    labels=('0-1y', '1-3y', '3-5y', '5-10y', '10y+'),
+)
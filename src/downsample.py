@@ -0,0 +1,112 @@
+import pandas as pd
+import numpy as np
+
+# Candidate resolutions, finest first: (pandas frequency, approx. days per period)
+FREQUENCIES = [
+    ('D', 1),
+    ('W-MON', 7),
+    ('MS', 30.44),
+    ('QS', 91.31),
+]
+
+
+# ==========================================================
+# ✅ Resolution Choice
+# ==========================================================
+def choose_frequency(start, end, max_points):
+    """
+    Finest frequency whose number of periods between start and end stays
+    within max_points (quarterly if none does).
+    """
+    span_days = (pd.Timestamp(end) - pd.Timestamp(start)).days + 1
+    for freq, days in FREQUENCIES:
+        if span_days / days <= max_points:
+            return freq
+    return FREQUENCIES[-1][0]
+
+
+def clip_dates(df, start_date=None, end_date=None, date_col='date'):
+    """
+    Rows of df whose date falls in [start_date, end_date] (either optional).
+    """
+    dates = pd.to_datetime(df[date_col])
+    mask = pd.Series(True, index=df.index)
+    if start_date is not None:
+        mask &= dates >= pd.Timestamp(start_date)
+    if end_date is not None:
+        mask &= dates <= pd.Timestamp(end_date)
+    return df[mask]
+
+
+# ==========================================================
+# ✅ Period Aggregation
+# ==========================================================
+def resample(df, freq, how='sum', date_col='date'):
+    """
+    Aggregates the numeric columns of a long frame to freq, labelled by the
+    first day of each period. 'D' returns the frame unchanged.
+    """
+    if freq == 'D':
+        return df
+    grouped = df.assign(**{date_col: pd.to_datetime(df[date_col])}).groupby(
+        pd.Grouper(key=date_col, freq=freq, label='left', closed='left')
+    )
+    return grouped.agg(how).reset_index()
+
+
+def aggregate_columns(pivot, freq, how='sum'):
+    """
+    Same as resample() for a wide frame whose columns are dates (the gap
+    heatmap pivot).
+    """
+    if freq == 'D':
+        return pivot
+    out = pivot.T
+    out.index = pd.to_datetime(out.index)
+    out = out.groupby(pd.Grouper(freq=freq, label='left', closed='left')).agg(how).T
+    out.columns.name = pivot.columns.name
+    return out
+
+
+# ==========================================================
+# ✅ Largest-Triangle-Three-Buckets (LTTB)
+# ==========================================================
+def lttb(x, y, n_out):
+    """
+    Indices of the n_out points that best preserve the visual shape of the
+    line (x, y), always keeping the first and last point. x must be sorted.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Interior points split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+
+    prev = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Next bucket's average acts as the third triangle vertex
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+
+        area = np.abs(
+            (x[prev] - avg_x) * (y[lo:hi] - y[prev]) - (x[prev] - x[lo:hi]) * (avg_y - y[prev])
+        )
+        prev = lo + int(np.argmax(area))
+        selected[i + 1] = prev
+    return selected
+
+
+def lttb_frame(df, x_col, y_col, n_out):
+    """
+    Rows of df kept by LTTB on (x_col, y_col). Non-finite y values are
+    dropped first since they cannot be plotted.
+    """
+    df = df[np.isfinite(df[y_col].astype(float))].sort_values(x_col)
+    x = pd.to_datetime(df[x_col]).astype('int64') if not np.issubdtype(df[x_col].dtype, np.number) else df[x_col]
+    return df.iloc[lttb(x.to_numpy(), df[y_col].to_numpy(), n_out)].reset_index(drop=True)
@@ -0,0 +1,222 @@
+import json
+import logging
+import os
+import re
+import threading
+from collections import deque
+from contextlib import contextmanager
+import pandas as pd
+from sqlalchemy import text
+
+logger = logging.getLogger("basel.explain")
+
+# Opt-in: off unless enabled here or via BASEL_EXPLAIN_CAPTURE=1
+_enabled = os.getenv('BASEL_EXPLAIN_CAPTURE', '0').lower() in ('1', 'true', 'yes')
+
+# Most recent captured plans (oldest are dropped first)
+MAX_PLANS = 500
+
+# Diagnostic thresholds
+LARGE_TABLE_ROWS = 10_000         # Seq scans reading at least this many rows are flagged
+FILTER_DISCARD_RATIO = 0.5        # Share of scanned rows a filter must discard to suggest an index
+ROW_ESTIMATE_FACTOR = 10          # Planner estimate off by this factor (either way) is flagged
+
+_plans = deque(maxlen=MAX_PLANS)
+_lock = threading.Lock()
+
+# Column references in a plan Filter, e.g. "(scenario_id = 2)" or "(date >= '2024-01-01'::date)"
+_FILTER_COLUMN = re.compile(r'(?<![:\w])([a-z_][a-z0-9_]*)\)?\s*(?:=|<>|>=|<=|>|<|IS\b|~~)', re.IGNORECASE)
+
+
+# ==========================================================
+# ✅ Capture Mode
+# ==========================================================
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+@contextmanager
+def capturing():
+    """
+    Enables plan capture for the duration of the block.
+    """
+    previous = _enabled
+    enable()
+    try:
+        yield
+    finally:
+        if not previous:
+            disable()
+
+
+# ==========================================================
+# ✅ Plan Capture
+# ==========================================================
+def capture_plan(engine, query, params=None):
+    """
+    Runs the statement under EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) and
+    stores the plan with its parameters and diagnostics. The statement is
+    executed by EXPLAIN ANALYZE, so only read-only SELECTs are captured and
+    the surrounding transaction is rolled back. Diagnostics never fail the
+    real query: an EXPLAIN error is stored as an 'explain_error' finding.
+    """
+    if not query.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return None
+
+    entry = {
+        'timestamp': pd.Timestamp.now(),
+        'statement': " ".join(query.split()),
+        'params': dict(params or {}),
+    }
+    try:
+        with engine.connect() as conn:
+            result = conn.execute(
+                text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}"), params or {}
+            ).scalar()
+            conn.rollback()
+        explained = json.loads(result) if isinstance(result, str) else result
+        explained = explained[0]
+        entry.update({
+            'planning_ms': explained.get('Planning Time'),
+            'execution_ms': explained.get('Execution Time'),
+            'plan': explained['Plan'],
+            'findings': analyze_plan(explained['Plan']),
+        })
+    except Exception as exc:
+        logger.warning("EXPLAIN capture failed: %s", exc)
+        entry.update({
+            'planning_ms': None,
+            'execution_ms': None,
+            'plan': None,
+            'findings': [{
+                'type': 'explain_error',
+                'relation': None,
+                'depth': 0,
+                'detail': f"EXPLAIN failed ({type(exc).__name__}): {exc}",
+            }],
+        })
+    with _lock:
+        _plans.append(entry)
+    return entry
+
+
+# ==========================================================
+# ✅ Plan Diagnostics
+# ==========================================================
+def _walk(node, depth=0):
+    yield node, depth
+    for child in node.get('Plans', []):
+        yield from _walk(child, depth + 1)
+
+
+def analyze_plan(plan):
+    """
+    Flags sequential scans over large tables, missing-index candidates
+    (seq scans whose filter discards most of what they read) and planner
+    row-estimate errors. Returns a list of finding dicts.
+    """
+    findings = []
+    for node, depth in _walk(plan):
+        node_type = node.get('Node Type')
+        loops = node.get('Actual Loops', 1) or 1
+        actual = node.get('Actual Rows', 0) * loops
+        estimated = node.get('Plan Rows', 0) * loops
+
+        if node_type == 'Seq Scan':
+            removed = node.get('Rows Removed by Filter', 0) * loops
+            scanned = actual + removed
+            relation = node.get('Relation Name')
+
+            if scanned >= LARGE_TABLE_ROWS:
+                findings.append({
+                    'type': 'seq_scan',
+                    'relation': relation,
+                    'depth': depth,
+                    'rows_scanned': scanned,
+                    'detail': f"Sequential scan read {scanned:,} rows of {relation}",
+                })
+
+            if 'Filter' in node and scanned >= LARGE_TABLE_ROWS and removed >= FILTER_DISCARD_RATIO * scanned:
+                columns = sorted(set(_FILTER_COLUMN.findall(node['Filter'])) - {'null', 'NULL'})
+                findings.append({
+                    'type': 'missing_index',
+                    'relation': relation,
+                    'depth': depth,
+                    'rows_scanned': scanned,
+                    'columns': columns,
+                    'detail': f"Filter on {relation}({', '.join(columns)}) discarded {removed:,} of {scanned:,} rows",
+                })
+
+        if 'Actual Rows' in node:
+            factor = max(actual, estimated) / max(min(actual, estimated), 1)
+            if factor >= ROW_ESTIMATE_FACTOR:
+                findings.append({
+                    'type': 'row_estimate',
+                    'relation': node.get('Relation Name'),
+                    'depth': depth,
+                    'node': node_type,
+                    'estimated_rows': estimated,
+                    'actual_rows': actual,
+                    'detail': f"{node_type} estimated {estimated:,} rows, got {actual:,} ({factor:,.0f}x off)",
+                })
+    return findings
+
+
+# ==========================================================
+# ✅ Reporting
+# ==========================================================
+def get_plans():
+    """
+    Captured plans as a DataFrame (one row per issued statement).
+    """
+    with _lock:
+        plans = list(_plans)
+    df = pd.DataFrame(plans, columns=[
+        'timestamp', 'statement', 'params', 'planning_ms', 'execution_ms', 'plan', 'findings'
+    ])
+    df['n_findings'] = df['findings'].apply(len)
+    return df
+
+
+def get_findings():
+    """
+    All diagnostics across captured plans, one row per finding.
+    """
+    rows = []
+    with _lock:
+        plans = list(_plans)
+    for entry in plans:
+        for finding in entry['findings']:
+            rows.append({
+                'timestamp': entry['timestamp'],
+                'statement': entry['statement'],
+                'params': entry['params'],
+                **finding,
+            })
+    if not rows:
+        return pd.DataFrame(columns=['timestamp', 'statement', 'params', 'type', 'relation', 'detail'])
+    return pd.DataFrame(rows)
+
+
+def to_json():
+    """
+    Captured plans serialized as JSON lines, for offline tuning.
+    """
+    with _lock:
+        plans = list(_plans)
+    return "\n".join(json.dumps(entry, default=str) for entry in plans)
+
+
+def clear():
+    with _lock:
+        _plans.clear()
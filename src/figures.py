@@ -0,0 +1,561 @@
+import functools
+import threading
+from collections import OrderedDict
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.express as px
+from src import compute, parameters
+from src.instrumentation import instrument_figure, record_cache
+
+# Most recently used figures kept across sessions (least recently used are dropped first)
+MAX_FIGURES = 128
+
+# Display order of the gap heatmap rows
+GAP_BUCKET_ORDER = ['0-7d', '8-30d', '31-90d', '91-180d', '181-365d', '>1y']
+
+_figures = OrderedDict()
+_lock = threading.Lock()
+
+
+# ==========================================================
+# ✅ Figure Cache
+# ==========================================================
+def _freeze(value):
+    """
+    Hashable form of a view option (multiselect lists become tuples).
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(value, key=str))
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def cached_figure(func):
+    """
+    Caches a figure builder on (builder, scenario, data version, params
+    version, view options). Builders take the scenario id first and every
+    view option as a keyword. The returned figure is shared between reruns
+    and sessions, so callers must not mutate it.
+    """
+    @instrument_figure
+    @functools.wraps(func)
+    def wrapper(scenario_id=None, **view):
+        view = {k: _freeze(v) for k, v in view.items()}
+        key = (
+            func.__name__,
+            scenario_id,
+            parameters.data_version(),
+            parameters.load_params(scenario_id).version,
+            tuple(sorted(view.items())),
+        )
+        with _lock:
+            fig = _figures.get(key)
+            if fig is not None:
+                _figures.move_to_end(key)
+        record_cache(fig is not None)
+        if fig is None:
+            fig = func(scenario_id, **view)
+            with _lock:
+                _figures[key] = fig
+                while len(_figures) > MAX_FIGURES:
+                    _figures.popitem(last=False)
+        return fig
+
+    return wrapper
+
+
+def clear():
+    """
+    Drops every cached figure.
+    """
+    with _lock:
+        _figures.clear()
+
+
+# ==========================================================
+# ✅ Liquidity Figures
+# ==========================================================
+@cached_figure
+def lcr_waterfall(scenario_id=None, product=None, counterparty=None):
+    lcr = compute.calculate_liquidity_drilldown(scenario_id, product=product, counterparty=counterparty)['LCR']
+
+    h = lcr['HQLA']
+    out = -lcr['Outflows']
+    cap_in = min(lcr['Inflows'], lcr['Outflows'] * parameters.load_params(scenario_id).lcr_inflow_cap)
+    net_out = lcr['NetOutflows']
+
+    fig = go.Figure(go.Waterfall(
+        name="LCR",
+        orientation="v",
+        measure=["absolute", "relative", "relative", "total"],
+        x=["HQLA", "Outflows", "Inflows (capped)", "Net Outflows"],
+        y=[h, out, cap_in, net_out],
+        textposition="outside",
+        text=[f"{h:,.0f}", f"{out:,.0f}", f"{cap_in:,.0f}", f"{net_out:,.0f}"],
+        connector={"line": {"color": "rgb(63, 63, 63)"}},
+    ))
+
+    fig.update_layout(
+        title="LCR Waterfall Breakdown",
+        yaxis_title="EUR",
+        waterfallgap=0.3
+    )
+    return fig
+
+
+@cached_figure
+def hqla_treemap(scenario_id=None, product=None, counterparty=None, haircut='Pre-Haircut'):
+    """
+    HQLA composition by level; haircut is 'Pre-Haircut' or 'Post-Haircut'.
+    """
+    hqla_df = compute.calculate_liquidity_drilldown(scenario_id, product=product, counterparty=counterparty)['HQLA']
+
+    fig = px.treemap(
+        hqla_df,
+        path=['HQLA Type'],
+        values=haircut,
+        title=f"HQLA Composition ({haircut})"
+    )
+
+    fig.update_traces(
+        textinfo="label+percent entry",   # Show label and percentage
+        hovertemplate=''                  # Suppress hover box
+    )
+    return fig
+
+
+@cached_figure
+def nsfr_structure(scenario_id=None, product=None, counterparty=None):
+    breakdown = compute.calculate_nsfr_breakdown(scenario_id, product=product, counterparty=counterparty)
+
+    # Bar chart: ASF vs RSF breakdown
+    asf_components = breakdown["ASF_components"]
+    rsf_components = breakdown["RSF_components"]
+
+    asf_labels = list(asf_components.keys())
+    asf_values = list(asf_components.values())
+
+    rsf_labels = list(rsf_components.keys())
+    rsf_values = list(rsf_components.values())
+
+    # Make lengths match for plotting
+    max_len = max(len(asf_labels), len(rsf_labels))
+    asf_labels += [''] * (max_len - len(asf_labels))
+    asf_values += [0] * (max_len - len(asf_values))
+    rsf_labels += [''] * (max_len - len(rsf_labels))
+    rsf_values += [0] * (max_len - len(rsf_values))
+
+    # EBA weights: mean ASF factor of inflows / RSF factor of outflows per product
+    asf_weights = breakdown['ASF Weights'].apply(lambda x: f"{int(x * 100)}%").to_dict()
+    rsf_weights = breakdown['RSF Weights'].apply(lambda x: f"{int(x * 100)}%").to_dict()
+
+    fig = go.Figure()
+
+    fig.add_trace(go.Bar(
+        x=asf_labels,
+        y=asf_values,
+        name='ASF (Available Stable Funding)',
+        marker_color='green',
+        hovertext=[f"EBA Weight: {asf_weights.get(label, '')}" for label in asf_labels],
+        hoverinfo='text+y'  # show both custom hovertext and y-value
+    ))
+
+    fig.add_trace(go.Bar(
+        x=rsf_labels,
+        y=rsf_values,
+        name='RSF (Required Stable Funding)',
+        marker_color='red',
+        hovertext=[f"EBA Weight: {rsf_weights.get(label, '')}" for label in rsf_labels],
+        hoverinfo='text+y'
+    ))
+
+    fig.update_layout(
+        barmode='group',
+        title='ASF vs RSF Breakdown with EBA Weightings',
+        xaxis_title='Funding / Asset Categories',
+        yaxis_title='EUR',
+        xaxis_tickangle=-30,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    return fig
+
+
+@cached_figure
+def gap_heatmap(scenario_id=None, product=None, counterparty=None, start_date=None, end_date=None, max_columns=180):
+    view = compute.calculate_gap_heatmap_view(
+        scenario_id,
+        product=product,
+        counterparty=counterparty,
+        start_date=start_date,
+        end_date=end_date,
+        max_columns=max_columns
+    )
+    pivot_df = view['Gap Heatmap']
+
+    fig = go.Figure(data=go.Heatmap(
+        z=-pivot_df.values / 1e3,
+        x=pivot_df.columns,
+        y=pivot_df.index,
+        colorscale='RdYlGn_r',
+        zmin=-1200,
+        zmax=1200,
+        hovertemplate="Date: %{x}<br>Bucket: %{y}<br>Net Flow: %{z:,.0f} kEUR"
+    ))
+
+    present_buckets = [b for b in GAP_BUCKET_ORDER if b in pivot_df.index.tolist()]
+    fig.update_layout(
+        yaxis=dict(
+            categoryorder="array",
+            categoryarray=present_buckets
+        )
+    )
+    if view['Frequency'] != 'D':
+        fig.update_layout(title="Long range: each column shows the average daily net flow of its period")
+    return fig
+
+
+@cached_figure
+def lcr_net_cashflow(scenario_id=None, start_date=None, end_date=None, max_points=500):
+    view = compute.calculate_liquidity_timeseries_view(
+        scenario_id=scenario_id, start_date=start_date, end_date=end_date, max_points=max_points
+    )
+    net_df = view['Net Cashflow']
+    lcr_df = view['LCR']
+
+    fig = go.Figure()
+
+    fig.add_trace(go.Bar(
+        x=net_df['date'],
+        y=net_df['net_cashflow'],
+        name="Net Cashflow",
+        marker_color="orange",
+        yaxis="y1"
+    ))
+
+    fig.add_trace(go.Scatter(
+        x=lcr_df['date'],
+        y=lcr_df['lcr'],
+        name="LCR",
+        mode='lines+markers',
+        line=dict(color='blue'),
+        yaxis="y2"
+    ))
+
+    fig.add_trace(go.Scatter(
+        x=[lcr_df['date'].min(), lcr_df['date'].max()],
+        y=[100, 100],
+        mode='lines',
+        name='LCR Threshold (100%)',
+        line=dict(color='red', dash='dot'),
+        yaxis='y2',
+        showlegend=True
+    ))
+
+    fig.update_layout(
+        title="Daily Net Cashflows vs. LCR Ratio",
+        xaxis=dict(title="Date"),
+        yaxis=dict(
+            title="Net Cashflow",
+            side='left',
+            showgrid=False,
+            rangemode="tozero"  # Optional: ensure baseline is included
+        ),
+        yaxis2=dict(
+            title="LCR Ratio",
+            overlaying='y',
+            side='right',
+            showgrid=False,
+            range=[0, max(1.5, lcr_df['lcr'].max() * 1.1)]  # Cap at 1.5 or 10% above max
+        ),
+        legend=dict(x=0.01, y=1),
+        height=400
+    )
+    return fig
+
+
+@cached_figure
+def liquidity_ratios(scenario_id=None, scenario_label='', start_date=None, end_date=None, max_points=500):
+    # Each line downsampled on its own dates
+    view = compute.calculate_liquidity_timeseries_view(
+        scenario_id=scenario_id, start_date=start_date, end_date=end_date, max_points=max_points
+    )
+    lcr_df = view['LCR']
+    nsfr_df = view['NSFR']
+    combined = pd.concat([lcr_df[['date']], nsfr_df[['date']]])
+
+    fig = go.Figure()
+
+    fig.add_trace(go.Scatter(
+        x=lcr_df['date'],
+        y=lcr_df['lcr'],
+        name='LCR',
+        mode='lines+markers',
+        line=dict(color='blue'),
+        yaxis='y1'
+    ))
+
+    fig.add_trace(go.Scatter(
+        x=nsfr_df['date'],
+        y=nsfr_df['NSFR'],
+        name='NSFR',
+        mode='lines+markers',
+        line=dict(color='green'),
+        yaxis='y2'
+    ))
+
+    # Threshold lines
+    fig.add_shape(
+        type='line',
+        x0=combined['date'].min(), x1=combined['date'].max(),
+        y0=1.0, y1=1.0,
+        line=dict(color='red', dash='dash'),
+        yref='y2'
+    )
+
+    fig.add_shape(
+        type='line',
+        x0=combined['date'].min(), x1=combined['date'].max(),
+        y0=100.0, y1=100.0,
+        line=dict(color='red', dash='dash'),
+        yref='y1'
+    )
+
+    fig.update_layout(
+        title=f"Liquidity Ratios Over Time — {scenario_label}",
+        xaxis=dict(title="Date"),
+        yaxis=dict(title="LCR (%)", side='left', showgrid=False),
+        yaxis2=dict(title="NSFR (Ratio)", overlaying='y', side='right', showgrid=False),
+        legend=dict(x=0.01, y=1),
+        height=450
+    )
+    return fig
+
+
+@cached_figure
+def cashflow_sunburst(scenario_id=None):
+    rollup = compute.calculate_rollup('cashflows', scenario_id=scenario_id)
+
+    fig = go.Figure(go.Sunburst(
+        ids=rollup['id'],
+        labels=rollup['label'],
+        parents=rollup['parent'],
+        values=rollup['amount'],
+        branchvalues='total',
+        customdata=rollup[['asf', 'rsf']].to_numpy(),
+        hovertemplate="%{label}<br>Amount: %{value:,.0f} EUR"
+                      "<br>ASF: %{customdata[0]:,.0f}<br>RSF: %{customdata[1]:,.0f}<extra></extra>",
+    ))
+
+    fig.update_layout(title="Cashflows by Direction, Product and Counterparty", height=500)
+    return fig
+
+
+# ==========================================================
+# ✅ IRRBB Figures
+# ==========================================================
+@cached_figure
+def pv01_profile(scenario_id=None):
+    pv01_df = compute.calculate_pv01_profile(scenario_id=scenario_id)
+
+    fig = px.bar(
+        pv01_df,
+        x='tenor_bucket',
+        y='pv01',
+        color='tenor_bucket',
+        labels={'pv01': 'PV01 (EUR)', 'tenor_bucket': 'Maturity Bucket'},
+        title="PV01 Exposure by Tenor Bucket"
+    )
+
+    fig.update_layout(
+        showlegend=False,
+        yaxis_tickformat=',.0f',
+        height=400
+    )
+
+    fig.update_traces(hovertemplate='Bucket: %{x}<br>PV01: %{y:,.4f} EUR')
+    return fig
+
+
+@cached_figure
+def eve_eba(scenario_id=None, scenario_label=''):
+    df_eve = compute.calculate_eve_eba_scenarios(scenario_id=scenario_id)
+
+    fig = px.bar(
+        df_eve,
+        x='Scenario',
+        y='Delta EVE',
+        text_auto='.2f',
+        color='Delta EVE',
+        color_continuous_scale='RdYlGn',
+        title=f"∆EVE Across EBA IRRBB Shocks – Scenario: {scenario_label}"
+    )
+
+    fig.update_layout(
+        yaxis_title="Delta EVE (EUR)",
+        xaxis_title="Scenario",
+        height=400
+    )
+    return fig
+
+
+@cached_figure
+def nii_eba(scenario_id=None):
+    df_nii = compute.calculate_nii_eba_scenarios(scenario_id=scenario_id)
+
+    fig = px.bar(
+        df_nii,
+        x="Scenario",
+        y="Delta NII",
+        title="∆NII Under EBA IRRBB Shocks",
+        color="Scenario",
+        labels={"Delta NII": "∆NII (EUR)"},
+        text_auto=".2s"
+    )
+    fig.update_layout(showlegend=False)
+    return fig
+
+
+# ==========================================================
+# ✅ Capital Figures
+# ==========================================================
+@cached_figure
+def rwa_treemap(scenario_id=None):
+    rollup = compute.calculate_rollup('rwa', depth=2, scenario_id=scenario_id)
+
+    fig = go.Figure(go.Treemap(
+        ids=rollup['id'],
+        labels=rollup['label'],
+        parents=rollup['parent'],
+        values=rollup['rwa_amount'],
+        branchvalues='total',
+        marker=dict(colors=rollup['rwa_amount'], colorscale='Blues', showscale=True),
+        textinfo='label+value+percent entry',
+    ))
+
+    fig.update_layout(title="RWA by Approach and Asset Class")
+    return fig
+
+
+@cached_figure
+def output_floor_timeseries(scenario_id=None):
+    floor_ts = compute.calculate_output_floor_timeseries(scenario_id=scenario_id)
+    daily = floor_ts.groupby('date')[['IRB RWA', 'Output Floor', 'Floor Add-on']].sum().reset_index()
+    binding = daily[daily['Floor Add-on'] > 0]
+
+    fig = go.Figure()
+
+    fig.add_trace(go.Scatter(
+        x=daily['date'],
+        y=daily['IRB RWA'],
+        name="IRB RWA",
+        mode='lines',
+        line=dict(color='blue')
+    ))
+
+    fig.add_trace(go.Scatter(
+        x=daily['date'],
+        y=daily['Output Floor'],
+        name="Output Floor",
+        mode='lines',
+        line=dict(color='red', dash='dash')
+    ))
+
+    fig.add_trace(go.Scatter(
+        x=binding['date'],
+        y=binding['IRB RWA'],
+        name="Floor Binding",
+        mode='markers',
+        marker=dict(color='red', size=8, symbol='x')
+    ))
+
+    fig.update_layout(
+        title="IRB RWA vs. Output Floor",
+        xaxis_title="Date",
+        yaxis_title="EUR",
+        height=400,
+        legend=dict(x=0.01, y=1)
+    )
+    return fig
+
+
+@cached_figure
+def capital_ratios_timeseries(scenario_id=None):
+    capital_ts = compute.calculate_capital_timeseries(scenario_id=scenario_id)
+
+    fig = go.Figure()
+
+    fig.add_trace(go.Scatter(
+        x=capital_ts['date'],
+        y=capital_ts['CET1 Ratio'],
+        name="CET1 Ratio",
+        mode='lines+markers',
+        line=dict(color='blue')
+    ))
+
+    fig.add_trace(go.Scatter(
+        x=capital_ts['date'],
+        y=capital_ts['Tier1 Ratio'],
+        name="Tier1 Ratio",
+        mode='lines+markers',
+        line=dict(color='orange')
+    ))
+
+    # --- Thresholds ---
+    fig.add_hline(y=4.5, line_dash="dot", line_color="white", annotation_text="CET1 Min (4.5%)")
+    fig.add_hline(y=6.0, line_dash="dot", line_color="white", annotation_text="Tier1 Min (6%)")
+    fig.add_hline(y=7.0, line_dash="dash", line_color="blue", annotation_text="CET1 + Buffer")
+
+    fig.update_layout(
+        title="CET1 and Tier1 Ratios vs. Regulatory Thresholds",
+        xaxis_title="Date",
+        yaxis_title="Capital Ratio (%)",
+        height=450,
+        legend=dict(x=0.01, y=1)
+    )
+
+    # Keep y-axis as raw numbers (not %) since the data is in percent already
+    fig.update_yaxes(tickformat=".0f")
+    fig.update_traces(hovertemplate='%{x|%b %d, %Y}<br>%{y:.2f}%')
+    return fig
+
+
+# ==========================================================
+# ✅ Stress Testing Figures
+# ==========================================================
+@cached_figure
+def stress_comparison(scenario_id=None, shock_bps=200, retail_withdrawal_pct=0.2,
+                      wholesale_withdrawal_pct=0.4, rwa_stress_pct=0.1, kernel=None):
+    # kernel: the page's pinned sensitivity kernel (part of the cache key by identity)
+    results = compute.run_stress_test(
+        shock_bps=shock_bps,
+        retail_withdrawal_pct=retail_withdrawal_pct,
+        wholesale_withdrawal_pct=wholesale_withdrawal_pct,
+        rwa_stress_pct=rwa_stress_pct,
+        scenario_id=scenario_id,
+        kernel=kernel
+    )
+
+    metrics = ["LCR", "NSFR", "CET1 Ratio", "Tier1 Ratio"]
+    # All four ratios are decimals (LCR is the portfolio ratio from the stress engine)
+    scale = {"LCR": 100, "NSFR": 100, "CET1 Ratio": 100, "Tier1 Ratio": 100}
+
+    chart_percent = pd.DataFrame([
+        {"Metric": m, "Condition": condition, "Value": results[f"{m} ({condition})"] * scale[m]}
+        for condition in ["Base", "Stressed"]
+        for m in metrics
+    ])
+
+    fig = px.bar(
+        chart_percent,
+        x="Metric",
+        y="Value",
+        color="Condition",
+        barmode="group",
+        text_auto='.2f',
+        title="Regulatory Ratios: Before vs. After"
+    )
+    fig.update_yaxes(title="%")
+    return fig
@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 from sqlalchemy import create_engine
 from dotenv import load_dotenv
 import os
+from src import credit_risk, irrbb as irrbb_engine
 
 load_dotenv()
 
@@ -83,6 +84,14 @@ rwa = pd.DataFrame({
     'scenario_id': np.random.choice(scenario_ids, 1000)
 })
 
+# Risk-weight inputs: rating for STD, PD/LGD/M for IRB (weights derived by src.credit_risk)
+is_irb = rwa['approach'] == 'IRB'
+rwa['credit_quality_step'] = np.where(is_irb, np.nan, np.random.choice([1, 2, 3, 4, 5, 6, np.nan], 1000))
+rwa['pd'] = np.where(is_irb, np.random.lognormal(np.log(0.01), 1.0, 1000).clip(0.0003, 0.2).round(6), np.nan)
+rwa['lgd'] = np.where(is_irb, np.random.choice([0.1, 0.2, 0.45, 0.75], 1000), np.nan)
+rwa['maturity'] = np.where(is_irb, np.random.uniform(1, 5, 1000).round(3), np.nan)
+rwa['credit_quality_step'] = rwa['credit_quality_step'].astype('Int64')
+
 rwa['rwa_amount'] = rwa['amount'] * rwa['risk_weight']
 rwa['capital_requirement'] = rwa['rwa_amount'] * 0.08
 
@@ -158,10 +167,20 @@ params = pd.DataFrame([
     {'key': 'eve_tier1_breach_ratio', 'value': '0.15'},
 
     # Other Constants
-    {'key': 'capital_requirement_ratio', 'value': '0.08'}
+    {'key': 'capital_requirement_ratio', 'value': '0.08'},
+    {'key': 'output_floor', 'value': '0.725'}
 ])
 
 params.to_sql('params', con=engine, if_exists='append', index=False)
 print("✅ Params table populated.")
 
+# =======================================================
+# ✅ Derive Stored Risk Measures
+# =======================================================
+# Every capital view reads the stored rwa_amount, so derive it with the engine
+# before anything reads the table (needs params, hence last)
+print(f"✅ RWA repriced ({credit_risk.reprice_table()} rows updated).")
+# The generated pv01 column is noise; replace it with key-rate PV01 per 1bp
+print(f"✅ IRRBB key-rate PV01 derived ({irrbb_engine.reprice_table()} rows updated).")
+
 print("🎉 ✅ All data generated successfully.")
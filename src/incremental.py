@@ -0,0 +1,278 @@
+import sys
+import pandas as pd
+import numpy as np
+from sqlalchemy import text
+from src import queries, parameters, credit_risk
+
+# Name of the watermark row in refresh_state
+REFRESH_NAME = 'daily_aggregates'
+
+KEY = ['scenario_id', 'date']
+
+# Source table -> (aggregate table, INSERT ... SELECT restricted by {key_join})
+AGGREGATES = {
+    'cashflows': ('agg_cashflows_daily', """
+        INSERT INTO agg_cashflows_daily
+            (scenario_id, date, direction, hqlatype, product, counterparty, amount, asf, rsf, row_count)
+        SELECT s.scenario_id, s.date, s.direction, s.hqlatype, s.product, s.counterparty,
+               SUM(s.amount),
+               SUM(s.amount * COALESCE(s.asf_factor, 0)),
+               SUM(s.amount * COALESCE(s.rsf_factor, 0)),
+               COUNT(*)
+        FROM cashflows s
+        {key_join}
+        GROUP BY s.scenario_id, s.date, s.direction, s.hqlatype, s.product, s.counterparty
+    """),
+    'rwa': ('agg_rwa_daily', """
+        INSERT INTO agg_rwa_daily
+            (scenario_id, date, approach, asset_class, amount, rwa_amount, capital_requirement, row_count)
+        SELECT s.scenario_id, s.date, s.approach, s.asset_class,
+               SUM(s.amount), SUM(s.rwa_amount), SUM(s.capital_requirement), COUNT(*)
+        FROM rwa s
+        {key_join}
+        GROUP BY s.scenario_id, s.date, s.approach, s.asset_class
+    """),
+    'irrbb': ('agg_irrbb_daily', """
+        INSERT INTO agg_irrbb_daily
+            (scenario_id, date, tenor_bucket, cashflow, pv01, row_count)
+        SELECT s.scenario_id, s.date, s.tenor_bucket,
+               SUM(s.cashflow), SUM(s.pv01), COUNT(*)
+        FROM irrbb s
+        {key_join}
+        GROUP BY s.scenario_id, s.date, s.tenor_bucket
+    """),
+}
+
+# balance_sheet has no aggregate table but its keys still drive the capital KPIs
+SOURCE_TABLES = list(AGGREGATES) + ['balance_sheet']
+
+KEY_JOIN = """
+        JOIN touched_keys k
+          ON k.table_name = '{table}'
+         AND k.date = s.date
+         AND k.scenario_id IS NOT DISTINCT FROM s.scenario_id
+"""
+
+# Distinct (scenario_id, date) keys across all tables, joined as "k"
+TOUCHED = """
+    JOIN (SELECT DISTINCT scenario_id, date FROM touched_keys) k
+      ON k.date = a.date
+     AND k.scenario_id IS NOT DISTINCT FROM a.scenario_id
+"""
+
+
+# ==========================================================
+# ✅ Touched Keys
+# ==========================================================
+def _load_touched_keys(conn, low, high, full=False):
+    """
+    Materializes the (table_name, scenario_id, date) keys to rebuild into a
+    transaction-scoped temp table. A full rebuild touches every key present
+    in the source tables.
+    """
+    if full:
+        body = "\nUNION\n".join(
+            f"SELECT DISTINCT '{table}'::varchar AS table_name, scenario_id, date FROM {table}"
+            for table in SOURCE_TABLES
+        )
+        conn.execute(text(f"CREATE TEMP TABLE touched_keys ON COMMIT DROP AS {body}"))
+    else:
+        conn.execute(
+            text("""
+            CREATE TEMP TABLE touched_keys ON COMMIT DROP AS
+            SELECT DISTINCT table_name, scenario_id, date FROM change_log
+            WHERE id > :low AND id <= :high
+            """),
+            {'low': low, 'high': high}
+        )
+    return conn.execute(text("SELECT COUNT(DISTINCT (scenario_id, date)) FROM touched_keys")).scalar()
+
+
+# ==========================================================
+# ✅ Daily Aggregates
+# ==========================================================
+def _refresh_aggregates(conn, full=False):
+    """
+    Replaces aggregate rows for every touched key with a fresh GROUP BY over
+    the matching source rows only.
+    """
+    for table, (agg_table, insert_sql) in AGGREGATES.items():
+        if full:
+            conn.execute(text(f"TRUNCATE {agg_table}"))
+            conn.execute(text(insert_sql.format(key_join="")))
+        else:
+            conn.execute(text(f"""
+                DELETE FROM {agg_table} a USING touched_keys k
+                WHERE k.table_name = '{table}'
+                AND k.date = a.date
+                AND k.scenario_id IS NOT DISTINCT FROM a.scenario_id
+            """))
+            conn.execute(text(insert_sql.format(key_join=KEY_JOIN.format(table=table))))
+
+
+# ==========================================================
+# ✅ KPI Results
+# ==========================================================
+def _scenario_key(scenario_id):
+    return None if pd.isna(scenario_id) else int(scenario_id)
+
+
+def _params_by_scenario(scenario_ids):
+    """
+    BaselParams per distinct scenario_id (key None for unassigned rows),
+    honouring each scenario's params overrides.
+    """
+    return {key: parameters.load_params(key) for key in {_scenario_key(sid) for sid in scenario_ids}}
+
+
+def _compute_kpis(cash, rwa, irrbb, balance):
+    """
+    Daily KPIs per (scenario_id, date) from pre-aggregated inputs, returned in
+    the long format of kpi_results.
+    """
+    frames = []
+
+    if not cash.empty:
+        params = _params_by_scenario(cash['scenario_id'])
+        haircut = [
+            params[_scenario_key(sid)].haircut_map.get(hqlatype, 1.0)
+            for sid, hqlatype in zip(cash['scenario_id'], cash['hqlatype'])
+        ]
+        is_inflow = cash['direction'] == 'inflow'
+
+        cash = cash.assign(
+            hqla=cash['amount'] * (1 - np.asarray(haircut, dtype=float)),
+            inflows=cash['amount'].where(is_inflow, 0),
+            outflows=cash['amount'].where(~is_inflow, 0),
+            asf=cash['asf'].where(is_inflow, 0),
+            rsf=cash['rsf'].where(~is_inflow, 0),
+        )
+        daily = cash.groupby(KEY, dropna=False)[['hqla', 'inflows', 'outflows', 'asf', 'rsf']].sum()
+        inflow_cap = np.array([
+            params[_scenario_key(sid)].lcr_inflow_cap for sid in daily.index.get_level_values('scenario_id')
+        ])
+
+        capped_inflows = np.minimum(daily['inflows'], daily['outflows'] * inflow_cap)
+        net_outflows = daily['outflows'] - capped_inflows
+        daily['LCR'] = (daily['hqla'] / net_outflows.where(net_outflows > 0)).fillna(np.inf)
+        daily['NSFR'] = (daily['asf'] / daily['rsf'].where(daily['rsf'] > 0)).fillna(np.inf)
+        daily = daily.rename(columns={'hqla': 'HQLA', 'inflows': 'Inflows', 'outflows': 'Outflows'})
+        daily['NetOutflows'] = net_outflows
+        frames.append(daily[['HQLA', 'Inflows', 'Outflows', 'NetOutflows', 'LCR', 'NSFR']])
+
+    if not rwa.empty or not balance.empty:
+        capital = balance.pivot_table(
+            index=KEY, columns='item', values='amount', aggfunc='sum', dropna=False
+        ).reindex(columns=['CET1', 'Tier1', 'Total Capital'])
+        # Ratios use floored RWA, as in compute.calculate_capital_ratios
+        floored = credit_risk.output_floor_table(rwa).set_index(KEY)['Floored RWA'].rename('RWA')
+        daily = pd.concat([floored, capital], axis=1).fillna(0)
+        total_rwa = daily['RWA'].where(daily['RWA'] > 0)
+        for item in ['CET1', 'Tier1', 'Total Capital']:
+            daily[f'{item} Ratio'] = (daily[item] / total_rwa).fillna(np.inf)
+        frames.append(daily[['RWA', 'CET1 Ratio', 'Tier1 Ratio', 'Total Capital Ratio']])
+
+    if not irrbb.empty:
+        frames.append(irrbb.set_index(KEY)[['pv01']].rename(columns={'pv01': 'Total PV01'}))
+
+    if not frames:
+        return pd.DataFrame(columns=KEY + ['metric', 'value'])
+
+    kpis = pd.concat(frames, axis=1)
+    kpis.columns.name = 'metric'
+    kpis = kpis.stack().dropna().rename('value').reset_index()
+    kpis['scenario_id'] = kpis['scenario_id'].astype('Int64')
+    return kpis
+
+
+def _refresh_kpis(conn):
+    """
+    Recomputes kpi_results for every touched (scenario_id, date) key.
+    """
+    cash = pd.read_sql(text(f"""
+        SELECT a.scenario_id, a.date, a.direction, a.hqlatype,
+               SUM(a.amount) AS amount, SUM(a.asf) AS asf, SUM(a.rsf) AS rsf
+        FROM agg_cashflows_daily a {TOUCHED}
+        GROUP BY a.scenario_id, a.date, a.direction, a.hqlatype
+    """), con=conn)
+    rwa = pd.read_sql(text(f"""
+        SELECT a.scenario_id, a.date,
+               COALESCE(SUM(a.rwa_amount) FILTER (WHERE a.approach = 'STD'), 0) AS std_rwa,
+               COALESCE(SUM(a.rwa_amount) FILTER (WHERE a.approach = 'IRB'), 0) AS irb_rwa
+        FROM agg_rwa_daily a {TOUCHED}
+        GROUP BY a.scenario_id, a.date
+    """), con=conn)
+    irrbb = pd.read_sql(text(f"""
+        SELECT a.scenario_id, a.date, SUM(a.pv01) AS pv01
+        FROM agg_irrbb_daily a {TOUCHED}
+        GROUP BY a.scenario_id, a.date
+    """), con=conn)
+    balance = pd.read_sql(text(f"""
+        SELECT a.scenario_id, a.date, a.item, SUM(a.amount) AS amount
+        FROM balance_sheet a {TOUCHED}
+        WHERE a.item IN ('CET1', 'Tier1', 'Total Capital')
+        GROUP BY a.scenario_id, a.date, a.item
+    """), con=conn)
+
+    for df in (cash, rwa, irrbb, balance):
+        for col in df.columns.difference(KEY + ['direction', 'hqlatype', 'item']):
+            df[col] = df[col].astype(float)
+
+    kpis = _compute_kpis(cash, rwa, irrbb, balance)
+
+    conn.execute(text("""
+        DELETE FROM kpi_results r
+        USING (SELECT DISTINCT scenario_id, date FROM touched_keys) k
+        WHERE k.date = r.date
+        AND k.scenario_id IS NOT DISTINCT FROM r.scenario_id
+    """))
+    kpis.to_sql('kpi_results', con=conn, if_exists='append', index=False)
+    return len(kpis)
+
+
+# ==========================================================
+# ✅ Incremental Refresh Entry Point
+# ==========================================================
+def refresh(full=False):
+    """
+    Folds every change_log entry past the stored watermark into the daily
+    aggregates and KPI results, touching only the affected (scenario_id, date)
+    keys. full=True rebuilds everything from the source tables.
+    """
+    with queries.engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO refresh_state (name, watermark) VALUES (:name, 0) ON CONFLICT (name) DO NOTHING"),
+            {'name': REFRESH_NAME}
+        )
+        low = conn.execute(
+            text("SELECT watermark FROM refresh_state WHERE name = :name FOR UPDATE"),
+            {'name': REFRESH_NAME}
+        ).scalar()
+
+        # SHARE mode waits for in-flight writers, so no change_log id below
+        # the new watermark can still be uncommitted when we read MAX(id)
+        conn.execute(text("LOCK TABLE change_log IN SHARE MODE"))
+        high = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM change_log")).scalar()
+
+        if high <= low and not full:
+            return {'Watermark': low, 'Previous Watermark': low, 'Keys Refreshed': 0, 'KPI Rows': 0}
+
+        n_keys = _load_touched_keys(conn, low, high, full=full)
+        _refresh_aggregates(conn, full=full)
+        if full:
+            conn.execute(text("TRUNCATE kpi_results"))
+        n_kpis = _refresh_kpis(conn)
+
+        conn.execute(
+            text("UPDATE refresh_state SET watermark = :high, refreshed_at = CURRENT_TIMESTAMP WHERE name = :name"),
+            {'high': high, 'name': REFRESH_NAME}
+        )
+
+    return {'Watermark': high, 'Previous Watermark': low, 'Keys Refreshed': n_keys, 'KPI Rows': n_kpis}
+
+
+# ==========================================================
+# ✅ Example Run
+# ==========================================================
+if __name__ == "__main__":
+    print("Refresh:", refresh(full='--full' in sys.argv))
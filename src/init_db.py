@@ -22,3 +22,19 @@ engine = create_engine(connection_string)
 Base.metadata.create_all(engine)
 
 print("✅ All tables created successfully.")
+
+# Bring tables created by an earlier schema up to date (idempotent)
+migrations_sql = os.path.join(os.path.dirname(__file__), "..", "sql", "migrations.sql")
+with open(migrations_sql) as f:
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f.read())
+
+print("✅ Migrations applied.")
+
+# Install change-tracking triggers and indexes (tables above are left untouched)
+change_tracking_sql = os.path.join(os.path.dirname(__file__), "..", "sql", "change_tracking.sql")
+with open(change_tracking_sql) as f:
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f.read())
+
+print("✅ Change tracking installed.")
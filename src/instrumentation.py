@@ -0,0 +1,306 @@
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+import pandas as pd
+
+logger = logging.getLogger("basel.instrumentation")
+
+# Most recent call records across all sessions (oldest are dropped first)
+MAX_RECORDS = 5000
+
+_records = deque(maxlen=MAX_RECORDS)
+_lock = threading.Lock()
+
+# Current page render: {'scope': page name, 'render_id': unique id per rerun}
+_render = contextvars.ContextVar("render", default={'scope': None, 'render_id': None})
+
+# Stack of in-flight call records, so caching layers can annotate the active call
+_active = contextvars.ContextVar("active", default=())
+
+
+# ==========================================================
+# ✅ Render Scoping
+# ==========================================================
+def start_render(scope):
+    """
+    Tags every call recorded from here on (in this script run) with the page
+    name and a fresh render id. Call once at the top of each page script.
+    """
+    render_id = uuid.uuid4().hex[:12]
+    _render.set({'scope': scope, 'render_id': render_id})
+    return render_id
+
+
+@contextmanager
+def render_scope(scope):
+    """
+    Context-manager form of start_render for batch scripts; logs a one-line
+    summary of the calls made inside the block on exit.
+    """
+    token = _render.set({'scope': scope, 'render_id': uuid.uuid4().hex[:12]})
+    render_id = _render.get()['render_id']
+    try:
+        yield render_id
+    finally:
+        _render.reset(token)
+        records = get_records(render_id=render_id)
+        logger.info(json.dumps({
+            'event': 'render_complete',
+            'scope': scope,
+            'render_id': render_id,
+            'calls': len(records),
+            'duration_ms': float(records.loc[records['depth'] == 0, 'duration_ms'].sum()) if len(records) else 0.0,
+        }))
+
+
+@contextmanager
+def fragment_scope(scope):
+    """
+    Render scope for an st.fragment body. During a full page run the
+    fragment's calls stay on the page's render_id; when the fragment
+    reruns on its own (e.g. a slider move) it gets a render of its own.
+    """
+    if _is_fragment_rerun():
+        with render_scope(scope) as render_id:
+            yield render_id
+    else:
+        yield _render.get()['render_id']
+
+
+def _is_fragment_rerun():
+    # Imported lazily so batch scripts can use this module without a Streamlit session
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return bool(ctx is not None and ctx.fragment_ids_this_run)
+
+
+# ==========================================================
+# ✅ Call Recording
+# ==========================================================
+def record_cache(hit):
+    """
+    Marks the innermost in-flight instrumented call as a cache hit or miss.
+    Intended for caching layers wrapped by an instrumented function; a call
+    that misses any of the caches it reads stays a miss.
+    """
+    active = _active.get()
+    if active and active[-1]['cache'] != 'miss':
+        active[-1]['cache'] = 'hit' if hit else 'miss'
+
+
+def track_cache(cached):
+    """
+    Wraps a functools.lru_cache function so every lookup records a hit or
+    miss on the instrumented call it serves (see record_cache). Query
+    results served from the cube, kernel, params, overlay and other
+    version-keyed caches show up this way; the queries.* rows themselves
+    always went to the database and carry no cache status.
+    """
+    @functools.wraps(cached)
+    def wrapper(*args, **kwargs):
+        hits = cached.cache_info().hits
+        result = cached(*args, **kwargs)
+        record_cache(cached.cache_info().hits > hits)
+        return result
+
+    wrapper.cache_info = cached.cache_info
+    wrapper.cache_clear = cached.cache_clear
+    return wrapper
+
+
+def _result_size(result):
+    """
+    (rows, bytes) of a call result; bytes is the in-memory size of the
+    returned frame, a proxy for what came over the wire.
+    """
+    if isinstance(result, pd.DataFrame):
+        return len(result), int(result.memory_usage(index=True, deep=True).sum())
+    if isinstance(result, pd.Series):
+        return len(result), int(result.memory_usage(index=True, deep=True))
+    return None, None
+
+
+def _new_record(kind, name):
+    render = _render.get()
+    return {
+        'timestamp': pd.Timestamp.now(),
+        'scope': render['scope'],
+        'render_id': render['render_id'],
+        'kind': kind,
+        'name': name,
+        'depth': len(_active.get()),
+        'duration_ms': None,
+        'rows': None,
+        'bytes': None,
+        'cache': None,
+        'error': None,
+    }
+
+
+def _store(record):
+    with _lock:
+        _records.append(record)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(json.dumps(record, default=str))
+
+
+def _instrument_generator(kind, name, func):
+    """
+    Generator functions (chunked reads) are recorded once, when exhausted
+    or closed: duration from the first chunk request to the last, rows and
+    bytes summed over the chunks yielded.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        record = _new_record(kind, name)
+        record['rows'], record['bytes'] = 0, 0
+        start = time.perf_counter()
+        try:
+            for chunk in func(*args, **kwargs):
+                rows, size = _result_size(chunk)
+                record['rows'] += rows or 0
+                record['bytes'] += size or 0
+                yield chunk
+        except Exception as exc:
+            record['error'] = type(exc).__name__
+            raise
+        finally:
+            record['duration_ms'] = (time.perf_counter() - start) * 1000
+            _store(record)
+
+    return wrapper
+
+
+def _instrument(kind, marks_miss=False):
+    def decorator(func):
+        name = f"{func.__module__.split('.')[-1]}.{func.__name__}"
+        if inspect.isgeneratorfunction(func):
+            return _instrument_generator(kind, name, func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            record = _new_record(kind, name)
+            if marks_miss:
+                # The database was read, so nothing above this call was served from cache
+                for caller in _active.get():
+                    caller['cache'] = 'miss'
+            token = _active.set(_active.get() + (record,))
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+                record['rows'], record['bytes'] = _result_size(result)
+                return result
+            except Exception as exc:
+                record['error'] = type(exc).__name__
+                raise
+            finally:
+                record['duration_ms'] = (time.perf_counter() - start) * 1000
+                _active.reset(token)
+                _store(record)
+
+        return wrapper
+    return decorator
+
+
+# Decorators for src.queries, src.compute and src.figures functions respectively;
+# version probes are queries that cache layers run before a lookup, so they
+# do not turn the caller into a cache miss
+instrument_query = _instrument('query', marks_miss=True)
+instrument_version_probe = _instrument('query')
+instrument_compute = _instrument('compute')
+instrument_figure = _instrument('figure')
+
+
+# ==========================================================
+# ✅ Reporting
+# ==========================================================
+def get_records(scope=None, render_id=None, kind=None):
+    """
+    Recorded calls as a DataFrame, optionally filtered by page, render or kind.
+    """
+    with _lock:
+        df = pd.DataFrame(list(_records), columns=[
+            'timestamp', 'scope', 'render_id', 'kind', 'name', 'depth',
+            'duration_ms', 'rows', 'bytes', 'cache', 'error'
+        ])
+    if scope is not None:
+        df = df[df['scope'] == scope]
+    if render_id is not None:
+        df = df[df['render_id'] == render_id]
+    if kind is not None:
+        df = df[df['kind'] == kind]
+    return df.reset_index(drop=True)
+
+
+def slowest_calls(n=20, **filters):
+    """
+    The n slowest individual calls.
+    """
+    return get_records(**filters).nlargest(n, 'duration_ms').reset_index(drop=True)
+
+
+def summarize(**filters):
+    """
+    Per-function aggregates: call count, total/mean/p95/max duration, rows,
+    bytes and cache hit/miss counts, slowest total first.
+    """
+    df = get_records(**filters)
+    grouped = df.groupby(['kind', 'name'])
+    summary = grouped['duration_ms'].agg(
+        calls='count',
+        total_ms='sum',
+        mean_ms='mean',
+        p95_ms=lambda x: x.quantile(0.95),
+        max_ms='max'
+    )
+    summary['rows'] = grouped['rows'].sum()
+    summary['bytes'] = grouped['bytes'].sum()
+    summary['cache_hits'] = grouped['cache'].apply(lambda x: (x == 'hit').sum())
+    summary['cache_misses'] = grouped['cache'].apply(lambda x: (x == 'miss').sum())
+    summary['errors'] = grouped['error'].count()
+    return summary.sort_values('total_ms', ascending=False).reset_index()
+
+
+def to_prometheus(**filters):
+    """
+    Prometheus text exposition of the per-function aggregates.
+    """
+    summary = summarize(**filters)
+    labels = [f'kind="{row.kind}",name="{row.name}"' for row in summary.itertuples()]
+
+    lines = [
+        "# HELP basel_call_duration_seconds Time spent per instrumented call",
+        "# TYPE basel_call_duration_seconds summary",
+    ]
+    for label, row in zip(labels, summary.itertuples()):
+        lines.append(f"basel_call_duration_seconds_sum{{{label}}} {row.total_ms / 1000:g}")
+        lines.append(f"basel_call_duration_seconds_count{{{label}}} {row.calls:g}")
+
+    counters = [
+        ('basel_call_rows_total', 'Rows returned', 'rows'),
+        ('basel_call_bytes_total', 'Bytes returned', 'bytes'),
+        ('basel_cache_hits_total', 'Cache hits', 'cache_hits'),
+        ('basel_cache_misses_total', 'Cache misses', 'cache_misses'),
+        ('basel_call_errors_total', 'Calls that raised', 'errors'),
+    ]
+    for metric, help_text, column in counters:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        for label, value in zip(labels, summary[column]):
+            lines.append(f"{metric}{{{label}}} {float(value):g}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    """
+    Drops all recorded calls.
+    """
+    with _lock:
+        _records.clear()
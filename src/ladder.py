@@ -0,0 +1,182 @@
+import functools
+import numpy as np
+import pandas as pd
+from src import queries, parameters
+from src.instrumentation import track_cache
+from src.accumulators import HQLA_TYPES
+
+
+def _to_days(dates):
+    """
+    Dates (scalar or array-like) as int64 days since the epoch.
+    """
+    dates = pd.to_datetime(pd.Series(np.atleast_1d(dates)))
+    return dates.to_numpy().astype('datetime64[D]').astype(np.int64)
+
+
+# ==========================================================
+# ✅ Maturity Ladder Index
+# ==========================================================
+class MaturityLadder:
+    """
+    Cashflows indexed by booking and maturity date, so the sum of anything
+    booked on or before a date and maturing in a window (start, end] is a
+    few searchsorted calls, for any horizon and all reporting dates at once.
+
+    Rows are sorted by booking date and level k cuts that order into blocks
+    of 2**k rows, each sorted by maturity with prefix sums. The rows booked
+    by a date are a prefix of the booking order, which splits into at most
+    one block per level.
+
+    Memory grows as O(n log n): each of the log2(n) levels holds one keys
+    array and three prefix-sum arrays of n rows.
+    """
+
+    SERIES = ['inflow', 'outflow', 'hqla']
+
+    def __init__(self, booked_days, levels, day_offset, day_span):
+        self.booked_days = booked_days    # sorted int64 booking days
+        self.levels = levels              # per level: (block/maturity keys, series -> prefix sums, leading 0)
+        self.day_offset = day_offset      # earliest maturity day
+        self.day_span = day_span          # key stride between blocks
+
+    @classmethod
+    def from_cashflows(cls, cashflows, haircut_map):
+        cashflows = cashflows[cashflows['maturity_date'].notna()]
+        amount = cashflows['amount'].astype(float).to_numpy()
+        direction = cashflows['direction'].to_numpy()
+        hqlatype = cashflows['hqlatype'].to_numpy()
+
+        empty = np.array([], dtype=np.int64)
+        maturity_days = _to_days(cashflows['maturity_date']) if len(cashflows) else empty
+        booked_days = _to_days(cashflows['date']) if len(cashflows) else empty
+
+        haircut = pd.Series(hqlatype).map(haircut_map).fillna(1).to_numpy(dtype=float)
+        values = {
+            'inflow': np.where(direction == 'inflow', amount, 0.0),
+            'outflow': np.where(direction == 'outflow', amount, 0.0),
+            'hqla': np.where(np.isin(hqlatype, HQLA_TYPES), amount * (1 - haircut), 0.0),
+        }
+
+        order = np.argsort(booked_days, kind='stable')
+        booked_days, maturity_days = booked_days[order], maturity_days[order]
+        values = {s: v[order] for s, v in values.items()}
+        day_offset = int(maturity_days.min()) if len(order) else 0
+        day_span = int(maturity_days.max()) - day_offset + 2 if len(order) else 2
+
+        position = np.arange(len(order))
+        levels = []
+        for k in range(max(len(order), 1).bit_length()):
+            keys = (position >> k) * day_span + (maturity_days - day_offset)
+            within = np.argsort(keys)
+            prefix = {s: np.concatenate([[0.0], np.cumsum(values[s][within])]) for s in cls.SERIES}
+            levels.append((keys[within], prefix))
+
+        return cls(booked_days, levels, day_offset, day_span)
+
+    # ------------------------------------------------------
+    # Range queries
+    # ------------------------------------------------------
+    def _booked_by(self, series, days, until=None):
+        """
+        Sum of a series over rows booked on or before days and maturing on
+        or before until (all maturities when None), elementwise over int64
+        day arrays.
+        """
+        count = np.searchsorted(self.booked_days, days, side='right')
+        if until is None:
+            offset = self.day_span - 2
+        else:
+            offset = np.clip(until - self.day_offset, -1, self.day_span - 2)
+        count, offset = np.broadcast_arrays(count, offset)
+
+        total = np.zeros(len(count))
+        for k, (keys, prefix) in enumerate(self.levels):
+            # Block of 2**k rows covering bit k of the booked-by prefix
+            block = (count >> (k + 1)) << 1
+            start = block << k
+            stop = np.searchsorted(keys, block * self.day_span + offset, side='right')
+            total += np.where((count >> k) & 1, prefix[series][stop] - prefix[series][start], 0.0)
+        return total
+
+    def maturing(self, series, start, end, booked_by=None):
+        """
+        Sum of a series maturing in (start, end] over rows booked on or
+        before booked_by (start by default), elementwise over arrays of
+        dates.
+        """
+        start, end = _to_days(start), _to_days(end)
+        booked = start if booked_by is None else _to_days(booked_by)
+        return self._booked_by(series, booked, end) - self._booked_by(series, booked, start)
+
+    def maturing_within(self, dates, horizon_days):
+        """
+        Inflows, outflows and HQLA booked by each date and maturing within
+        horizon_days after it, one row per date.
+        """
+        dates = pd.to_datetime(pd.Series(np.atleast_1d(dates)))
+        end = dates + pd.Timedelta(days=horizon_days)
+        df = pd.DataFrame({'date': dates.to_numpy()})
+        for series in self.SERIES:
+            df[series] = self.maturing(series, dates, end)
+        return df
+
+    def hqla_outstanding(self, dates):
+        """
+        Post-haircut HQLA booked on or before each date and not yet matured.
+        """
+        days = _to_days(dates)
+        return self._booked_by('hqla', days) - self._booked_by('hqla', days, days)
+
+    def bucket_totals(self, date, edges_days, series='outflow'):
+        """
+        Sum of a series per custom maturity bucket after date, over rows
+        booked by date; edges_days are the bucket bounds in days, e.g.
+        [0, 7, 30, 90] gives (0, 7], (7, 30], (30, 90].
+        """
+        start = pd.Timestamp(date)
+        bounds = [start + pd.Timedelta(days=int(d)) for d in edges_days]
+        return self.maturing(series, bounds[:-1], bounds[1:], booked_by=start)
+
+    # ------------------------------------------------------
+    # Forward-window LCR
+    # ------------------------------------------------------
+    def forward_lcr(self, dates, horizon_days=30, inflow_cap=0.75):
+        """
+        LCR per reporting date: outstanding HQLA over the net outflows
+        maturing in the next horizon_days, with inflows capped at
+        inflow_cap of outflows.
+        """
+        df = self.maturing_within(dates, horizon_days)
+        capped = np.minimum(df['inflow'], df['outflow'] * inflow_cap)
+        net_outflows = df['outflow'] - capped
+        hqla = self.hqla_outstanding(df['date'])
+        return pd.DataFrame({
+            'date': df['date'],
+            'HQLA': hqla,
+            'Outflows': df['outflow'],
+            'Inflows': df['inflow'],
+            'Capped Inflows': capped,
+            'NetOutflows': net_outflows,
+            'LCR': np.where(net_outflows > 0, hqla / net_outflows.where(net_outflows > 0), np.inf),
+        })
+
+
+# ==========================================================
+# ✅ Ladder Cache
+# ==========================================================
+# Up to 8 ladders of O(n log n) arrays each stay resident
+@track_cache
+@functools.lru_cache(maxsize=8)
+def _build_ladder(scenario_id, version, params_version):
+    params = parameters.load_params(scenario_id)
+    return MaturityLadder.from_cashflows(queries.get_cashflows(scenario_id=scenario_id), params.haircut_map)
+
+
+def get_ladder(scenario_id=None):
+    """
+    The maturity ladder for a scenario, built once per data and params
+    version (HQLA is stored post-haircut).
+    """
+    params = parameters.load_params(scenario_id)
+    return _build_ladder(scenario_id, parameters.data_version(), params.version)
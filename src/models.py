@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Numeric, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, Numeric, Float, ForeignKey
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -43,7 +43,11 @@ class RWA(Base):
     asset_class = Column(String(50), nullable=False)
     approach = Column(String(20), nullable=False)
     amount = Column(Numeric(18, 2), nullable=False)
-    risk_weight = Column(Numeric(5, 2), nullable=False)
+    credit_quality_step = Column(Integer)
+    pd = Column(Numeric(9, 6))
+    lgd = Column(Numeric(5, 4))
+    maturity = Column(Numeric(6, 3))
+    risk_weight = Column(Numeric(7, 4), nullable=False)
     rwa_amount = Column(Numeric(18, 2), nullable=False)
     capital_requirement = Column(Numeric(18, 2), nullable=False)
     scenario_id = Column(Integer, ForeignKey('scenarios.id'))
@@ -56,11 +60,81 @@ class IRRBB(Base):
     cashflow = Column(Numeric(18, 2), nullable=False)
     maturity_date = Column(Date, nullable=False)
     tenor_bucket = Column(String(20))
-    pv01 = Column(Numeric(10, 6), nullable=False)
+    pv01 = Column(Numeric(18, 6), nullable=False)
     rate_sensitivity = Column(Numeric(10, 6))
     scenario_id = Column(Integer, ForeignKey('scenarios.id'))
 
+class IRRBBKeyRatePV01(Base):
+    __tablename__ = "irrbb_key_rate_pv01"
+    irrbb_id = Column(Integer, ForeignKey('irrbb.id', ondelete='CASCADE'), primary_key=True)
+    tenor_bucket = Column(String(20), primary_key=True)
+    pv01 = Column(Numeric(18, 6), nullable=False)
+
 class Param(Base):
     __tablename__ = "params"
     key = Column(String(50), primary_key=True)
     value = Column(String(100), nullable=False)
+
+class ScenarioParam(Base):
+    __tablename__ = "scenario_params"
+    scenario_id = Column(Integer, ForeignKey('scenarios.id', ondelete='CASCADE'), primary_key=True)
+    key = Column(String(50), primary_key=True)
+    value = Column(String(100), nullable=False)
+
+class ChangeLog(Base):
+    __tablename__ = "change_log"
+    id = Column(BigInteger, primary_key=True)
+    table_name = Column(String(50), nullable=False)
+    scenario_id = Column(Integer)
+    date = Column(Date, nullable=False)
+    changed_at = Column(DateTime)
+
+class RefreshState(Base):
+    __tablename__ = "refresh_state"
+    name = Column(String(50), primary_key=True)
+    watermark = Column(BigInteger, nullable=False, default=0)
+    refreshed_at = Column(DateTime)
+
+class AggCashflowsDaily(Base):
+    __tablename__ = "agg_cashflows_daily"
+    id = Column(BigInteger, primary_key=True)
+    scenario_id = Column(Integer)
+    date = Column(Date, nullable=False)
+    direction = Column(String(10), nullable=False)
+    hqlatype = Column(String(20), nullable=False)
+    product = Column(String(50), nullable=False)
+    counterparty = Column(String(50), nullable=False)
+    amount = Column(Numeric(20, 2), nullable=False)
+    asf = Column(Numeric(20, 2), nullable=False)
+    rsf = Column(Numeric(20, 2), nullable=False)
+    row_count = Column(Integer, nullable=False)
+
+class AggRWADaily(Base):
+    __tablename__ = "agg_rwa_daily"
+    id = Column(BigInteger, primary_key=True)
+    scenario_id = Column(Integer)
+    date = Column(Date, nullable=False)
+    approach = Column(String(20), nullable=False)
+    asset_class = Column(String(50), nullable=False)
+    amount = Column(Numeric(20, 2), nullable=False)
+    rwa_amount = Column(Numeric(20, 2), nullable=False)
+    capital_requirement = Column(Numeric(20, 2), nullable=False)
+    row_count = Column(Integer, nullable=False)
+
+class AggIRRBBDaily(Base):
+    __tablename__ = "agg_irrbb_daily"
+    id = Column(BigInteger, primary_key=True)
+    scenario_id = Column(Integer)
+    date = Column(Date, nullable=False)
+    tenor_bucket = Column(String(20))
+    cashflow = Column(Numeric(20, 2), nullable=False)
+    pv01 = Column(Numeric(18, 6), nullable=False)
+    row_count = Column(Integer, nullable=False)
+
+class KPIResult(Base):
+    __tablename__ = "kpi_results"
+    id = Column(BigInteger, primary_key=True)
+    scenario_id = Column(Integer)
+    date = Column(Date, nullable=False)
+    metric = Column(String(50), nullable=False)
+    value = Column(Float)
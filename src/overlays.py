@@ -0,0 +1,257 @@
+import functools
+import pandas as pd
+import numpy as np
+from src import queries, parameters, credit_risk, irrbb
+from src.instrumentation import track_cache
+
+IRRBB_BUCKETS = irrbb.IRRBB_BUCKETS
+
+
+# ==========================================================
+# ✅ Scenario Shocks
+# ==========================================================
+def get_baseline_scenario_id(scenarios=None):
+    """
+    The scenario whose rows act as the shared baseline: the one named
+    'Baseline', else the first one with no shocks at all.
+    """
+    scenarios = queries.get_scenarios() if scenarios is None else scenarios
+    named = scenarios[scenarios['name'] == 'Baseline']
+    if not named.empty:
+        return int(named['id'].iloc[0])
+    unshocked = scenarios[
+        (scenarios[['liquidity_shock', 'ir_shift', 'credit_shock']].astype(float) == 0).all(axis=1)
+    ]
+    return int(unshocked['id'].iloc[0]) if not unshocked.empty else None
+
+
+def get_scenario_shocks(scenario_ids=None):
+    """
+    Shock vectors per scenario as decimals: liquidity_shock (% withdrawal),
+    ir_shift and credit_shock (bps).
+    """
+    scenarios = queries.get_scenarios()
+    if scenario_ids is not None:
+        scenarios = scenarios.set_index('id').loc[list(scenario_ids)].reset_index()
+    return pd.DataFrame({
+        'scenario_id': scenarios['id'].astype(int).values,
+        'name': scenarios['name'].values,
+        'liquidity_shock': scenarios['liquidity_shock'].astype(float).fillna(0).values / 100,
+        'ir_shift': scenarios['ir_shift'].astype(float).fillna(0).values / 10_000,
+        'credit_shock': scenarios['credit_shock'].astype(float).fillna(0).values / 10_000,
+    })
+
+
+# ==========================================================
+# ✅ Shared Baseline Arrays (loaded once per data version)
+# ==========================================================
+def _readonly(**arrays):
+    for a in arrays.values():
+        a.setflags(write=False)
+    return arrays
+
+
+@track_cache
+@functools.lru_cache(maxsize=4)
+def _liquidity_base(baseline_id, version):
+    cf = queries.get_cashflows(scenario_id=baseline_id)
+    amount = cf['amount'].to_numpy(dtype=float)
+    return _readonly(
+        amount=amount,
+        is_outflow=(cf['direction'] == 'outflow').to_numpy(),
+        hqlatype=cf['hqlatype'].to_numpy(dtype=object),
+        asf=amount * cf['asf_factor'].astype(float).fillna(0).to_numpy(),
+        rsf=amount * cf['rsf_factor'].astype(float).fillna(0).to_numpy(),
+    )
+
+
+@track_cache
+@functools.lru_cache(maxsize=4)
+def _irrbb_base(baseline_id, version):
+    instruments = queries.get_irrbb(scenario_id=baseline_id)
+    years = (pd.to_datetime(instruments['maturity_date']) - pd.to_datetime(instruments['date'])).dt.days / 365.25
+    # Same key-rate engine as irrbb.get_pv01_by_bucket, not the stored irrbb.pv01
+    key_rates = irrbb.key_rate_pv01(instruments)
+    return _readonly(
+        pv01=key_rates.sum(axis=1),
+        key_rate_pv01=key_rates,
+        years=years.to_numpy(dtype=float),
+    )
+
+
+@track_cache
+@functools.lru_cache(maxsize=4)
+def _capital_base(baseline_id, version):
+    rwa = queries.get_rwa(scenario_id=baseline_id)
+    balance = queries.get_balance_sheet(scenario_id=baseline_id)
+    classes = pd.Categorical(rwa['asset_class'])
+    daily = credit_risk.daily_rwa_by_approach(rwa)
+    capital = balance.groupby('item')['amount'].sum()
+    return _readonly(
+        rwa=rwa['rwa_amount'].to_numpy(dtype=float),
+        asset_class=classes.codes.astype(np.int64),
+        asset_class_names=np.asarray(classes.categories, dtype=object),
+        std_rwa=daily['std_rwa'].to_numpy(dtype=float),
+        irb_rwa=daily['irb_rwa'].to_numpy(dtype=float),
+        capital=np.array([float(capital.get(item, 0)) for item in ['CET1', 'Tier1', 'Total Capital']]),
+    )
+
+
+def _base(loader, baseline_id):
+    if baseline_id is None:
+        baseline_id = get_baseline_scenario_id()
+    return loader(baseline_id, parameters.data_version())
+
+
+def get_irrbb_base(scenario_id=None):
+    """
+    A scenario's key-rate PV01 per instrument (total and per IRRBB_BUCKETS
+    column, the baseline by default), cached per data version.
+    """
+    return _base(_irrbb_base, scenario_id)
+
+
+def get_capital_base(scenario_id=None):
+    """
+    A scenario's stored RWA per exposure with asset class codes and its
+    capital items (the baseline by default), cached per data version.
+    """
+    return _base(_capital_base, scenario_id)
+
+
+# ==========================================================
+# ✅ Liquidity Overlay (run-off on outflows, lost stable funding)
+# ==========================================================
+def overlay_liquidity(scenario_ids=None, baseline_id=None):
+    """
+    LCR and NSFR per scenario from the baseline cashflows: outflows run off
+    at (1 + liquidity_shock) and available stable funding shrinks by
+    liquidity_shock. Evaluated for all scenarios at once.
+    """
+    base = _base(_liquidity_base, baseline_id)
+    shocks = get_scenario_shocks(scenario_ids)
+
+    # Haircuts and the inflow cap honour each scenario's params overrides
+    scenario_params = [parameters.load_params(sid) for sid in shocks['scenario_id']]
+    inflow_cap = np.array([p.lcr_inflow_cap for p in scenario_params])
+
+    amount_by_type = pd.Series(base['amount']).groupby(base['hqlatype']).sum()
+    hqla = np.array([
+        (amount_by_type * (1 - amount_by_type.index.map(p.haircut_map).fillna(1.0).to_numpy())).sum()
+        for p in scenario_params
+    ])
+    outflows = base['amount'][base['is_outflow']].sum()
+    inflows = base['amount'][~base['is_outflow']].sum()
+    asf = base['asf'][~base['is_outflow']].sum()
+    rsf = base['rsf'][base['is_outflow']].sum()
+
+    # Every scenario is a scalar multiplier on the shared baseline sums
+    ls = shocks['liquidity_shock'].to_numpy()
+    stressed_out = outflows * (1 + ls)
+    net_outflows = stressed_out - np.minimum(inflows, stressed_out * inflow_cap)
+    stressed_asf = asf * (1 - ls)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lcr = np.where(net_outflows > 0, hqla / net_outflows, np.inf)
+        nsfr = np.where(rsf > 0, stressed_asf / rsf, np.inf)
+
+    return shocks[['scenario_id', 'name']].assign(
+        HQLA=hqla,
+        Outflows=stressed_out,
+        Inflows=inflows,
+        NetOutflows=net_outflows,
+        LCR=lcr,
+        ASF=stressed_asf,
+        RSF=rsf,
+        NSFR=nsfr,
+    )
+
+
+# ==========================================================
+# ✅ IRRBB Overlay (parallel curve shift)
+# ==========================================================
+def overlay_irrbb(scenario_ids=None, baseline_id=None):
+    """
+    Key-rate PV01 by bucket and ∆EVE per scenario. Each instrument's PV01 is
+    re-discounted for the scenario's parallel shift (exp(-shift * t)); that
+    shifted PV01 is what Total PV01 and the bucket matrix report. ∆EVE is
+    the first-order figure on base PV01, sum(PV01) * shift in bps, as in
+    compute.calculate_eve_sensitivity, so it does not use Total PV01.
+    Returns (summary per scenario, PV01 bucket x scenario matrix).
+    """
+    base = _base(_irrbb_base, baseline_id)
+    shocks = get_scenario_shocks(scenario_ids)
+    shift = shocks['ir_shift'].to_numpy()
+
+    # instruments x scenarios
+    discount = np.exp(-base['years'][:, None] * shift[None, :])
+    shifted_pv01 = base['pv01'][:, None] * discount
+    by_bucket = base['key_rate_pv01'].T @ discount
+
+    summary = shocks[['scenario_id', 'name']].assign(**{
+        'Total PV01': shifted_pv01.sum(axis=0),
+        'Shock (bps)': shift * 10_000,
+        'Delta EVE': base['pv01'].sum() * shift * 10_000,
+    })
+    profile = pd.DataFrame(by_bucket, index=IRRBB_BUCKETS, columns=shocks['scenario_id'].values)
+    profile.index.name = 'tenor_bucket'
+    return summary, profile
+
+
+# ==========================================================
+# ✅ Capital Overlay (risk-weight scaling)
+# ==========================================================
+def overlay_capital(scenario_ids=None, baseline_id=None):
+    """
+    RWA and capital ratios per scenario with baseline risk weights scaled by
+    (1 + credit_shock); capital is taken from the baseline balance sheet.
+    STD and IRB RWA are scaled per date, then floored with each scenario's
+    output_floor, so RWA and the ratios match compute.calculate_capital_ratios.
+    Returns (summary per scenario, unfloored RWA asset class x scenario matrix).
+    """
+    base = _base(_capital_base, baseline_id)
+    shocks = get_scenario_shocks(scenario_ids)
+    multiplier = 1 + shocks['credit_shock'].to_numpy()
+    output_floor = np.array([parameters.load_params(sid).output_floor for sid in shocks['scenario_id']])
+
+    rwa_by_class = np.bincount(
+        base['asset_class'], weights=base['rwa'], minlength=len(base['asset_class_names'])
+    )
+    # dates x scenarios
+    std_rwa = base['std_rwa'][:, None] * multiplier
+    irb_rwa = base['irb_rwa'][:, None] * multiplier
+    total_rwa = (std_rwa + credit_risk.apply_output_floor(std_rwa, irb_rwa, output_floor)).sum(axis=0)
+    cet1, tier1, total_capital = base['capital']
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        summary = shocks[['scenario_id', 'name']].assign(**{
+            'RWA': total_rwa,
+            'CET1 Ratio': np.where(total_rwa > 0, cet1 / total_rwa, np.inf),
+            'Tier1 Ratio': np.where(total_rwa > 0, tier1 / total_rwa, np.inf),
+            'Total Capital Ratio': np.where(total_rwa > 0, total_capital / total_rwa, np.inf),
+        })
+    by_class = pd.DataFrame(
+        np.outer(rwa_by_class, multiplier),
+        index=base['asset_class_names'],
+        columns=shocks['scenario_id'].values
+    )
+    by_class.index.name = 'asset_class'
+    return summary, by_class
+
+
+# ==========================================================
+# ✅ All Overlays
+# ==========================================================
+def overlay_summary(scenario_ids=None, baseline_id=None):
+    """
+    One row per scenario with the headline liquidity, capital and IRRBB
+    metrics, all derived from the baseline rows.
+    """
+    liquidity = overlay_liquidity(scenario_ids, baseline_id)
+    capital, _ = overlay_capital(scenario_ids, baseline_id)
+    irrbb, _ = overlay_irrbb(scenario_ids, baseline_id)
+    return (
+        liquidity[['scenario_id', 'name', 'LCR', 'NSFR']]
+        .merge(capital.drop(columns='name'), on='scenario_id')
+        .merge(irrbb[['scenario_id', 'Total PV01', 'Delta EVE']], on='scenario_id')
+    )
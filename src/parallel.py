@@ -0,0 +1,123 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from src import queries
+from src.accumulators import LiquidityAccumulator
+
+# Hive-style null partition name used by pandas/pyarrow
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+
+# ==========================================================
+# ✅ Partitions
+# ==========================================================
+def list_partitions(scenario_id=None, parquet_root=None):
+    """
+    (scenario_id, month) partitions to aggregate, largest first so the
+    biggest pieces start early. month is a 'YYYY-MM' string.
+    """
+    if parquet_root:
+        partitions = []
+        for scenario_dir in sorted(os.listdir(parquet_root)):
+            if not scenario_dir.startswith('scenario_id='):
+                continue
+            value = scenario_dir.split('=', 1)[1]
+            sid = None if value == NULL_PARTITION else int(float(value))
+            if scenario_id is not None and sid != scenario_id:
+                continue
+            for month_dir in sorted(os.listdir(os.path.join(parquet_root, scenario_dir))):
+                if month_dir.startswith('month='):
+                    path = os.path.join(parquet_root, scenario_dir, month_dir)
+                    size = sum(entry.stat().st_size for entry in os.scandir(path))
+                    partitions.append({
+                        'scenario_id': sid, 'month': month_dir.split('=', 1)[1], 'size': size, 'path': path
+                    })
+        return sorted(partitions, key=lambda p: -p['size'])
+
+    df = queries.get_cashflow_partitions(scenario_id=scenario_id)
+    return [
+        {
+            'scenario_id': None if pd.isna(row.scenario_id) else int(row.scenario_id),
+            'month': pd.Timestamp(row.month).strftime('%Y-%m'),
+            'size': int(row.row_count),
+        }
+        for row in df.itertuples()
+    ]
+
+
+def write_parquet_shards(parquet_root, scenario_id=None, chunksize=100_000):
+    """
+    Exports cashflows as Parquet shards under
+    parquet_root/scenario_id=<id>/month=<YYYY-MM>/, one file per chunk.
+    A partition's shards from an earlier export are replaced, not added
+    to. Requires pyarrow.
+    """
+    written = set()
+    for chunk in queries.iter_cashflows(scenario_id=scenario_id, chunksize=chunksize):
+        chunk = chunk.assign(month=pd.to_datetime(chunk['date']).dt.strftime('%Y-%m'))
+        for (sid, month), part in chunk.groupby(['scenario_id', 'month'], dropna=False, sort=False):
+            key = (None if pd.isna(sid) else int(sid), month)
+            # Clear old shards the first time this export writes a partition, then append
+            behavior = 'overwrite_or_ignore' if key in written else 'delete_matching'
+            written.add(key)
+            part.to_parquet(
+                parquet_root, partition_cols=['scenario_id', 'month'], index=False, existing_data_behavior=behavior
+            )
+
+
+# ==========================================================
+# ✅ Workers
+# ==========================================================
+def _init_worker():
+    # Forked workers must not reuse the parent's pooled connections
+    queries.engine.dispose(close=False)
+
+
+def _aggregate_partition(partition, chunksize, parquet_root=None):
+    """
+    Aggregates one (scenario_id, month) partition into an accumulator.
+    """
+    acc = LiquidityAccumulator()
+    sid, month = partition['scenario_id'], partition['month']
+
+    if parquet_root:
+        for entry in sorted(os.scandir(partition['path']), key=lambda e: e.name):
+            # The scenario is a partition directory, not a column of the shard
+            acc.update(pd.read_parquet(entry.path).assign(scenario_id=sid))
+        return acc
+
+    start = pd.Timestamp(f"{month}-01")
+    end = start + pd.offsets.MonthEnd(0)
+    # A NULL scenario means "no filter" to the query, so ask for unassigned rows explicitly
+    for chunk in queries.iter_cashflows(
+        start_date=start.date(), end_date=end.date(), scenario_id=sid, chunksize=chunksize,
+        unassigned=sid is None
+    ):
+        acc.update(chunk)
+    return acc
+
+
+# ==========================================================
+# ✅ Partitioned Execution
+# ==========================================================
+def aggregate_cashflows(scenario_id=None, parquet_root=None, max_workers=None, chunksize=100_000):
+    """
+    Aggregates cashflows partition by partition across worker processes and
+    merges the partial accumulators in this process with one regroup (the
+    merge is cheap next to shipping state back to workers). Reads from the
+    database, or from Parquet shards written by write_parquet_shards.
+    """
+    partitions = list_partitions(scenario_id=scenario_id, parquet_root=parquet_root)
+    if not partitions:
+        return LiquidityAccumulator()
+
+    max_workers = max_workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker) as pool:
+        partials = list(pool.map(
+            _aggregate_partition,
+            partitions,
+            [chunksize] * len(partitions),
+            [parquet_root] * len(partitions),
+        ))
+
+    return LiquidityAccumulator().merge(*partials)
@@ -0,0 +1,161 @@
+import functools
+import hashlib
+import threading
+import time
+from dataclasses import dataclass, fields
+from src import queries
+from src.instrumentation import track_cache
+
+
+# ==========================================================
+# ✅ Typed Basel Parameters
+# ==========================================================
+@dataclass(frozen=True)
+class BaselParams:
+    """
+    Immutable, validated view of the params table. Values are floats,
+    missing keys take the regulatory defaults below, and unknown keys are
+    kept in `extra` (as strings) so nothing in the table is lost.
+    """
+
+    # LCR
+    haircut_level2a: float = 0.15
+    haircut_level2b: float = 0.50
+    lcr_inflow_cap: float = 0.75
+    lcr_outflow_cap: float = 1.00
+
+    # Thresholds
+    eve_tier1_breach_ratio: float = 0.15
+    capital_requirement_ratio: float = 0.08
+    output_floor: float = 0.725
+
+    extra: tuple = ()
+
+    def __post_init__(self):
+        errors = [
+            f"{f.name}={getattr(self, f.name)!r}"
+            for f in fields(self)
+            if f.name != 'extra' and not (
+                isinstance(getattr(self, f.name), float) and 0.0 <= getattr(self, f.name) <= 1.0
+            )
+        ]
+        if errors:
+            raise ValueError(f"Invalid params (expected floats in [0, 1]): {', '.join(errors)}")
+
+    @classmethod
+    def from_mapping(cls, raw):
+        """
+        Builds params from a {key: value} mapping of strings (the params
+        table), raising ValueError on values that are not numbers.
+        """
+        known = {f.name for f in fields(cls)} - {'extra'}
+        values, errors = {}, []
+        for key, value in raw.items():
+            if key not in known:
+                continue
+            try:
+                values[key] = float(value)
+            except (TypeError, ValueError):
+                errors.append(f"{key}={value!r}")
+        if errors:
+            raise ValueError(f"Invalid params (not a number): {', '.join(errors)}")
+
+        extra = tuple(sorted((key, str(value)) for key, value in raw.items() if key not in known))
+        return cls(**values, extra=extra)
+
+    def with_overrides(self, overrides):
+        """
+        Copy with the given {key: value} overrides applied and validated.
+        """
+        if not overrides:
+            return self
+        merged = {f.name: getattr(self, f.name) for f in fields(self) if f.name != 'extra'}
+        merged.update(dict(self.extra))
+        merged.update(overrides)
+        return type(self).from_mapping(merged)
+
+    def get(self, key, default=None):
+        """
+        dict-style lookup, covering the `extra` keys as well.
+        """
+        if key != 'extra' and key in {f.name for f in fields(self)}:
+            return getattr(self, key)
+        return dict(self.extra).get(key, default)
+
+    @property
+    def haircut_map(self):
+        """
+        HQLA haircut per hqlatype; non-HQLA ('None') is fully haircut.
+        """
+        return {
+            'Level1': 0.0,
+            'Level2A': self.haircut_level2a,
+            'Level2B': self.haircut_level2b,
+            'None': 1.0
+        }
+
+    @property
+    def version(self):
+        """
+        Short content hash, stable across processes, for cache keys.
+        """
+        payload = repr([(f.name, getattr(self, f.name)) for f in fields(self)])
+        return hashlib.sha1(payload.encode()).hexdigest()[:12]
+
+
+# ==========================================================
+# ✅ Loading (once per data version)
+# ==========================================================
+# How long a resolved data version is trusted before change_log is read again
+VERSION_TTL_SECONDS = 60
+
+_version = {'value': None, 'checked': 0.0}
+_version_lock = threading.Lock()
+
+
+def data_version():
+    """
+    The change_log watermark, re-read at most every VERSION_TTL_SECONDS.
+    Every per-data-version cache keys on it, so a render costs at most one
+    watermark probe however many cache layers it goes through.
+    """
+    with _version_lock:
+        now = time.monotonic()
+        if _version['value'] is None or now - _version['checked'] > VERSION_TTL_SECONDS:
+            _version['value'] = queries.get_change_watermark()
+            _version['checked'] = now
+        return _version['value']
+
+
+@functools.lru_cache(maxsize=4)
+def _load_raw(version):
+    return queries.get_params(), queries.get_scenario_params()
+
+
+@track_cache
+@functools.lru_cache(maxsize=64)
+def _load_params(scenario_id, version):
+    raw, scenario_overrides = _load_raw(version)
+    params = BaselParams.from_mapping(raw)
+    return params.with_overrides(scenario_overrides.get(scenario_id, {}))
+
+
+def load_params(scenario_id=None):
+    """
+    BaselParams for a scenario (base params plus its scenario_params
+    overrides). Read from the database once per data version; the version
+    itself is re-checked at most every VERSION_TTL_SECONDS, so lookups in
+    loops cost no queries. Call reload() after editing the params tables.
+    """
+    return _load_params(scenario_id, data_version())
+
+
+def reload():
+    """
+    Drops the cached params and data version so the next load_params()
+    re-reads them.
+    """
+    with _version_lock:
+        _version['value'] = None
+    _load_raw.cache_clear()
+    _load_params.cache_clear()
@@ -3,6 +3,8 @@ from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
 import os
 import streamlit as st
+from src.instrumentation import instrument_query, instrument_version_probe
+from src import explain
 
 db_config = st.secrets["postgres"]
 
@@ -10,21 +12,50 @@ engine = create_engine(
     f"postgresql://{db_config.user}:{db_config.password}@{db_config.host}:{db_config.port}/{db_config.database}"
 )
 
+# ===================================================
+# ✅ Statement Runner
+# ===================================================
+def _read_sql(query, params=None):
+    """
+    Runs a SELECT and returns a DataFrame. Every query in this module goes
+    through here, so diagnostics apply to all of them: with explain capture
+    on (explain.enable() or BASEL_EXPLAIN_CAPTURE=1) the statement is first
+    run under EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) and its plan stored.
+    """
+    if explain.is_enabled():
+        explain.capture_plan(engine, query, params)
+    return pd.read_sql(text(query), con=engine, params=params)
+
+
 # ===================================================
 # ✅ Params Table Fetcher
 # ===================================================
+@instrument_query
 def get_params():
     """
     Returns params table as a dictionary {key: value}
     """
-    df = pd.read_sql("SELECT * FROM params", con=engine)
+    df = _read_sql("SELECT * FROM params")
     params = pd.Series(df.value.values, index=df.key).to_dict()
     return params
 
 
+@instrument_query
+def get_scenario_params():
+    """
+    Returns per-scenario params overrides as {scenario_id: {key: value}}
+    """
+    df = _read_sql("SELECT scenario_id, key, value FROM scenario_params")
+    return {
+        int(scenario_id): pd.Series(group.value.values, index=group.key).to_dict()
+        for scenario_id, group in df.groupby('scenario_id')
+    }
+
+
 # ===================================================
 # ✅ Cashflows Query
 # ===================================================
+@instrument_query
 def get_cashflows(start_date=None, end_date=None, scenario_id=None):
     """
     Fetch cashflows with optional date range and scenario filter.
@@ -36,17 +67,56 @@ def get_cashflows(start_date=None, end_date=None, scenario_id=None):
     AND (:end IS NULL OR date <= :end)
     AND (:scenario IS NULL OR scenario_id = :scenario)
     """
-    df = pd.read_sql(
-        text(query),
-        con=engine,
-        params={'start': start_date, 'end': end_date, 'scenario': scenario_id}
-    )
+    df = _read_sql(query, {'start': start_date, 'end': end_date, 'scenario': scenario_id})
+    return df
+
+
+@instrument_query
+def iter_cashflows(start_date=None, end_date=None, scenario_id=None, chunksize=100_000, unassigned=False):
+    """
+    Streams cashflows in DataFrame chunks of at most `chunksize` rows through
+    a server-side cursor, so the full result is never held in memory.
+    Only the columns the liquidity aggregations need are fetched.
+    unassigned=True keeps only rows without a scenario.
+    """
+    query = """
+    SELECT date, product, counterparty, maturity_date, amount, direction,
+           hqlatype, asf_factor, rsf_factor, scenario_id
+    FROM cashflows
+    WHERE (:start IS NULL OR date >= :start)
+    AND (:end IS NULL OR date <= :end)
+    AND (:scenario IS NULL OR scenario_id = :scenario)
+    AND (NOT :unassigned OR scenario_id IS NULL)
+    """
+    params = {'start': start_date, 'end': end_date, 'scenario': scenario_id, 'unassigned': unassigned}
+    if explain.is_enabled():
+        explain.capture_plan(engine, query, params)
+
+    with engine.connect().execution_options(stream_results=True, max_row_buffer=chunksize) as conn:
+        yield from pd.read_sql(text(query), con=conn, params=params, chunksize=chunksize)
+
+
+@instrument_query
+def get_cashflow_partitions(scenario_id=None):
+    """
+    Lists (scenario_id, month) partitions of the cashflows table with row
+    counts, largest first. month is the first day of the calendar month.
+    """
+    query = """
+    SELECT scenario_id, date_trunc('month', date)::date AS month, COUNT(*) AS row_count
+    FROM cashflows
+    WHERE (:scenario IS NULL OR scenario_id = :scenario)
+    GROUP BY scenario_id, date_trunc('month', date)
+    ORDER BY row_count DESC
+    """
+    df = _read_sql(query, {'scenario': scenario_id})
     return df
 
 
 # ===================================================
 # ✅ RWA Query
 # ===================================================
+@instrument_query
 def get_rwa(start_date=None, end_date=None, scenario_id=None):
     """
     Fetch RWA exposures with optional date and scenario filters.
@@ -57,17 +127,77 @@ def get_rwa(start_date=None, end_date=None, scenario_id=None):
     AND (:end IS NULL OR date <= :end)
     AND (:scenario IS NULL OR scenario_id = :scenario)
     """
-    df = pd.read_sql(
-        text(query),
-        con=engine,
-        params={'start': start_date, 'end': end_date, 'scenario': scenario_id}
+    df = _read_sql(query, {'start': start_date, 'end': end_date, 'scenario': scenario_id})
+    return df
+
+
+@instrument_query
+def get_rwa_by_approach_daily(scenario_id=None):
+    """
+    STD and IRB RWA per (scenario_id, date) in one grouped pass, for the
+    output floor. Dates without one of the approaches get 0 for it.
+    """
+    query = """
+    SELECT scenario_id, date,
+           COALESCE(SUM(rwa_amount) FILTER (WHERE approach = 'STD'), 0) AS std_rwa,
+           COALESCE(SUM(rwa_amount) FILTER (WHERE approach = 'IRB'), 0) AS irb_rwa
+    FROM rwa
+    WHERE (:scenario IS NULL OR scenario_id = :scenario)
+    GROUP BY scenario_id, date
+    ORDER BY scenario_id, date
+    """
+    df = _read_sql(query, {'scenario': scenario_id})
+    return df
+
+
+@instrument_query
+def get_capital_by_date(scenario_id=None, output_floor=0.725):
+    """
+    One row per date with RWA (before and after the output floor, applied
+    per scenario as in credit_risk.apply_output_floor) and the CET1, Tier1
+    and Total Capital balances, pivoted by conditional aggregation.
+    """
+    query = """
+    WITH rwa_daily AS (
+        SELECT scenario_id, date,
+               COALESCE(SUM(rwa_amount) FILTER (WHERE approach = 'STD'), 0) AS std_rwa,
+               COALESCE(SUM(rwa_amount) FILTER (WHERE approach = 'IRB'), 0) AS irb_rwa
+        FROM rwa
+        WHERE (:scenario IS NULL OR scenario_id = :scenario)
+        GROUP BY scenario_id, date
+    ),
+    rwa_by_date AS (
+        SELECT date,
+               SUM(std_rwa + irb_rwa) AS rwa_amount,
+               SUM(std_rwa + CASE WHEN irb_rwa > 0 THEN GREATEST(irb_rwa, :floor * std_rwa) ELSE irb_rwa END)
+                   AS floored_rwa
+        FROM rwa_daily
+        GROUP BY date
+    ),
+    capital_by_date AS (
+        SELECT date,
+               SUM(amount) FILTER (WHERE item = 'CET1') AS cet1,
+               SUM(amount) FILTER (WHERE item = 'Tier1') AS tier1,
+               SUM(amount) FILTER (WHERE item = 'Total Capital') AS total_capital
+        FROM balance_sheet
+        WHERE (:scenario IS NULL OR scenario_id = :scenario)
+        AND item IN ('CET1', 'Tier1', 'Total Capital')
+        GROUP BY date
     )
+    SELECT COALESCE(r.date, c.date) AS date,
+           r.rwa_amount, r.floored_rwa, c.cet1, c.tier1, c.total_capital
+    FROM rwa_by_date r
+    FULL OUTER JOIN capital_by_date c ON c.date = r.date
+    ORDER BY date
+    """
+    df = _read_sql(query, {'scenario': scenario_id, 'floor': output_floor})
     return df
 
 
 # ===================================================
 # ✅ IRRBB Query
 # ===================================================
+@instrument_query
 def get_irrbb(scenario_id=None):
     """
     Fetch IRRBB instruments with optional scenario filter.
@@ -76,17 +206,30 @@ def get_irrbb(scenario_id=None):
     SELECT * FROM irrbb
     WHERE (:scenario IS NULL OR scenario_id = :scenario)
     """
-    df = pd.read_sql(
-        text(query),
-        con=engine,
-        params={'scenario': scenario_id}
-    )
+    df = _read_sql(query, {'scenario': scenario_id})
+    return df
+
+
+@instrument_query
+def get_key_rate_pv01(scenario_id=None):
+    """
+    Key-rate PV01 summed per tenor bucket (written by src.irrbb).
+    """
+    query = """
+    SELECT k.tenor_bucket, SUM(k.pv01) AS pv01
+    FROM irrbb_key_rate_pv01 k
+    JOIN irrbb i ON i.id = k.irrbb_id
+    WHERE (:scenario IS NULL OR i.scenario_id = :scenario)
+    GROUP BY k.tenor_bucket
+    """
+    df = _read_sql(query, {'scenario': scenario_id})
     return df
 
 
 # ===================================================
 # ✅ Balance Sheet Query
 # ===================================================
+@instrument_query
 def get_balance_sheet(scenario_id=None):
     """
     Fetch balance sheet items with optional scenario filter.
@@ -95,22 +238,91 @@ def get_balance_sheet(scenario_id=None):
     SELECT * FROM balance_sheet
     WHERE (:scenario IS NULL OR scenario_id = :scenario)
     """
-    df = pd.read_sql(
-        text(query),
-        con=engine,
-        params={'scenario': scenario_id}
-    )
+    df = _read_sql(query, {'scenario': scenario_id})
     return df
 
 
 # ===================================================
 # ✅ Scenarios Query
 # ===================================================
+@instrument_query
 def get_scenarios():
     """
     Fetch all scenarios.
     """
-    df = pd.read_sql("SELECT * FROM scenarios", con=engine)
+    df = _read_sql("SELECT * FROM scenarios")
+    return df
+
+
+# ===================================================
+# ✅ Change Tracking Queries
+# ===================================================
+@instrument_version_probe
+def get_change_watermark():
+    """
+    Returns the latest change_log id (0 if nothing has been logged yet).
+    Any write to a tracked source table moves it forward.
+    """
+    df = _read_sql("SELECT COALESCE(MAX(id), 0) AS watermark FROM change_log")
+    return int(df['watermark'].iloc[0])
+
+
+@instrument_query
+def get_kpi_results(scenario_id=None, metric=None):
+    """
+    Fetch incrementally maintained daily KPI results (long format).
+    """
+    query = """
+    SELECT scenario_id, date, metric, value FROM kpi_results
+    WHERE (:scenario IS NULL OR scenario_id = :scenario)
+    AND (:metric IS NULL OR metric = :metric)
+    ORDER BY date, metric
+    """
+    df = _read_sql(query, {'scenario': scenario_id, 'metric': metric})
+    return df
+
+
+# ===================================================
+# ✅ Hierarchical Rollups
+# ===================================================
+# table -> (hierarchy levels, root first; {measure: aggregate expression})
+ROLLUPS = {
+    'rwa': (
+        ['approach', 'asset_class', 'exposure_id'],
+        {'amount': 'SUM(amount)', 'rwa_amount': 'SUM(rwa_amount)'}
+    ),
+    'cashflows': (
+        ['direction', 'product', 'counterparty'],
+        {
+            'amount': 'SUM(amount)',
+            'asf': 'SUM(amount * COALESCE(asf_factor, 0))',
+            'rsf': 'SUM(amount * COALESCE(rsf_factor, 0))',
+            'asf_factor': 'SUM(COALESCE(asf_factor, 0))',
+            'rsf_factor': 'SUM(COALESCE(rsf_factor, 0))',
+        }
+    ),
+}
+
+
+@instrument_query
+def get_rollup(table, depth=None, scenario_id=None):
+    """
+    Every level of a ROLLUPS hierarchy (grand total included) in one
+    GROUP BY ROLLUP pass, down to `depth` levels. grouping_id is the
+    GROUPING() bitmask telling subtotal rows from NULL labels.
+    """
+    levels, measures = ROLLUPS[table]
+    if depth is not None and not 1 <= depth <= len(levels):
+        raise ValueError(f"Rollup depth for {table} must be between 1 and {len(levels)}, got {depth}")
+    columns = ', '.join(levels[:depth])
+    aggregates = ', '.join(f"{expr} AS {name}" for name, expr in measures.items())
+    query = f"""
+    SELECT {columns}, GROUPING({columns}) AS grouping_id, {aggregates}, COUNT(*) AS row_count
+    FROM {table}
+    WHERE (:scenario IS NULL OR scenario_id = :scenario)
+    GROUP BY ROLLUP ({columns})
+    """
+    df = _read_sql(query, {'scenario': scenario_id})
     return df
 
 
@@ -0,0 +1,118 @@
+import functools
+import pandas as pd
+import numpy as np
+from src import queries, parameters, cube, overlays
+from src.instrumentation import track_cache
+
+# Metric -> component dimension it is broken down by
+COMPONENTS = {
+    'HQLA': 'hqlatype',
+    'Outflows': 'counterparty',
+    'RWA': 'asset_class',
+    'PV01': 'tenor_bucket',
+}
+
+
+# ==========================================================
+# ✅ Shared Component Aggregates (all scenarios, one pass)
+# ==========================================================
+def _liquidity_components(scenario_id):
+    scenario_cube = cube.get_cube(scenario_id)
+    hqla = scenario_cube.hqla_composition(parameters.load_params(scenario_id).haircut_map)
+    outflows = scenario_cube.slice(direction='outflow')
+    present = outflows.total('count', by='counterparty') > 0
+    return {
+        'HQLA': pd.Series(hqla['Post-Haircut'].to_numpy(), index=hqla['HQLA Type']),
+        'Outflows': outflows.total('amount', by='counterparty')[present],
+    }
+
+
+def _by_code(values, codes, labels):
+    totals = np.bincount(codes[codes >= 0], weights=values[codes >= 0], minlength=len(labels))
+    present = np.bincount(codes[codes >= 0], minlength=len(labels)) > 0
+    return pd.Series(totals, index=labels)[present]
+
+
+@track_cache
+@functools.lru_cache(maxsize=4)
+def _component_table(version):
+    columns = {}
+    for scenario_id in queries.get_scenarios()['id'].astype(int):
+        irrbb = overlays.get_irrbb_base(scenario_id)
+        capital = overlays.get_capital_base(scenario_id)
+        components = {
+            **_liquidity_components(scenario_id),
+            'RWA': _by_code(capital['rwa'], capital['asset_class'], capital['asset_class_names']),
+            'PV01': pd.Series(irrbb['key_rate_pv01'].sum(axis=0), index=overlays.IRRBB_BUCKETS),
+        }
+        columns[scenario_id] = pd.concat(
+            {metric: components[metric].astype(float) for metric in COMPONENTS}, names=['metric', 'component']
+        )
+    if not columns:
+        return pd.DataFrame(index=pd.MultiIndex.from_arrays([[], []], names=['metric', 'component']))
+    return pd.DataFrame(columns).fillna(0.0)
+
+
+def get_component_table():
+    """
+    HQLA by level, outflows by counterparty, RWA by asset class and PV01 by
+    bucket for every scenario: rows (metric, component), one column per
+    scenario_id. Built once per data version from the scenario cubes and
+    the overlay bases, and shared by all diffs.
+    """
+    return _component_table(parameters.data_version())
+
+
+# ==========================================================
+# ✅ Scenario Diffs
+# ==========================================================
+def _column(table, scenario_id):
+    if scenario_id not in table.columns:
+        raise KeyError(f"Unknown scenario_id: {scenario_id}")
+    return table[scenario_id]
+
+
+def scenario_diff(base_id, other_id, top_n=10):
+    """
+    Per-metric and per-component deltas of other_id against base_id.
+    Components are ranked within their metric by absolute delta; Drivers
+    are the top_n components across all metrics by delta relative to the
+    metric's gross base (sum of absolute components).
+    """
+    table = get_component_table()
+    base, other = _column(table, base_id), _column(table, other_id)
+
+    components = pd.DataFrame({'Base': base, 'Scenario': other, 'Delta': other - base})
+    metrics = components.groupby(level='metric', sort=False).sum()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        metrics['Delta %'] = metrics['Delta'] / metrics['Base'].abs()
+
+    abs_delta = components['Delta'].abs()
+    move = abs_delta.groupby(level='metric').transform('sum')
+    components['Share of Move'] = (components['Delta'] / move.replace(0, np.nan)).fillna(0.0)
+    # Gross base, so metrics whose components offset (PV01) are not blown up
+    base_total = components['Base'].abs().groupby(level='metric').transform('sum').to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        components['Impact %'] = np.where(base_total > 0, components['Delta'] / base_total, 0.0)
+    components['Rank'] = abs_delta.groupby(level='metric').rank(ascending=False, method='first').astype(int)
+    components = components.reset_index().sort_values(['metric', 'Rank'], ignore_index=True)
+
+    order = np.argsort(-components['Impact %'].abs().to_numpy(), kind='stable')[:top_n]
+    return {
+        'Metrics': metrics.reset_index(),
+        'Components': components,
+        'Drivers': components.iloc[order].reset_index(drop=True),
+    }
+
+
+def scenario_deltas(base_id, scenario_ids=None):
+    """
+    Metric deltas of many scenarios against base_id in one subtraction:
+    rows are metrics, one column per scenario.
+    """
+    table = get_component_table()
+    base = _column(table, base_id)
+    if scenario_ids is not None:
+        table = pd.DataFrame({sid: _column(table, sid) for sid in scenario_ids}, index=table.index)
+    totals = table.groupby(level='metric', sort=False).sum()
+    return totals.sub(base.groupby(level='metric', sort=False).sum(), axis=0)
@@ -0,0 +1,162 @@
+import functools
+import numpy as np
+from src import queries, cube, parameters, credit_risk, irrbb, stress
+from src.instrumentation import track_cache
+
+
+# ==========================================================
+# ✅ What-if Sensitivity Kernel
+# ==========================================================
+class SensitivityKernel:
+    """
+    Linear building blocks of the dashboard's what-if sliders for one
+    scenario: capital and RWA totals, PV01 and NII sensitivity vectors, and
+    the stress cells behind LCR/NSFR. Each block is loaded on first use;
+    after that every slider position is a handful of arithmetic operations
+    on these numbers, with no queries.
+    """
+
+    def __init__(self, scenario_id=None):
+        self.scenario_id = scenario_id
+
+    # ------------------------------------------------------
+    # Building blocks (loaded once)
+    # ------------------------------------------------------
+    @functools.cached_property
+    def capital(self):
+        balance = queries.get_balance_sheet(scenario_id=self.scenario_id)
+        capital = balance.groupby('item')['amount'].sum()
+        floor = credit_risk.output_floor_table(queries.get_rwa_by_approach_daily(scenario_id=self.scenario_id))
+        return {
+            'RWA': float(floor['Floored RWA'].sum()),
+            'CET1': float(capital.get('CET1', 0)),
+            'Tier1': float(capital.get('Tier1', 0)),
+            'Total Capital': float(capital.get('Total Capital', 0)),
+        }
+
+    @functools.cached_property
+    def irrbb(self):
+        # Key-rate PV01 per bucket (value change per 1bp)
+        pv01_by_bucket = irrbb.get_pv01_by_bucket(scenario_id=self.scenario_id)
+
+        # ∆NII per 1bp on each curve pillar, from the time-weighted repricing gaps
+        gaps = irrbb.get_repricing_gaps([self.scenario_id])
+        nii_by_pillar = irrbb.nii_sensitivity(gaps).iloc[0]
+
+        return {
+            'Total PV01': float(pv01_by_bucket.sum()),
+            'PV01': pv01_by_bucket.to_numpy(),
+            'NII': nii_by_pillar.to_numpy(),
+            'Total Gap': float(gaps.to_numpy().sum()),
+        }
+
+    @functools.cached_property
+    def liquidity(self):
+        params = parameters.load_params(self.scenario_id)
+        return {
+            'Cells': cube.get_cube(self.scenario_id).stress_cells(params.haircut_map),
+            'Inflow Cap': params.lcr_inflow_cap,
+        }
+
+    # ------------------------------------------------------
+    # Slider evaluations (pure arithmetic)
+    # ------------------------------------------------------
+    def capital_ratios(self, rwa_shock_pct=0.0):
+        """
+        Same result as compute.calculate_capital_ratios_under_rwa_shock.
+        """
+        c = self.capital
+        total_rwa = c['RWA'] * (1 + rwa_shock_pct)
+        return {
+            'RWA (shocked)': total_rwa,
+            'CET1 Ratio': c['CET1'] / total_rwa if total_rwa > 0 else np.inf,
+            'Tier1 Ratio': c['Tier1'] / total_rwa if total_rwa > 0 else np.inf,
+            'Total Capital Ratio': c['Total Capital'] / total_rwa if total_rwa > 0 else np.inf
+        }
+
+    def eve(self, shock_bps=200):
+        """
+        Parallel-shock ∆EVE = sum(PV01) * shock in bps.
+        """
+        total_pv01 = self.irrbb['Total PV01']
+        return {
+            'Total PV01': total_pv01,
+            'Shock (bps)': shock_bps,
+            'Delta EVE': total_pv01 * shock_bps
+        }
+
+    def nii(self, shock_bps=200):
+        """
+        Parallel-shock ∆NII = sum of the per-pillar NII sensitivity * shock.
+        """
+        return {
+            'Total Repricing Gap': self.irrbb['Total Gap'],
+            'Shock (bps)': shock_bps,
+            'Delta NII': float(self.irrbb['NII'].sum()) * shock_bps
+        }
+
+    def curve_shift(self, shocks_bps):
+        """
+        (∆EVE, ∆NII) for per-bucket shocks in bps, ordered as the IRRBB buckets (curve pillars).
+        """
+        shocks_bps = np.asarray(shocks_bps, dtype=float)
+        return float(self.irrbb['PV01'] @ shocks_bps), float(self.irrbb['NII'] @ shocks_bps)
+
+    def withdrawal(self, retail_withdrawal_pct=0.0, wholesale_withdrawal_pct=0.0):
+        """
+        LCR and NSFR under stress.withdrawal_stress, evaluated by the stress
+        engine on the cube's cells.
+        """
+        return self._liquidity_stress([stress.withdrawal_stress(retail_withdrawal_pct, wholesale_withdrawal_pct)])[0]
+
+    def _liquidity_stress(self, stresses):
+        liq = self.liquidity
+        result = stress.evaluate_stresses(liq['Cells'], stresses, inflow_cap=liq['Inflow Cap'])
+        return result[['LCR', 'NSFR']].to_dict('records')
+
+    def stress_test(self, shock_bps=200, retail_withdrawal_pct=0.2, wholesale_withdrawal_pct=0.4, rwa_stress_pct=0.1):
+        """
+        Same result dict as compute.run_stress_test.
+        """
+        delta_eve = self.eve(shock_bps)['Delta EVE']
+        delta_nii = self.nii(shock_bps)['Delta NII']
+        base, stressed = self._liquidity_stress([
+            {'name': 'Base', 'rules': []},
+            stress.withdrawal_stress(retail_withdrawal_pct, wholesale_withdrawal_pct),
+        ])
+        base_capital = self.capital_ratios()
+        stressed_capital = self.capital_ratios(rwa_stress_pct)
+
+        return {
+            "LCR (Base)": base['LCR'],
+            "LCR (Stressed)": stressed['LCR'],
+            "NSFR (Base)": base['NSFR'],
+            "NSFR (Stressed)": stressed['NSFR'],
+            "CET1 Ratio (Base)": base_capital['CET1 Ratio'],
+            "CET1 Ratio (Stressed)": stressed_capital['CET1 Ratio'],
+            "Tier1 Ratio (Base)": base_capital['Tier1 Ratio'],
+            "Tier1 Ratio (Stressed)": stressed_capital['Tier1 Ratio'],
+            "∆EVE (Base)": delta_eve,
+            "∆EVE (Stressed)": delta_eve,  # assumed same
+            "∆NII (Base)": delta_nii,
+            "∆NII (Stressed)": delta_nii,  # assumed same
+        }
+
+
+# ==========================================================
+# ✅ Kernel Cache
+# ==========================================================
+@track_cache
+@functools.lru_cache(maxsize=16)
+def _kernel(scenario_id, version):
+    return SensitivityKernel(scenario_id)
+
+
+def get_kernel(scenario_id=None):
+    """
+    The scenario's sensitivity kernel, rebuilt only when the data version
+    moves. Pages fetch it once per full run and pass it to their slider
+    fragments and to the compute functions' kernel argument, so fragment
+    reruns do no I/O and never see the kernel change mid-render.
+    """
+    return _kernel(scenario_id, parameters.data_version())
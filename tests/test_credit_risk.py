@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from src import credit_risk
+
+
+# ==========================================================
+# ✅ Standardised Risk Weights (CRR Art. 114, 122, 123, 125)
+# ==========================================================
+@pytest.mark.parametrize("asset_class, cqs, expected", [
+    ('sovereign', 1, 0.00),
+    ('sovereign', 3, 0.50),
+    ('sovereign', 6, 1.50),
+    ('corporate', None, 1.00),
+    ('corporate', 2, 0.50),
+    ('corporate', 5, 1.50),
+    ('mortgage', 4, 0.35),
+    ('retail', None, 0.75),
+])
+def test_standardised_risk_weights(asset_class, cqs, expected):
+    weight = credit_risk.standardised_risk_weights([asset_class], [cqs])
+    assert weight[0] == pytest.approx(expected)
+
+
+def test_standardised_unknown_class_is_nan():
+    assert np.isnan(credit_risk.standardised_risk_weights(['crypto'])[0])
+
+
+# ==========================================================
+# ✅ IRB Formula (BCBS illustrative IRB risk weights, LGD 45%, to 0.01%)
+# ==========================================================
+@pytest.mark.parametrize("pd_, expected_rw", [
+    (0.0003, 0.1444),
+    (0.0010, 0.2965),
+    (0.0025, 0.4947),
+    (0.0100, 0.9232),
+    (0.0200, 1.1486),
+    (0.0500, 1.4986),
+    (0.2000, 2.3823),
+])
+def test_irb_corporate_risk_weight(pd_, expected_rw):
+    k = credit_risk.irb_capital_requirement([pd_], [0.45], [2.5])
+    assert 12.5 * k[0] == pytest.approx(expected_rw, abs=1e-4)
+
+
+@pytest.mark.parametrize("asset_class, pd_, expected_rw", [
+    ('mortgage', 0.0003, 0.0415),
+    ('mortgage', 0.0100, 0.5640),
+    ('retail', 0.0100, 0.4577),
+])
+def test_irb_retail_risk_weight(asset_class, pd_, expected_rw):
+    k = credit_risk.irb_capital_requirement([pd_], [0.45], None, [asset_class])
+    assert 12.5 * k[0] == pytest.approx(expected_rw, abs=1e-4)
+
+
+def test_irb_pd_floor_and_maturity_bounds():
+    floored = credit_risk.irb_capital_requirement([0.0, credit_risk.PD_FLOOR], [0.45, 0.45], [2.5, 2.5])
+    assert floored[0] == pytest.approx(floored[1])
+
+    short, one_year, long_, five_years = credit_risk.irb_capital_requirement(
+        [0.01] * 4, [0.45] * 4, [0.1, 1.0, 30.0, 5.0]
+    )
+    assert short == pytest.approx(one_year)
+    assert long_ == pytest.approx(five_years)
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.cube import LiquidityCube
+
+HAIRCUTS = {'Level1': 0.0, 'Level2A': 0.15, 'Level2B': 0.5}
+INFLOW_CAP = 0.75
+
+FILTERS = [
+    {},
+    {'product': 'deposit'},
+    {'product': ['loan', 'bond'], 'counterparty': 'retail'},
+    {'counterparty': 'interbank'},
+]
+
+
+@pytest.fixture
+def cashflows():
+    rows = [
+        # date, days to maturity, product, counterparty, direction, hqlatype, amount, asf_factor, rsf_factor
+        ('2024-01-01', 5, 'deposit', 'retail', 'outflow', None, 100.0, 0.0, 0.05),
+        ('2024-01-01', 20, 'deposit', 'wholesale', 'outflow', None, 200.0, 0.0, 0.10),
+        ('2024-01-01', 3, 'loan', 'retail', 'inflow', None, 50.0, 0.9, 0.0),
+        ('2024-01-01', 400, 'bond', 'interbank', 'inflow', 'Level1', 300.0, 0.5, 0.0),
+        ('2024-01-02', 60, 'bond', 'interbank', 'inflow', 'Level2A', 120.0, 0.5, 0.0),
+        ('2024-01-02', 10, 'loan', 'wholesale', 'inflow', None, 90.0, 0.5, 0.0),
+        ('2024-01-02', 5, 'deposit', 'retail', 'outflow', None, 40.0, 0.0, 0.05),
+        ('2024-01-02', 200, 'loan', 'retail', 'outflow', None, 70.0, None, 0.85),
+    ]
+    df = pd.DataFrame(rows, columns=[
+        'date', 'days', 'product', 'counterparty', 'direction', 'hqlatype', 'amount', 'asf_factor', 'rsf_factor'
+    ])
+    df['date'] = pd.to_datetime(df['date'])
+    df['maturity_date'] = df['date'] + pd.to_timedelta(df.pop('days'), unit='D')
+    return df
+
+
+def _filtered(cashflows, product=None, counterparty=None):
+    mask = pd.Series(True, index=cashflows.index)
+    for col, values in (('product', product), ('counterparty', counterparty)):
+        if values is not None:
+            mask &= cashflows[col].isin(values if isinstance(values, list) else [values])
+    return cashflows[mask]
+
+
+def _bucket(days):
+    return pd.cut(days, [-np.inf, 7, 30, 90, 180, 365, np.inf],
+                  labels=['0-7d', '8-30d', '31-90d', '91-180d', '181-365d', '>1y']).astype(str)
+
+
+# ==========================================================
+# ✅ Reductions against plain pandas
+# ==========================================================
+@pytest.mark.parametrize("where", FILTERS)
+def test_lcr_matches_pandas(cashflows, where):
+    df = _filtered(cashflows, **where)
+    hqla = df[df['hqlatype'].isin(list(HAIRCUTS))]
+    total_hqla = (hqla['amount'] * (1 - hqla['hqlatype'].map(HAIRCUTS))).sum()
+    outflows = df.loc[df['direction'] == 'outflow', 'amount'].sum()
+    inflows = df.loc[df['direction'] == 'inflow', 'amount'].sum()
+    net = outflows - min(inflows, outflows * INFLOW_CAP)
+
+    lcr = LiquidityCube.from_cashflows(cashflows).slice(**where).lcr(HAIRCUTS, INFLOW_CAP)
+    assert lcr['HQLA'] == pytest.approx(total_hqla)
+    assert lcr['Outflows'] == pytest.approx(outflows)
+    assert lcr['Inflows'] == pytest.approx(inflows)
+    assert lcr['NetOutflows'] == pytest.approx(net)
+    assert lcr['LCR'] == (pytest.approx(total_hqla / net) if net > 0 else np.inf)
+
+
+@pytest.mark.parametrize("where", FILTERS)
+def test_nsfr_matches_pandas(cashflows, where):
+    df = _filtered(cashflows, **where)
+    inflows = df[df['direction'] == 'inflow']
+    outflows = df[df['direction'] == 'outflow']
+    asf = (inflows['amount'] * inflows['asf_factor'].fillna(0)).groupby(inflows['product']).sum()
+    rsf = (outflows['amount'] * outflows['rsf_factor'].fillna(0)).groupby(outflows['product']).sum()
+
+    nsfr = LiquidityCube.from_cashflows(cashflows).slice(**where).nsfr()
+    assert nsfr['ASF'] == pytest.approx(asf.sum())
+    assert nsfr['RSF'] == pytest.approx(rsf.sum())
+    assert nsfr['NSFR'] == (pytest.approx(asf.sum() / rsf.sum()) if rsf.sum() > 0 else np.inf)
+    assert nsfr['ASF_components'] == pytest.approx(asf.to_dict())
+    assert nsfr['RSF_components'] == pytest.approx(rsf.to_dict())
+
+
+@pytest.mark.parametrize("where", FILTERS)
+def test_hqla_composition_matches_pandas(cashflows, where):
+    df = _filtered(cashflows, **where)
+    hqla = df[df['hqlatype'].isin(list(HAIRCUTS))]
+    pre = hqla.groupby('hqlatype')['amount'].sum()
+    post = pre * (1 - np.array([HAIRCUTS[t] for t in pre.index], dtype=float))
+
+    composition = LiquidityCube.from_cashflows(cashflows).slice(**where).hqla_composition(HAIRCUTS)
+    composition = composition.set_index('HQLA Type')
+    assert list(composition.index) == list(pre.index)
+    np.testing.assert_allclose(composition['Pre-Haircut'].to_numpy(dtype=float), pre.to_numpy(dtype=float))
+    np.testing.assert_allclose(composition['Post-Haircut'].to_numpy(dtype=float), post.to_numpy(dtype=float))
+
+
+@pytest.mark.parametrize("where", FILTERS)
+def test_gap_heatmap_matches_pandas(cashflows, where):
+    df = _filtered(cashflows, **where).copy()
+    df['bucket'] = _bucket((df['maturity_date'] - df['date']).dt.days)
+    day_in = df[df['direction'] == 'inflow'].groupby('date')['amount'].sum()
+    day_out = df[df['direction'] == 'outflow'].groupby('date')['amount'].sum()
+    days = day_in.index.union(day_out.index)
+    day_in, day_out = day_in.reindex(days, fill_value=0), day_out.reindex(days, fill_value=0)
+    ratio = (np.minimum(day_in, day_out * INFLOW_CAP) / day_in.where(day_in > 0)).fillna(0)
+
+    signed = np.where(df['direction'] == 'inflow', df['amount'] * df['date'].map(ratio), -df['amount'])
+    expected = pd.Series(signed, index=[df['bucket'], df['date']]).groupby(level=[0, 1]).sum()
+    expected = expected.unstack(1).fillna(0).sort_index()
+
+    heatmap = LiquidityCube.from_cashflows(cashflows).slice(**where).gap_heatmap(INFLOW_CAP)
+    assert list(heatmap.index) == list(expected.index)
+    assert list(pd.to_datetime(heatmap.columns)) == list(expected.columns)
+    np.testing.assert_allclose(heatmap.to_numpy(), expected.to_numpy())
+
+
+def test_slice_keeps_only_requested_labels(cashflows):
+    sliced = LiquidityCube.from_cashflows(cashflows).slice(product=['loan'], counterparty='retail')
+    assert list(sliced.labels['product']) == ['loan']
+    assert list(sliced.labels['counterparty']) == ['retail']
+    assert sliced.total('amount') == pytest.approx(50.0 + 70.0)
+    assert sliced.total('count') == 2
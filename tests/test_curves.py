@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from src.curves import YieldCurve, BASELINE_CURVE, GRID_STEP_DAYS
+
+
+@pytest.fixture(params=['log_linear', 'linear'])
+def curve(request):
+    return YieldCurve(tenors=(1.0, 3.0, 10.0), zero_rates=(0.01, 0.02, 0.03), interpolation=request.param)
+
+
+# ==========================================================
+# ✅ Discount Factors
+# ==========================================================
+def test_discount_factors_hit_pillar_rates(curve):
+    tenors = np.array(curve.tenors)
+    np.testing.assert_allclose(curve.discount_factors(tenors), np.exp(-np.array(curve.zero_rates) * tenors))
+    np.testing.assert_allclose(curve.zero_rates_at(tenors), curve.zero_rates)
+    assert curve.discount_factors(0.0) == pytest.approx(1.0)
+
+
+def test_log_linear_interpolation_between_pillars():
+    curve = YieldCurve(tenors=(1.0, 3.0, 10.0), zero_rates=(0.01, 0.02, 0.03))
+    # Halfway between 1y and 3y: log DF halfway between -0.01 and -0.06
+    assert curve.discount_factors(2.0) == pytest.approx(np.exp(-0.035))
+    years = np.linspace(1.0, 10.0, 50)
+    dfs = curve.discount_factors(years)
+    pillar = curve.discount_factors(np.array(curve.tenors))
+    assert np.all(np.diff(dfs) < 0)
+    assert dfs.min() >= pillar[-1] - 1e-15 and dfs.max() <= pillar[0] + 1e-15
+
+
+def test_flat_extrapolation_beyond_last_pillar(curve):
+    np.testing.assert_allclose(curve.zero_rates_at([12.0, 30.0]), 0.03)
+
+
+# ==========================================================
+# ✅ Shifted Curves
+# ==========================================================
+def test_zero_shift_is_identity():
+    assert BASELINE_CURVE.shifted(np.zeros(len(BASELINE_CURVE.tenors))) == BASELINE_CURVE
+    assert BASELINE_CURVE.shifted(0.0) == BASELINE_CURVE
+
+
+def test_shift_moves_pillar_rates_in_bps():
+    shifted = BASELINE_CURVE.shifted([100, 0, 0, 0, -50])
+    np.testing.assert_allclose(
+        np.subtract(shifted.zero_rates, BASELINE_CURVE.zero_rates), [0.01, 0, 0, 0, -0.005], atol=1e-15
+    )
+    assert shifted.labels == BASELINE_CURVE.labels
+
+
+# ==========================================================
+# ✅ Memoized Day Grid
+# ==========================================================
+def test_day_discount_factors_match_direct_evaluation(curve):
+    days = np.array([0, 1, 30, 365, 1000, GRID_STEP_DAYS - 1, GRID_STEP_DAYS, 3 * GRID_STEP_DAYS + 7])
+    np.testing.assert_allclose(curve.day_discount_factors(days), curve.discount_factors(days / 365.25), rtol=1e-14)
+    # Negative offsets are floored at day 0
+    assert curve.day_discount_factors([-5])[0] == pytest.approx(1.0)
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src import downsample
+
+
+# ==========================================================
+# ✅ Resolution Choice
+# ==========================================================
+@pytest.mark.parametrize("end, max_points, expected", [
+    ('2024-01-10', 10, 'D'),          # 10 days fit exactly
+    ('2024-01-10', 9, 'W-MON'),       # one day over the budget
+    ('2024-12-30', 52, 'MS'),         # 365 days / 7 = 52.1 weeks
+    ('2024-12-30', 53, 'W-MON'),
+    ('2024-12-30', 12, 'MS'),         # 365 / 30.44 = 11.99 months
+    ('2024-12-30', 11, 'QS'),
+    ('2124-01-01', 10, 'QS'),         # quarterly even when over budget
+])
+def test_choose_frequency_budget_boundaries(end, max_points, expected):
+    assert downsample.choose_frequency('2024-01-01', end, max_points) == expected
+
+
+# ==========================================================
+# ✅ Largest-Triangle-Three-Buckets (LTTB)
+# ==========================================================
+@pytest.mark.parametrize("n, n_out", [(5, 5), (5, 10), (100, 2), (0, 10)])
+def test_lttb_returns_input_when_within_budget(n, n_out):
+    x = np.arange(n)
+    np.testing.assert_array_equal(downsample.lttb(x, np.sin(x), n_out), np.arange(n))
+
+
+@pytest.mark.parametrize("n_out", [3, 10, 57])
+def test_lttb_keeps_first_and_last_and_budget(n_out):
+    x = np.arange(1000)
+    y = np.sin(x / 25.0)
+    selected = downsample.lttb(x, y, n_out)
+    assert len(selected) == n_out
+    assert selected[0] == 0 and selected[-1] == len(x) - 1
+    assert np.all(np.diff(selected) > 0)
+
+
+def test_lttb_keeps_an_isolated_spike():
+    x = np.arange(500)
+    y = np.zeros(500)
+    y[123] = 100.0
+    assert 123 in downsample.lttb(x, y, 20)
+
+
+def test_lttb_frame_drops_non_finite_and_keeps_small_frames():
+    df = pd.DataFrame({
+        'date': pd.date_range('2024-01-01', periods=5),
+        'LCR': [1.2, np.inf, 1.1, np.nan, 1.3],
+    })
+    out = downsample.lttb_frame(df, 'date', 'LCR', 10)
+    assert list(out['LCR']) == [1.2, 1.1, 1.3]
+    assert list(out['date']) == list(df['date'].iloc[[0, 2, 4]])
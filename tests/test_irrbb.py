@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src import irrbb
+from src.accumulators import GAP_BUCKETS
+
+LABELS = [label for _, _, label in GAP_BUCKETS]
+
+
+def _gaps(**by_bucket):
+    # One scenario row of repricing gaps, zero outside the given buckets
+    row = pd.Series(0.0, index=LABELS)
+    for label, amount in by_bucket.items():
+        row[label] = amount
+    return pd.DataFrame([row], index=pd.Index([1], name='scenario_id'))
+
+
+# ==========================================================
+# ✅ Repricing Weights
+# ==========================================================
+def test_repricing_weights_are_midpoint_shares_of_horizon():
+    weights = irrbb.repricing_weights(365)
+    assert list(weights.index) == LABELS
+    expected = [1 - 3.5 / 365, 1 - 19 / 365, 1 - 60.5 / 365, 1 - 135.5 / 365, 1 - 273 / 365, 0.0]
+    np.testing.assert_allclose(weights.to_numpy(), expected)
+
+
+def test_repricing_weights_clip_to_unit_interval():
+    # 30-day horizon: only the 0-7d and 8-30d midpoints fall inside it
+    weights = irrbb.repricing_weights(30)
+    np.testing.assert_allclose(weights.to_numpy(), [1 - 3.5 / 30, 1 - 19 / 30, 0, 0, 0, 0])
+    assert ((weights >= 0) & (weights <= 1)).all()
+
+
+# ==========================================================
+# ✅ ∆NII
+# ==========================================================
+def test_one_bucket_parallel_delta_nii_by_hand():
+    nii = irrbb.delta_nii(_gaps(**{'8-30d': 1_000_000.0}), irrbb.parallel_shocks([100, -200]))
+    # 1m repricing at day 19 earns 100bp for the remaining 346 of 365 days
+    assert nii.loc[1, '+100 bps'] == pytest.approx(1_000_000 * (1 - 19 / 365) * 0.01)
+    assert nii.loc[1, '-200 bps'] == pytest.approx(-2 * nii.loc[1, '+100 bps'])
+
+
+def test_one_bucket_single_pillar_delta_nii_by_hand():
+    # 181-365d midpoint (273 days) sits between the 0.5y and 2y pillars
+    shock = pd.DataFrame([[0, 150, 0, 0, 0]], index=['1-3y up'], columns=irrbb.IRRBB_BUCKETS, dtype=float)
+    nii = irrbb.delta_nii(_gaps(**{'181-365d': 1_000_000.0}), shock)
+    pillar_weight = (273 / 365.25 - 0.5) / (2.0 - 0.5)
+    assert nii.loc[1, '1-3y up'] == pytest.approx(1_000_000 * (1 - 273 / 365) * pillar_weight * 0.015)
+
+
+def test_gaps_beyond_horizon_do_not_move_nii():
+    nii = irrbb.delta_nii(_gaps(**{'>1y': 5_000_000.0}), irrbb.EBA_SHOCKS)
+    assert not nii.to_numpy().any()
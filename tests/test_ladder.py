@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.ladder import MaturityLadder
+
+HAIRCUTS = {'Level1': 0.0, 'Level2A': 0.15, 'Level2B': 0.5}
+
+
+@pytest.fixture(scope='module')
+def cashflows():
+    # Random book with repeated booking dates, same-day maturities and missing maturities
+    rng = np.random.default_rng(7)
+    n = 300
+    date = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 60, n), unit='D')
+    df = pd.DataFrame({
+        'date': date,
+        'maturity_date': date + pd.to_timedelta(rng.integers(0, 200, n), unit='D'),
+        'direction': rng.choice(['inflow', 'outflow'], n),
+        'hqlatype': rng.choice(['Level1', 'Level2A', 'Level2B', 'Non-HQLA'], n),
+        'amount': rng.uniform(1, 100, n).round(2),
+    })
+    df.loc[::37, 'maturity_date'] = pd.NaT
+    return df
+
+
+@pytest.fixture(scope='module')
+def ladder(cashflows):
+    return MaturityLadder.from_cashflows(cashflows, HAIRCUTS)
+
+
+def _brute(cashflows, date, start_days, end_days, series):
+    booked = cashflows[(cashflows['date'] <= date) & cashflows['maturity_date'].notna()]
+    window = booked[(booked['maturity_date'] > date + pd.Timedelta(days=start_days))
+                    & (booked['maturity_date'] <= date + pd.Timedelta(days=end_days))]
+    if series == 'hqla':
+        hqla = window[window['hqlatype'].isin(list(HAIRCUTS))]
+        return (hqla['amount'] * (1 - hqla['hqlatype'].map(HAIRCUTS))).sum()
+    return window.loc[window['direction'] == series, 'amount'].sum()
+
+
+DATES = ['2023-12-01', '2024-01-01', '2024-01-17', '2024-02-29', '2024-06-30']
+
+
+# ==========================================================
+# ✅ Range Queries against brute force
+# ==========================================================
+@pytest.mark.parametrize("horizon", [7, 30, 90])
+def test_maturing_within_matches_brute_force(cashflows, ladder, horizon):
+    out = ladder.maturing_within(DATES, horizon)
+    for i, date in enumerate(pd.to_datetime(DATES)):
+        for series in ['inflow', 'outflow', 'hqla']:
+            assert out[series].iloc[i] == pytest.approx(_brute(cashflows, date, 0, horizon, series))
+
+
+def test_hqla_outstanding_matches_brute_force(cashflows, ladder):
+    expected = [_brute(cashflows, date, 0, 10_000, 'hqla') for date in pd.to_datetime(DATES)]
+    np.testing.assert_allclose(ladder.hqla_outstanding(DATES), expected)
+
+
+def test_dates_outside_the_data(cashflows, ladder):
+    before = ladder.maturing_within(['2023-01-01'], 30).iloc[0]
+    assert before['inflow'] == before['outflow'] == before['hqla'] == 0
+    # After the last booking everything is booked; only what has not matured counts
+    after = pd.Timestamp('2024-03-05')
+    assert ladder.hqla_outstanding([after])[0] == pytest.approx(_brute(cashflows, after, 0, 10_000, 'hqla'))
+    assert ladder.maturing_within([after], 90)['outflow'].iloc[0] == pytest.approx(
+        _brute(cashflows, after, 0, 90, 'outflow'))
+
+
+@pytest.mark.parametrize("edges", [[0, 7, 30, 90, 180, 365], [0, 1], [3, 10, 45]])
+def test_bucket_totals_custom_buckets(cashflows, ladder, edges):
+    date = pd.Timestamp('2024-01-20')
+    for series in ['inflow', 'outflow']:
+        expected = [_brute(cashflows, date, lo, hi, series) for lo, hi in zip(edges[:-1], edges[1:])]
+        np.testing.assert_allclose(ladder.bucket_totals(date, edges, series), expected)
+
+
+def test_empty_ladder(cashflows):
+    empty = MaturityLadder.from_cashflows(cashflows.iloc[:0], HAIRCUTS)
+    assert not empty.maturing_within(['2024-01-01'], 30)[['inflow', 'outflow', 'hqla']].to_numpy().any()
+    assert empty.hqla_outstanding(['2024-01-01'])[0] == 0
+
+
+# ==========================================================
+# ✅ Forward-window LCR
+# ==========================================================
+def test_forward_lcr_caps_inflows(ladder):
+    lcr = ladder.forward_lcr(DATES, horizon_days=30, inflow_cap=0.75)
+    np.testing.assert_allclose(lcr['Capped Inflows'], np.minimum(lcr['Inflows'], 0.75 * lcr['Outflows']))
+    np.testing.assert_allclose(lcr['NetOutflows'], lcr['Outflows'] - lcr['Capped Inflows'])
+    positive = lcr['NetOutflows'] > 0
+    np.testing.assert_allclose(lcr.loc[positive, 'LCR'], lcr.loc[positive, 'HQLA'] / lcr.loc[positive, 'NetOutflows'])
+    assert np.isinf(lcr.loc[~positive, 'LCR']).all()
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src import stress
+
+
+@pytest.fixture
+def cells():
+    # Four cells with hand-picked LCR/NSFR building blocks
+    frame = pd.DataFrame({
+        'counterparty': ['retail', 'wholesale', 'retail', 'interbank'],
+        'product': ['deposit', 'deposit', 'loan', 'bond'],
+        'hqlatype': ['Non-HQLA', 'Non-HQLA', 'Non-HQLA', 'Level1'],
+        'bucket': ['0-30d', '0-30d', '31-90d', '31-90d'],
+        'direction': ['outflow', 'outflow', 'inflow', 'inflow'],
+        'amount': [100.0, 200.0, 80.0, 300.0],
+        'hqla': [0.0, 0.0, 0.0, 300.0],
+        'asf': [0.0, 0.0, 72.0, 150.0],
+        'rsf': [10.0, 50.0, 0.0, 0.0],
+    })
+    return stress.cells_from_frame(frame)
+
+
+# ==========================================================
+# ✅ Run-off Rate Matrices
+# ==========================================================
+def test_rate_matrices_shape_and_matching(cells):
+    matrices = stress.rate_matrices(cells, [
+        {'rules': [{'counterparty': ['wholesale', 'interbank'], 'runoff': 0.4}]},
+        {'rules': []},
+    ])
+    assert set(matrices) == set(stress.RATES)
+    assert matrices['runoff'].shape == (2, len(cells['hqla']))
+    wholesale = cells['dims']['counterparty'].isin(['wholesale', 'interbank']).to_numpy()
+    np.testing.assert_allclose(matrices['runoff'][0], np.where(wholesale, 0.4, 0.0))
+    assert not matrices['runoff'][1].any()
+    assert not matrices['asf_runoff'].any()
+
+
+def test_rate_matrices_later_rules_override(cells):
+    matrices = stress.rate_matrices(cells, [{'rules': [
+        {'direction': 'outflow', 'runoff': 0.1},
+        {'direction': 'outflow', 'counterparty': 'wholesale', 'runoff': 0.5},
+    ]}])
+    runoff = pd.Series(matrices['runoff'][0], index=cells['dims']['counterparty'])
+    assert runoff['wholesale'] == pytest.approx(0.5)
+    assert runoff['retail'].max() == pytest.approx(0.1)
+
+
+# ==========================================================
+# ✅ Vectorized Stress Evaluation
+# ==========================================================
+def test_base_lcr_and_nsfr_by_hand(cells):
+    base = stress.evaluate(cells, {}).iloc[0]
+    # Inflows 380 capped at 75% of outflows 300 -> net outflows 75
+    assert base['NetOutflows'] == pytest.approx(75.0)
+    assert base['LCR'] == pytest.approx(300.0 / 75.0)
+    assert base['NSFR'] == pytest.approx(222.0 / 60.0)
+
+
+def test_identity_stress_reproduces_base(cells):
+    base = stress.evaluate(cells, {})
+    stressed = stress.evaluate_stresses(cells, [
+        {'name': 'No rules'},
+        {'name': 'Zero rates', 'rules': [{'counterparty': 'retail', 'runoff': 0.0, 'asf_runoff': 0.0}]},
+        stress.withdrawal_stress(0.0, 0.0),
+    ])
+    for metric in ['HQLA', 'Outflows', 'Inflows', 'LCR', 'ASF', 'RSF', 'NSFR']:
+        np.testing.assert_allclose(stressed[metric], base[metric].iloc[0])
+
+
+def test_withdrawal_stress_by_hand(cells):
+    result = stress.evaluate_stresses(cells, [stress.withdrawal_stress(0.1, 0.5)]).iloc[0]
+    # Outflows 100 * 1.1 + 200 * 1.5 = 410; inflows 380 capped at 307.5
+    assert result['Outflows'] == pytest.approx(410.0)
+    assert result['NetOutflows'] == pytest.approx(102.5)
+    assert result['LCR'] == pytest.approx(300.0 / 102.5)
+    # Retail ASF loses 10%, interbank (wholesale group) ASF loses 50%
+    assert result['ASF'] == pytest.approx(72.0 * 0.9 + 150.0 * 0.5)
+    assert result['NSFR'] == pytest.approx((72.0 * 0.9 + 150.0 * 0.5) / 60.0)
+
+
+def test_no_outflows_gives_infinite_lcr(cells):
+    rates = {'runoff': np.full(len(cells['hqla']), -1.0)}
+    assert np.isinf(stress.evaluate(cells, rates)['LCR'].iloc[0])